@@ -0,0 +1,45 @@
+"""Add due-card index and denormalized language_id to user_vocabulary
+
+Revision ID: 002_user_vocabulary_due_index
+Revises: 001_initial
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '002_user_vocabulary_due_index'
+down_revision = '001_initial'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('user_vocabulary', sa.Column('language_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'fk_user_vocabulary_language_id', 'user_vocabulary', 'languages',
+        ['language_id'], ['id']
+    )
+
+    # Backfill from the vocabulary table
+    op.execute(
+        """
+        UPDATE user_vocabulary
+        SET language_id = vocabulary.language_id
+        FROM vocabulary
+        WHERE vocabulary.id = user_vocabulary.vocabulary_id
+        """
+    )
+
+    op.create_index(
+        'ix_user_vocabulary_due', 'user_vocabulary',
+        ['user_id', 'next_review_date', 'status'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_vocabulary_due', table_name='user_vocabulary')
+    op.drop_constraint('fk_user_vocabulary_language_id', 'user_vocabulary', type_='foreignkey')
+    op.drop_column('user_vocabulary', 'language_id')
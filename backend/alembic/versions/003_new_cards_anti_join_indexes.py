@@ -0,0 +1,31 @@
+"""Add indexes for the new-card anti-join and keyset pagination
+
+Revision ID: 003_new_cards_anti_join_indexes
+Revises: 002_user_vocabulary_due_index
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '003_new_cards_anti_join_indexes'
+down_revision = '002_user_vocabulary_due_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_user_vocabulary_user_vocabulary', 'user_vocabulary',
+        ['user_id', 'vocabulary_id'], unique=False
+    )
+    op.create_index(
+        'ix_vocabulary_language_frequency', 'vocabulary',
+        ['language_id', 'frequency', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_vocabulary_language_frequency', table_name='vocabulary')
+    op.drop_index('ix_user_vocabulary_user_vocabulary', table_name='user_vocabulary')
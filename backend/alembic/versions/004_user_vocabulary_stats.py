@@ -0,0 +1,39 @@
+"""Add user_vocabulary_stats counter table
+
+Revision ID: 004_user_vocabulary_stats
+Revises: 003_new_cards_anti_join_indexes
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '004_user_vocabulary_stats'
+down_revision = '003_new_cards_anti_join_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('user_vocabulary_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('language_id', sa.Integer(), nullable=False),
+        sa.Column('total_words', sa.Integer(), nullable=False),
+        sa.Column('learning_words', sa.Integer(), nullable=False),
+        sa.Column('review_words', sa.Integer(), nullable=False),
+        sa.Column('mastered_words', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['language_id'], ['languages.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'language_id', name='uq_user_vocabulary_stats_user_language')
+    )
+    op.create_index(op.f('ix_user_vocabulary_stats_id'), 'user_vocabulary_stats', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_user_vocabulary_stats_id'), table_name='user_vocabulary_stats')
+    op.drop_table('user_vocabulary_stats')
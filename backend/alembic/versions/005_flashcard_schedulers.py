@@ -0,0 +1,44 @@
+"""Add memory model state and per-user scheduler parameters
+
+Revision ID: 005_flashcard_schedulers
+Revises: 004_user_vocabulary_stats
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005_flashcard_schedulers'
+down_revision = '004_user_vocabulary_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('user_vocabulary', sa.Column('stability', sa.Float(), nullable=True))
+    op.add_column('user_vocabulary', sa.Column('difficulty', sa.Float(), nullable=True))
+
+    op.create_table('user_scheduler_parameters',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('algorithm', sa.String(length=20), nullable=False),
+        sa.Column('parameters', sa.JSON(), nullable=True),
+        sa.Column('review_count', sa.Integer(), nullable=True),
+        sa.Column('log_loss', sa.Float(), nullable=True),
+        sa.Column('fitted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id')
+    )
+    op.create_index(op.f('ix_user_scheduler_parameters_id'), 'user_scheduler_parameters', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_user_scheduler_parameters_id'), table_name='user_scheduler_parameters')
+    op.drop_table('user_scheduler_parameters')
+    op.drop_column('user_vocabulary', 'difficulty')
+    op.drop_column('user_vocabulary', 'stability')
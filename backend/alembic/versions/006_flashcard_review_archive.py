@@ -0,0 +1,49 @@
+"""Index flashcard reviews and add compacted review summaries
+
+Revision ID: 006_flashcard_review_archive
+Revises: 005_flashcard_schedulers
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006_flashcard_review_archive'
+down_revision = '005_flashcard_schedulers'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_flashcard_reviews_user_vocabulary_reviewed',
+        'flashcard_reviews',
+        ['user_vocabulary_id', 'reviewed_at'],
+        unique=False
+    )
+    op.create_index('ix_flashcard_reviews_reviewed_at', 'flashcard_reviews', ['reviewed_at'], unique=False)
+
+    op.create_table('flashcard_review_summaries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_vocabulary_id', sa.Integer(), nullable=False),
+        sa.Column('review_count', sa.Integer(), nullable=False),
+        sa.Column('correct_count', sa.Integer(), nullable=False),
+        sa.Column('mean_quality', sa.Float(), nullable=True),
+        sa.Column('last_quality', sa.Integer(), nullable=True),
+        sa.Column('first_reviewed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_reviewed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_vocabulary_id'], ['user_vocabulary.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_vocabulary_id')
+    )
+    op.create_index(op.f('ix_flashcard_review_summaries_id'), 'flashcard_review_summaries', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_flashcard_review_summaries_id'), table_name='flashcard_review_summaries')
+    op.drop_table('flashcard_review_summaries')
+    op.drop_index('ix_flashcard_reviews_reviewed_at', table_name='flashcard_reviews')
+    op.drop_index('ix_flashcard_reviews_user_vocabulary_reviewed', table_name='flashcard_reviews')
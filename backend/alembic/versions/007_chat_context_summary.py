@@ -0,0 +1,33 @@
+"""Add rolling context summary to chat conversations and index recent messages
+
+Revision ID: 007_chat_context_summary
+Revises: 006_flashcard_review_archive
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007_chat_context_summary'
+down_revision = '006_flashcard_review_archive'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('chat_conversations', sa.Column('context_summary', sa.Text(), nullable=True))
+    op.add_column('chat_conversations', sa.Column('summary_through_message_id', sa.Integer(), nullable=True))
+    op.create_index(
+        'ix_chat_messages_conversation_id_id',
+        'chat_messages',
+        ['conversation_id', 'id'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chat_messages_conversation_id_id', table_name='chat_messages')
+    op.drop_column('chat_conversations', 'summary_through_message_id')
+    op.drop_column('chat_conversations', 'context_summary')
@@ -0,0 +1,31 @@
+"""Track background evaluation status of writing submissions
+
+Revision ID: 008_writing_evaluation_status
+Revises: 007_chat_context_summary
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '008_writing_evaluation_status'
+down_revision = '007_chat_context_summary'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'writing_submissions',
+        sa.Column('evaluation_status', sa.String(length=20), nullable=False, server_default='pending')
+    )
+    op.execute(
+        "UPDATE writing_submissions SET evaluation_status = 'completed' "
+        "WHERE EXISTS (SELECT 1 FROM writing_evaluations e WHERE e.submission_id = writing_submissions.id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('writing_submissions', 'evaluation_status')
@@ -0,0 +1,56 @@
+"""Reference chat system prompts from the prompt registry
+
+Revision ID: 009_chat_prompt_references
+Revises: 008_writing_evaluation_status
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '009_chat_prompt_references'
+down_revision = '008_writing_evaluation_status'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Version 1 of the registry holds the prompts that were copied into the
+    # system messages; unknown characters or scenarios resolve to the
+    # closest registry prompt when read
+    op.execute(
+        "UPDATE chat_conversations SET ai_personality_prompt = "
+        "'chat/' || COALESCE(ai_character, 'friendly_tutor') || '/' || "
+        "CASE WHEN conversation_type = 'scenario' AND scenario_name IS NOT NULL "
+        "THEN scenario_name ELSE 'free' END || '@1' "
+        "WHERE ai_personality_prompt IS NULL"
+    )
+    op.execute("DELETE FROM chat_messages WHERE role = 'system'")
+
+
+def downgrade() -> None:
+    from app.services.ai.prompt_registry import prompt_registry
+
+    bind = op.get_bind()
+    conversations = bind.execute(sa.text(
+        "SELECT c.id, c.ai_personality_prompt, "
+        "(SELECT MIN(m.created_at) FROM chat_messages m WHERE m.conversation_id = c.id) "
+        "FROM chat_conversations c WHERE c.ai_personality_prompt IS NOT NULL"
+    )).fetchall()
+
+    # Put the prompt back as the first message of each conversation
+    for conversation_id, reference, first_message_at in conversations:
+        bind.execute(
+            sa.text(
+                "INSERT INTO chat_messages (conversation_id, role, content, has_errors, created_at) "
+                "VALUES (:conversation_id, 'system', :content, false, COALESCE(:created_at, CURRENT_TIMESTAMP))"
+            ),
+            {
+                "conversation_id": conversation_id,
+                "content": prompt_registry.get(reference),
+                "created_at": first_message_at
+            }
+        )
+    op.execute("UPDATE chat_conversations SET ai_personality_prompt = NULL")
@@ -74,6 +74,56 @@ def get_platform_overview(
     }
 
 
+@router.get("/stats/review-forecast")
+def get_review_forecast(
+    days: int = Query(14, ge=1, le=90),
+    language_id: Optional[int] = None,
+    hourly: bool = False,
+    db: Session = Depends(get_db),
+    admin: User = Depends(require_admin)
+):
+    """Forecast flashcard review volume per day (and optionally per hour)"""
+    from app.services.flashcard.forecast import forecast_review_load
+
+    return forecast_review_load(db, days=days, language_id=language_id, hourly=hourly)
+
+
+@router.get("/stats/ai-cache")
+def get_ai_cache_stats(admin: User = Depends(require_admin)):
+    """Hit/miss counters of the AI response cache (this worker)"""
+    from app.services.ai.response_cache import get_cache_stats
+
+    return get_cache_stats()
+
+
+@router.get("/stats/ai-structured-output")
+def get_ai_structured_output_stats(admin: User = Depends(require_admin)):
+    """Parse failures, local repairs and retries of AI JSON replies (this worker)"""
+    from app.services.ai.structured_output import get_structured_output_stats
+
+    return get_structured_output_stats()
+
+
+@router.get("/stats/grammar-batching")
+def get_grammar_batching_stats(admin: User = Depends(require_admin)):
+    """Batch sizes and fallbacks of batched grammar analysis (this worker)"""
+    from app.services.ai.grammar_batcher import grammar_batcher
+
+    return grammar_batcher.stats()
+
+
+@router.get("/stats/llm-providers")
+def get_llm_provider_stats(admin: User = Depends(require_admin)):
+    """Recent latency and error rate per AI provider (this worker, LLM_PROVIDER=router)"""
+    from app.services.ai.llm_gateway import llm_gateway
+
+    provider = llm_gateway.provider
+    return {
+        "provider": provider.name,
+        "routes": provider.stats() if hasattr(provider, "stats") else {}
+    }
+
+
 # ========== User Management ==========
 
 @router.get("/users")
@@ -217,11 +267,13 @@ def create_vocabulary(
     admin: User = Depends(require_admin)
 ):
     """Create new vocabulary word"""
+    from app.services.flashcard.card_cache import invalidate_card
 
     new_vocab = Vocabulary(**vocab.dict())
     db.add(new_vocab)
     db.commit()
     db.refresh(new_vocab)
+    invalidate_card(new_vocab.id)
 
     return {
         "message": "Vocabulary created",
@@ -240,6 +292,7 @@ def delete_vocabulary(
     admin: User = Depends(require_admin)
 ):
     """Delete vocabulary word"""
+    from app.services.flashcard.card_cache import invalidate_card
 
     vocab = db.query(Vocabulary).filter(Vocabulary.id == vocab_id).first()
     if not vocab:
@@ -247,6 +300,7 @@ def delete_vocabulary(
 
     db.delete(vocab)
     db.commit()
+    invalidate_card(vocab_id)
 
     return {"message": "Vocabulary deleted"}
 
@@ -1,7 +1,9 @@
-from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import Any, List, Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from datetime import datetime
+import json
 
 from app.core.dependencies import get_db, get_current_user
 from app.models.user import User
@@ -44,6 +46,7 @@ class CreateConversationRequest(BaseModel):
     scenario_name: Optional[str] = None
     ai_character: Optional[str] = "friendly_tutor"
     difficulty_level: str = "medium"
+    correction_mode: Literal["immediate", "end", "none"] = "immediate"
 
 
 class SendMessageRequest(BaseModel):
@@ -57,28 +60,21 @@ def create_conversation(
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """Create a new chat conversation"""
+    from app.services.ai.prompt_registry import prompt_registry
+
+    # The system prompt is referenced by id and version, not copied into the conversation
     conversation = ChatConversation(
         user_id=current_user.id,
-        **conversation_data.dict()
-    )
-    db.add(conversation)
-    db.commit()
-    db.refresh(conversation)
-
-    # Add initial system message
-    from app.services.ai.openai_service import get_initial_chat_prompt
-
-    system_message = ChatMessage(
-        conversation_id=conversation.id,
-        role="system",
-        content=get_initial_chat_prompt(
+        ai_personality_prompt=prompt_registry.chat_reference(
             conversation_type=conversation_data.conversation_type,
             scenario=conversation_data.scenario_name,
             character=conversation_data.ai_character
-        )
+        ),
+        **conversation_data.dict()
     )
-    db.add(system_message)
+    db.add(conversation)
     db.commit()
+    db.refresh(conversation)
 
     return conversation
 
@@ -131,10 +127,23 @@ def get_conversation(
 async def send_message(
     conversation_id: int,
     message_data: SendMessageRequest,
+    stream: bool = Query(False),
+    accept: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> Any:
-    """Send a message in a conversation and get AI response"""
+    """
+    Send a message in a conversation and get AI response
+
+    With ?stream=true or "Accept: text/event-stream" the reply is streamed
+    as Server-Sent Events: "token" events carry text as it is generated,
+    a "corrections" event carries the grammar analysis (correction_mode
+    "immediate") and a final "message" event carries the saved assistant
+    message.
+
+    With correction_mode "end" the analysis runs in the background and is
+    returned when the conversation ends; with "none" it is skipped.
+    """
     conversation = db.query(ChatConversation).filter(
         ChatConversation.id == conversation_id,
         ChatConversation.user_id == current_user.id
@@ -146,30 +155,68 @@ async def send_message(
             detail="Conversation not found"
         )
 
+    from app.services.ai.chat_context import count_tokens
+
     # Save user message
     user_message = ChatMessage(
         conversation_id=conversation_id,
         role="user",
-        content=message_data.content
+        content=message_data.content,
+        tokens_used=count_tokens(message_data.content)
     )
     db.add(user_message)
     db.commit()
 
+    correction_mode = conversation.correction_mode or "immediate"
+
+    if stream or "text/event-stream" in (accept or ""):
+        from app.services.ai.chat_stream import stream_assistant_message
+
+        async def event_stream():
+            async for event in stream_assistant_message(
+                conversation_id,
+                message_data.content,
+                db,
+                correction_mode=correction_mode,
+                user_message_id=user_message.id,
+                user_id=current_user.id
+            ):
+                if event["type"] == "token":
+                    yield f"event: token\ndata: {json.dumps({'content': event['content']})}\n\n"
+                elif event["type"] == "corrections":
+                    yield f"event: corrections\ndata: {json.dumps(event['corrections'])}\n\n"
+                else:
+                    yield f"event: message\ndata: {json.dumps(event['message'])}\n\n"
+
+        return StreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
     # Get AI response
     from app.services.ai.openai_service import get_chat_response
 
     ai_response, corrections = await get_chat_response(
         conversation_id=conversation_id,
         user_message=message_data.content,
-        db=db
+        db=db,
+        analyze=correction_mode == "immediate",
+        user_id=current_user.id
     )
 
+    if correction_mode == "end":
+        from app.services.ai.chat_corrections import defer_corrections
+
+        defer_corrections(conversation_id, user_message.id, message_data.content, user_id=current_user.id)
+
     # Save AI message
     ai_message = ChatMessage(
         conversation_id=conversation_id,
         role="assistant",
         content=ai_response,
-        corrections=corrections
+        corrections=corrections,
+        tokens_used=count_tokens(ai_response)
     )
     db.add(ai_message)
     db.commit()
@@ -179,12 +226,12 @@ async def send_message(
 
 
 @router.delete("/conversations/{conversation_id}")
-def end_conversation(
+async def end_conversation(
     conversation_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> Any:
-    """End a conversation"""
+    """End a conversation (and deliver deferred corrections)"""
     conversation = db.query(ChatConversation).filter(
         ChatConversation.id == conversation_id,
         ChatConversation.user_id == current_user.id
@@ -200,4 +247,25 @@ def end_conversation(
     conversation.ended_at = datetime.utcnow()
     db.commit()
 
-    return {"message": "Conversation ended"}
+    if conversation.correction_mode != "end":
+        return {"message": "Conversation ended"}
+
+    from app.core.config import settings
+    from app.services.ai.chat_corrections import get_conversation_corrections, wait_for_deferred_corrections
+    from app.services.websocket_manager import manager
+
+    await wait_for_deferred_corrections(conversation_id, timeout=settings.OPENAI_ANALYSIS_TIMEOUT_SECONDS)
+    db.expire_all()
+    corrections = get_conversation_corrections(conversation_id, db)
+
+    await manager.broadcast_to_conversation(
+        {
+            "type": "corrections_summary",
+            "conversation_id": conversation_id,
+            "corrections": corrections,
+            "timestamp": datetime.utcnow().isoformat()
+        },
+        conversation_id
+    )
+
+    return {"message": "Conversation ended", "corrections": corrections}
@@ -76,10 +76,10 @@ async def upload_recording(
     audio_url = await save_audio_file(audio, current_user.id, session_id)
 
     # Transcribe
-    transcription = await transcribe_audio(audio_url)
+    transcription = await transcribe_audio(audio_url, user_id=current_user.id)
 
     # Evaluate
-    scores = await evaluate_pronunciation(transcription, expected_text)
+    scores = await evaluate_pronunciation(transcription, expected_text, user_id=current_user.id)
 
     # Save recording
     recording = SpeakingRecording(
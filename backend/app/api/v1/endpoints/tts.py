@@ -21,7 +21,7 @@ class TTSRequest(BaseModel):
 
 
 @router.post("/generate")
-def generate_tts_audio(request: TTSRequest):
+async def generate_tts_audio(request: TTSRequest):
     """
     Generate speech audio from text
 
@@ -36,7 +36,7 @@ def generate_tts_audio(request: TTSRequest):
         raise HTTPException(status_code=400, detail="Text is too long (max 4096 characters)")
 
     try:
-        audio_path = tts_service.generate_speech(
+        audio_path = await tts_service.generate_speech(
             text=request.text,
             language_code=request.language_code,
             voice=request.voice
@@ -57,7 +57,7 @@ def generate_tts_audio(request: TTSRequest):
 
 
 @router.get("/pronunciation/{word}")
-def get_word_pronunciation(
+async def get_word_pronunciation(
     word: str,
     language_code: str = Query("en", description="Language code"),
     voice: Optional[str] = Query(None, description="Voice name")
@@ -76,7 +76,7 @@ def get_word_pronunciation(
         raise HTTPException(status_code=400, detail="Word is too long")
 
     try:
-        audio_path = tts_service.generate_pronunciation(
+        audio_path = await tts_service.generate_pronunciation(
             word=word,
             language_code=language_code,
             voice=voice
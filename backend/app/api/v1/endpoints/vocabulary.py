@@ -1,15 +1,17 @@
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 
 from app.core.dependencies import get_db, get_current_user
 from app.models.user import User
 from app.models.vocabulary import Vocabulary, UserVocabulary, FlashcardReview
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 router = APIRouter()
 
+MAX_OFFLINE_REVIEWS = 10000
+
 
 class VocabularySchema(BaseModel):
     id: int
@@ -42,12 +44,57 @@ class UserVocabularySchema(BaseModel):
         from_attributes = True
 
 
+class CardProgressSchema(BaseModel):
+    id: int
+    status: str
+    ease_factor: float
+    interval: int
+    next_review_date: Optional[datetime]
+    times_reviewed: int
+
+    class Config:
+        from_attributes = True
+
+
+class SessionCardSchema(BaseModel):
+    vocabulary: VocabularySchema
+    progress: Optional[CardProgressSchema]
+    is_new: bool
+
+
+class DailySessionSchema(BaseModel):
+    date: str
+    review_cards: int
+    new_cards: int
+    total_cards: int
+    remaining: int
+
+
+class SchedulerSettingsSchema(BaseModel):
+    algorithm: str
+    has_fitted_parameters: bool = False
+    available: List[str] = []
+
+
+class UpdateSchedulerRequest(BaseModel):
+    algorithm: str
+
+
 class FlashcardReviewRequest(BaseModel):
     vocabulary_id: int
     quality: int  # 0-5
     time_taken_seconds: int
 
 
+class FlashcardBatchReviewItem(FlashcardReviewRequest):
+    quality: int = Field(..., ge=0, le=5)
+    reviewed_at: Optional[datetime] = None  # When the review happened on the client, capped at now
+
+
+class FlashcardBatchReviewRequest(BaseModel):
+    reviews: List[FlashcardBatchReviewItem] = Field(..., min_length=1, max_length=1000)
+
+
 @router.get("/due", response_model=List[UserVocabularySchema])
 def get_due_flashcards(
     language_id: int = Query(...),
@@ -56,46 +103,90 @@ def get_due_flashcards(
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """Get flashcards due for review"""
-    now = datetime.utcnow()
+    from app.services.flashcard.spaced_repetition import get_due_card_ids
+    from app.services.flashcard.card_cache import render_due_cards
 
-    # Get user's vocabulary that's due for review
-    user_vocab = db.query(UserVocabulary).join(Vocabulary).filter(
-        UserVocabulary.user_id == current_user.id,
-        Vocabulary.language_id == language_id,
-        UserVocabulary.next_review_date <= now
-    ).limit(limit).all()
+    card_ids = get_due_card_ids(
+        user_id=current_user.id,
+        language_id=language_id,
+        limit=limit,
+        db=db
+    )
 
-    return user_vocab
+    # Cards are pre-serialized, so skip response_model validation
+    return Response(content=render_due_cards(card_ids, db), media_type="application/json")
 
 
 @router.get("/new", response_model=List[VocabularySchema])
 def get_new_vocabulary(
+    response: Response,
     language_id: int = Query(...),
     level_id: Optional[int] = None,
     category_id: Optional[int] = None,
     limit: int = Query(10, le=50),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> Any:
-    """Get new vocabulary words to learn"""
-    query = db.query(Vocabulary).filter(
-        Vocabulary.language_id == language_id
+    """
+    Get new vocabulary words to learn, most frequent first
+
+    When a full page is returned, the X-Next-Cursor response header holds the
+    cursor for the following page.
+    """
+    from app.services.flashcard.spaced_repetition import (
+        get_new_cards,
+        encode_new_cards_cursor,
+        decode_new_cards_cursor,
     )
 
-    # Exclude already learned words
-    learned_ids = db.query(UserVocabulary.vocabulary_id).filter(
-        UserVocabulary.user_id == current_user.id
-    ).all()
-    if learned_ids:
-        query = query.filter(~Vocabulary.id.in_([id[0] for id in learned_ids]))
+    try:
+        after = decode_new_cards_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+    words = get_new_cards(
+        user_id=current_user.id,
+        language_id=language_id,
+        limit=limit,
+        db=db,
+        level_id=level_id,
+        category_id=category_id,
+        after=after
+    )
 
-    if level_id:
-        query = query.filter(Vocabulary.difficulty_level_id == level_id)
+    if len(words) == limit:
+        response.headers["X-Next-Cursor"] = encode_new_cards_cursor(words[-1])
 
-    if category_id:
-        query = query.filter(Vocabulary.category_id == category_id)
+    return words
 
-    return query.limit(limit).all()
+
+@router.post("/session", response_model=DailySessionSchema)
+def start_session(
+    language_id: int = Query(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """Start (or resume) today's flashcard session"""
+    from app.services.flashcard.daily_session import start_daily_session
+
+    return start_daily_session(current_user.id, language_id, db)
+
+
+@router.post("/session/next", response_model=List[SessionCardSchema])
+def next_session_cards(
+    language_id: int = Query(...),
+    count: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """Take the next cards of today's flashcard session"""
+    from app.services.flashcard.daily_session import pop_session_cards
+
+    return pop_session_cards(current_user.id, language_id, count, db)
 
 
 @router.post("/review", status_code=status.HTTP_201_CREATED)
@@ -106,6 +197,7 @@ def review_flashcard(
 ) -> Any:
     """Submit a flashcard review"""
     from app.services.flashcard.spaced_repetition import update_flashcard_review
+    from app.services.flashcard.vocabulary_stats import status_change_deltas, adjust_vocabulary_stats
 
     # Get or create user vocabulary
     user_vocab = db.query(UserVocabulary).filter(
@@ -114,12 +206,26 @@ def review_flashcard(
     ).first()
 
     if not user_vocab:
+        vocabulary = db.query(Vocabulary).filter(Vocabulary.id == review_data.vocabulary_id).first()
+        if not vocabulary:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Vocabulary not found"
+            )
+
         user_vocab = UserVocabulary(
             user_id=current_user.id,
             vocabulary_id=review_data.vocabulary_id,
+            language_id=vocabulary.language_id,
             status="learning"
         )
         db.add(user_vocab)
+        adjust_vocabulary_stats(
+            current_user.id,
+            vocabulary.language_id,
+            status_change_deltas(None, user_vocab.status),
+            db
+        )
         db.commit()
         db.refresh(user_vocab)
 
@@ -143,39 +249,218 @@ def review_flashcard(
     return {"message": "Review submitted successfully", "next_review": user_vocab.next_review_date}
 
 
-@router.get("/stats")
-def get_vocabulary_stats(
+@router.post("/review/batch", status_code=status.HTTP_201_CREATED)
+def review_flashcards_batch(
+    batch_data: FlashcardBatchReviewRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """Submit many flashcard reviews at once (e.g. after an offline session)"""
+    from app.services.flashcard.spaced_repetition import apply_flashcard_reviews_batch
+
+    try:
+        results = apply_flashcard_reviews_batch(
+            user_id=current_user.id,
+            reviews=[review.dict() for review in batch_data.reviews],
+            db=db
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+
+    return {
+        "message": "Reviews submitted successfully",
+        "reviews_applied": len(batch_data.reviews),
+        "cards": results
+    }
+
+
+@router.get("/deck/export")
+def export_deck(
     language_id: int = Query(...),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> Any:
-    """Get vocabulary learning statistics"""
-    total = db.query(UserVocabulary).join(Vocabulary).filter(
-        UserVocabulary.user_id == current_user.id,
-        Vocabulary.language_id == language_id
-    ).count()
+    """
+    Export the user's deck as a binary snapshot for offline use
+
+    Send the ETag of the copy you hold as If-None-Match to get 304 when
+    nothing changed, or a delta snapshot with only the changed cards.
+    """
+    from app.services.flashcard.deck_sync import export_deck as build_snapshot, parse_deck_etag
+
+    snapshot = build_snapshot(
+        user_id=current_user.id,
+        language_id=language_id,
+        db=db,
+        since=parse_deck_etag(if_none_match, language_id)
+    )
 
-    mastered = db.query(UserVocabulary).join(Vocabulary).filter(
-        UserVocabulary.user_id == current_user.id,
-        Vocabulary.language_id == language_id,
-        UserVocabulary.status == "mastered"
-    ).count()
+    if snapshot["payload"] is None:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": snapshot["etag"]})
+
+    return Response(
+        content=snapshot["payload"],
+        media_type="application/octet-stream",
+        headers={"ETag": snapshot["etag"]}
+    )
+
+
+@router.post("/deck/import", status_code=status.HTTP_201_CREATED)
+def import_offline_reviews(
+    language_id: int = Query(...),
+    payload: bytes = Body(..., media_type="application/octet-stream"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Apply a binary log of reviews made offline
+
+    No ETag is returned: the client keeps the one it holds, and its next
+    export delta has the cards as rescheduled by the server along with any
+    changes made elsewhere in the meantime.
+    """
+    from app.services.flashcard.deck_sync import DeckFormatError, decode_reviews
+    from app.services.flashcard.spaced_repetition import apply_flashcard_reviews_batch
+
+    try:
+        reviews = decode_reviews(payload)
+    except DeckFormatError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    if len(reviews) > MAX_OFFLINE_REVIEWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {MAX_OFFLINE_REVIEWS} reviews per import"
+        )
+
+    other_language = db.query(Vocabulary.id).filter(
+        Vocabulary.id.in_({review["vocabulary_id"] for review in reviews}),
+        Vocabulary.language_id != language_id
+    ).all()
+    if other_language:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Vocabulary ids not in this language: {sorted(row.id for row in other_language)}"
+        )
+
+    try:
+        apply_flashcard_reviews_batch(user_id=current_user.id, reviews=reviews, db=db)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+
+    return {
+        "message": "Offline reviews imported",
+        "reviews_applied": len(reviews)
+    }
+
+
+@router.get("/scheduler", response_model=SchedulerSettingsSchema)
+def get_scheduler_settings(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """Get the spaced repetition algorithm used for the current user"""
+    from app.services.flashcard.schedulers import SCHEDULERS, get_user_scheduler
+
+    scheduler, parameters = get_user_scheduler(current_user.id, db)
+
+    return {
+        "algorithm": scheduler.name,
+        "has_fitted_parameters": parameters is not None,
+        "available": list(SCHEDULERS)
+    }
 
-    learning = db.query(UserVocabulary).join(Vocabulary).filter(
-        UserVocabulary.user_id == current_user.id,
-        Vocabulary.language_id == language_id,
-        UserVocabulary.status == "learning"
-    ).count()
 
-    due_count = db.query(UserVocabulary).join(Vocabulary).filter(
+@router.put("/scheduler", response_model=SchedulerSettingsSchema)
+def update_scheduler_settings(
+    scheduler_data: UpdateSchedulerRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """Choose the spaced repetition algorithm for the current user"""
+    from app.models.vocabulary import UserSchedulerParameters
+    from app.services.flashcard.schedulers import SCHEDULERS
+
+    if scheduler_data.algorithm not in SCHEDULERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown algorithm. Available: {', '.join(SCHEDULERS)}"
+        )
+
+    row = db.query(UserSchedulerParameters).filter(
+        UserSchedulerParameters.user_id == current_user.id
+    ).first()
+    if not row:
+        row = UserSchedulerParameters(user_id=current_user.id)
+        db.add(row)
+
+    row.algorithm = scheduler_data.algorithm
+    db.commit()
+
+    return {
+        "algorithm": row.algorithm,
+        "has_fitted_parameters": bool(row.parameters) and SCHEDULERS[row.algorithm].fits_parameters,
+        "available": list(SCHEDULERS)
+    }
+
+
+@router.get("/history/{vocabulary_id}")
+def get_review_history(
+    vocabulary_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """Get review totals for one word, including compacted history"""
+    from app.services.flashcard.review_archive import get_review_history_summary
+
+    user_vocab_id = db.query(UserVocabulary.id).filter(
         UserVocabulary.user_id == current_user.id,
-        Vocabulary.language_id == language_id,
-        UserVocabulary.next_review_date <= datetime.utcnow()
-    ).count()
+        UserVocabulary.vocabulary_id == vocabulary_id
+    ).scalar()
+
+    if not user_vocab_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Word not in your deck"
+        )
+
+    history = get_review_history_summary([user_vocab_id], db).get(user_vocab_id, {})
+
+    return {
+        "vocabulary_id": vocabulary_id,
+        "review_count": history.get("review_count", 0),
+        "correct_count": history.get("correct_count", 0),
+        "mean_quality": history.get("mean_quality"),
+        "last_quality": history.get("last_quality"),
+        "last_reviewed_at": history.get("last_reviewed_at")
+    }
+
+
+@router.get("/stats")
+def get_vocabulary_stats(
+    language_id: int = Query(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """Get vocabulary learning statistics"""
+    from app.services.flashcard.vocabulary_stats import get_vocabulary_stats as read_stats
+
+    stats = read_stats(current_user.id, language_id, db)
 
     return {
-        "total_words": total,
-        "mastered": mastered,
-        "learning": learning,
-        "due_for_review": due_count
+        "total_words": stats["total_words"],
+        "mastered": stats["mastered_words"],
+        "learning": stats["learning_words"],
+        "review": stats["review_words"],
+        "due_for_review": stats["due_for_review"]
     }
@@ -6,9 +6,11 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query
 from sqlalchemy.orm import Session
 from app.core.deps import get_db
 from app.services.websocket_manager import manager
+from app.services.ai.chat_context import count_tokens
 from app.models.chat import ChatConversation, ChatMessage
 from app.models.user import User
 from datetime import datetime
+from typing import Optional
 import json
 import logging
 
@@ -37,6 +39,18 @@ async def websocket_chat_endpoint(
         "is_typing": true | false,     // for type: typing
         "message_id": 123              // for type: read
     }
+
+    Every user message is answered by the AI, streamed to the conversation as
+    "assistant_start", then "assistant_token" frames ({"content": "..."}),
+    then a "message" frame with role "assistant" once the reply is saved.
+    With correction_mode "immediate" a "corrections" frame is pushed as soon
+    as the grammar analysis of the user message is ready.
+
+    Inbound frames are rate limited per connection; frames over the limit
+    are dropped, the first of them answered with
+    {"type": "error", "code": "rate_limited"}. Typing indicators reach the
+    other participants at most once per WS_TYPING_MIN_INTERVAL_SECONDS,
+    and "typing" expires after WS_TYPING_TIMEOUT_SECONDS unless repeated.
     """
 
     # TODO: Verify JWT token and get user
@@ -62,7 +76,7 @@ async def websocket_chat_endpoint(
         await manager.connect(websocket, user_id, conversation_id)
 
         # Send connection confirmation
-        await websocket.send_json({
+        await manager.send_to_socket(websocket, {
             "type": "connected",
             "conversation_id": conversation_id,
             "timestamp": datetime.utcnow().isoformat()
@@ -88,6 +102,9 @@ async def websocket_chat_endpoint(
 
                 message_type = message_data.get("type", "message")
 
+                if not manager.allow_frame(websocket, message_type):
+                    continue
+
                 if message_type == "message":
                     # Save message to database
                     content = message_data.get("content", "")
@@ -95,7 +112,8 @@ async def websocket_chat_endpoint(
                         new_message = ChatMessage(
                             conversation_id=conversation_id,
                             role="user",
-                            content=content
+                            content=content,
+                            tokens_used=count_tokens(content)
                         )
                         db.add(new_message)
                         db.commit()
@@ -115,6 +133,15 @@ async def websocket_chat_endpoint(
                             conversation_id
                         )
 
+                        await stream_assistant_reply(
+                            conversation_id,
+                            content,
+                            db,
+                            correction_mode=conversation.correction_mode or "immediate",
+                            user_message_id=new_message.id,
+                            user_id=user_id
+                        )
+
                 elif message_type == "typing":
                     # Send typing indicator
                     is_typing = message_data.get("is_typing", False)
@@ -141,7 +168,7 @@ async def websocket_chat_endpoint(
 
         except WebSocketDisconnect:
             # User disconnected
-            manager.disconnect(websocket, user_id, conversation_id)
+            await manager.disconnect(websocket)
 
             # Notify other participants
             await manager.broadcast_to_conversation(
@@ -157,7 +184,7 @@ async def websocket_chat_endpoint(
 
         except Exception as e:
             logger.error(f"WebSocket error: {e}")
-            manager.disconnect(websocket, user_id, conversation_id)
+            await manager.disconnect(websocket)
             await websocket.close(code=1011, reason="Internal server error")
 
     except Exception as e:
@@ -165,10 +192,76 @@ async def websocket_chat_endpoint(
         await websocket.close(code=1008, reason="Authentication failed")
 
 
+async def stream_assistant_reply(
+    conversation_id: int,
+    content: str,
+    db: Session,
+    correction_mode: str = "immediate",
+    user_message_id: Optional[int] = None,
+    user_id: Optional[int] = None
+):
+    """Stream the AI reply to a user message to everyone in the conversation"""
+    from app.services.ai.chat_stream import stream_assistant_message
+
+    await manager.broadcast_to_conversation(
+        {
+            "type": "assistant_start",
+            "conversation_id": conversation_id,
+            "timestamp": datetime.utcnow().isoformat()
+        },
+        conversation_id
+    )
+
+    async for event in stream_assistant_message(
+        conversation_id,
+        content,
+        db,
+        correction_mode=correction_mode,
+        user_message_id=user_message_id,
+        user_id=user_id
+    ):
+        if event["type"] == "token":
+            await manager.broadcast_to_conversation(
+                {
+                    "type": "assistant_token",
+                    "conversation_id": conversation_id,
+                    "content": event["content"]
+                },
+                conversation_id
+            )
+            continue
+
+        if event["type"] == "corrections":
+            await manager.broadcast_to_conversation(
+                {
+                    "type": "corrections",
+                    "conversation_id": conversation_id,
+                    "message_id": user_message_id,
+                    "corrections": event["corrections"]
+                },
+                conversation_id
+            )
+            continue
+
+        message = event["message"]
+        await manager.broadcast_to_conversation(
+            {
+                "type": "message",
+                "message_id": message["id"],
+                "conversation_id": conversation_id,
+                "role": "assistant",
+                "content": message["content"],
+                "corrections": message["corrections"],
+                "timestamp": message["created_at"]
+            },
+            conversation_id
+        )
+
+
 @router.get("/active-users/{conversation_id}")
-def get_active_users(conversation_id: int):
+async def get_active_users(conversation_id: int):
     """Get list of currently active users in a conversation"""
-    active_users = manager.get_active_users_in_conversation(conversation_id)
+    active_users = await manager.get_active_users_in_conversation(conversation_id)
     return {
         "conversation_id": conversation_id,
         "active_users": active_users,
@@ -177,9 +270,9 @@ def get_active_users(conversation_id: int):
 
 
 @router.get("/user-status/{user_id}")
-def check_user_online_status(user_id: int):
+async def check_user_online_status(user_id: int):
     """Check if a user is currently online"""
-    is_online = manager.is_user_online(user_id)
+    is_online = await manager.is_user_online(user_id)
     return {
         "user_id": user_id,
         "is_online": is_online
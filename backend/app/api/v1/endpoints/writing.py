@@ -1,5 +1,5 @@
-from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Any, Dict, List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 
 from app.core.dependencies import get_db, get_current_user
@@ -7,9 +7,15 @@ from app.models.user import User
 from app.models.writing import WritingSubmission, WritingEvaluation
 from pydantic import BaseModel
 from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Suggested client polling interval while an evaluation is running
+EVALUATION_POLL_SECONDS = 2
+
 
 class SubmitWritingRequest(BaseModel):
     language_id: int
@@ -30,6 +36,7 @@ class WritingSubmissionSchema(BaseModel):
     title: Optional[str]
     content: str
     word_count: Optional[int]
+    evaluation_status: str
     submitted_at: datetime
 
     class Config:
@@ -42,8 +49,8 @@ class WritingEvaluationSchema(BaseModel):
     grammar_score: Optional[float]
     vocabulary_score: Optional[float]
     coherence_score: Optional[float]
-    grammar_errors: Optional[dict]
-    vocabulary_suggestions: Optional[dict]
+    grammar_errors: Optional[Union[List[Any], Dict[str, Any]]]
+    vocabulary_suggestions: Optional[Union[List[Any], Dict[str, Any]]]
     ai_feedback: Optional[str]
     corrected_version: Optional[str]
 
@@ -51,13 +58,19 @@ class WritingEvaluationSchema(BaseModel):
         from_attributes = True
 
 
+class WritingStatusSchema(BaseModel):
+    submission_id: int
+    evaluation_status: str
+    evaluation: Optional[WritingEvaluationSchema] = None
+
+
 @router.post("/submit", response_model=WritingSubmissionSchema, status_code=status.HTTP_201_CREATED)
 async def submit_writing(
     writing_data: SubmitWritingRequest,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> Any:
-    """Submit a writing for evaluation"""
+    """Submit a writing; it is evaluated in the background (see /submissions/{id}/status)"""
     # Calculate word count
     word_count = len(writing_data.content.split())
 
@@ -76,21 +89,23 @@ async def submit_writing(
     db.commit()
     db.refresh(submission)
 
-    # Evaluate with AI
-    from app.services.ai.openai_service import evaluate_writing
+    # Evaluate with AI on a worker
+    from app.celery_worker import celery_app
+    from app.tasks.writing import evaluate_writing_submission
+    from app.services.ai.writing_evaluation import run_evaluation_in_process
 
-    evaluation_result = await evaluate_writing(
-        content=writing_data.content,
-        language_id=writing_data.language_id,
-        writing_type=writing_data.writing_type
-    )
+    queued = False
+    if not celery_app.conf.task_always_eager:
+        try:
+            evaluate_writing_submission.delay(submission.id)
+            queued = True
+        except Exception as e:
+            # Broker unreachable: evaluate here rather than leave the submission pending
+            logger.error(f"Could not queue evaluation of submission {submission.id}: {e!r}")
 
-    evaluation = WritingEvaluation(
-        submission_id=submission.id,
-        **evaluation_result
-    )
-    db.add(evaluation)
-    db.commit()
+    if not queued:
+        await run_evaluation_in_process(submission.id)
+        db.refresh(submission)
 
     return submission
 
@@ -114,6 +129,40 @@ def get_submissions(
     return query.order_by(WritingSubmission.submitted_at.desc()).offset(skip).limit(limit).all()
 
 
+@router.get("/submissions/{submission_id}/status", response_model=WritingStatusSchema)
+def get_evaluation_status(
+    submission_id: int,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """Poll the background evaluation of a submission"""
+    submission = db.query(WritingSubmission).filter(
+        WritingSubmission.id == submission_id,
+        WritingSubmission.user_id == current_user.id
+    ).first()
+
+    if not submission:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Submission not found"
+        )
+
+    evaluation = None
+    if submission.evaluation_status == "completed":
+        evaluation = db.query(WritingEvaluation).filter(
+            WritingEvaluation.submission_id == submission_id
+        ).first()
+    elif submission.evaluation_status in ("pending", "processing"):
+        response.headers["Retry-After"] = str(EVALUATION_POLL_SECONDS)
+
+    return {
+        "submission_id": submission.id,
+        "evaluation_status": submission.evaluation_status,
+        "evaluation": evaluation
+    }
+
+
 @router.get("/submissions/{submission_id}/evaluation", response_model=WritingEvaluationSchema)
 def get_evaluation(
     submission_id: int,
@@ -0,0 +1,26 @@
+"""
+Celery application for background jobs
+
+Run a worker with:
+    celery -A app.celery_worker worker --loglevel=info
+"""
+from celery import Celery
+from app.core.config import settings
+
+celery_app = Celery(
+    "language_learning",
+    broker=settings.CELERY_BROKER_URL,
+    backend=settings.CELERY_RESULT_BACKEND,
+    include=["app.tasks.writing"]
+)
+
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    task_acks_late=True,  # A task lost with its worker is redelivered
+    worker_prefetch_multiplier=1,  # AI calls are long; do not hoard tasks
+    task_always_eager=settings.CELERY_TASK_ALWAYS_EAGER,
+    task_eager_propagates=True,
+    timezone="UTC"
+)
@@ -27,6 +27,17 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str
     REDIS_CACHE_TTL: int = 3600
+    WS_BACKPLANE: str = "redis"  # redis (WebSocket broadcasts reach every worker) | local (single worker)
+    WS_PRESENCE_TTL_SECONDS: int = 30  # Presence of a worker that stops refreshing it expires
+    WS_SEND_QUEUE_SIZE: int = 256  # Outbound frames buffered per socket
+    WS_SLOW_CONSUMER_POLICY: str = "disconnect"  # When a socket's queue is full: disconnect | drop_oldest | drop_newest
+    WS_SEND_TIMEOUT_SECONDS: float = 10.0  # A socket taking longer to accept one frame is disconnected
+    WS_TYPING_MIN_INTERVAL_SECONDS: float = 1.0  # At most one typing change broadcast per user and conversation
+    WS_TYPING_TIMEOUT_SECONDS: float = 6.0  # "typing" expires unless the client repeats it
+    WS_RATE_LIMIT_MESSAGES_PER_MINUTE: int = 20  # Chat messages per socket (each gets an AI reply)
+    WS_RATE_LIMIT_MESSAGE_BURST: int = 5
+    WS_RATE_LIMIT_FRAMES_PER_SECOND: float = 10.0  # Other inbound frames per socket (typing, read, ...)
+    WS_RATE_LIMIT_FRAME_BURST: int = 20
 
     # CORS
     BACKEND_CORS_ORIGINS: List[AnyHttpUrl] = []
@@ -44,9 +55,48 @@ class Settings(BaseSettings):
     OPENAI_MODEL: str = "gpt-4"
     OPENAI_TEMPERATURE: float = 0.7
     OPENAI_MAX_TOKENS: int = 2000
+    OPENAI_CHAT_TIMEOUT_SECONDS: float = 60.0  # Chat reply (time to first token when streaming)
+    OPENAI_ANALYSIS_TIMEOUT_SECONDS: float = 20.0  # Grammar analysis of a user message
+    LLM_PROVIDER: str = "openai"  # openai | anthropic | router | mock (offline load testing)
+    LLM_MAX_CONCURRENCY: int = 32  # In-flight AI API calls per process
+    LLM_MAX_CONCURRENCY_PER_USER: int = 4  # In-flight AI API calls per user
+    LLM_MAX_CONNECTIONS: int = 64  # Pooled HTTP connections to the AI API
+    LLM_MAX_RETRIES: int = 3  # Retries on 429, 5xx, timeouts and connection errors
+    LLM_RETRY_BASE_DELAY_SECONDS: float = 0.5  # Doubled on every retry
+    LLM_RETRY_MAX_DELAY_SECONDS: float = 8.0
+    LLM_TIMEOUT_SECONDS: float = 60.0  # Default per-attempt timeout
+    CHAT_CONTEXT_MAX_TOKENS: int = 3000  # Prompt budget per chat turn
+    CHAT_CONTEXT_RECENT_TURNS: int = 6  # User/assistant turns sent verbatim
+    CHAT_SUMMARY_MAX_WORDS: int = 150  # Length of the rolling summary of older turns
+    LLM_ROUTER_PROVIDERS: str = "openai,anthropic"  # Candidates for LLM_PROVIDER=router
+    LLM_ROUTER_WINDOW: int = 200  # Recent calls per provider behind p95 and error rate
+    LLM_ROUTER_MIN_SAMPLES: int = 10  # Providers with fewer recent calls are tried first
+    LLM_ROUTER_EXPLORE_RATE: float = 0.05  # Share of calls routed in random order
+    LLM_ROUTER_ATTEMPT_TIMEOUT_SECONDS: float = 30.0  # Fail over to the next provider after this
+    LLM_ROUTER_HEDGE: bool = True  # Send a second request when the first is slow
+    LLM_ROUTER_HEDGE_DELAY_SECONDS: float = 0.0  # 0 = the first provider's recent p95
+    LLM_ROUTER_HEDGE_MIN_DELAY_SECONDS: float = 1.0
+    LLM_MOCK_SEED: int = 0
+    LLM_MOCK_LATENCY_DISTRIBUTION: str = "lognormal"  # fixed | uniform | normal | lognormal
+    LLM_MOCK_LATENCY_MEAN_MS: float = 800.0  # Whole reply, or first chunk when streaming
+    LLM_MOCK_LATENCY_STDDEV_MS: float = 300.0
+    LLM_MOCK_TOKEN_INTERVAL_MS: float = 30.0  # Between streamed words
+    LLM_MOCK_REPLY_WORDS: int = 40
+    LLM_MOCK_ERROR_RATE: float = 0.0  # Share of calls failing with a retryable error
+    LLM_STRUCTURED_OUTPUT_MODE: str = "function"  # function | json_mode (newer models) | prompt
+    LLM_STRUCTURED_OUTPUT_RETRIES: int = 1  # Re-asks after an unusable JSON reply
+    AI_CACHE_ENABLED: bool = True  # Reuse results of repeated analysis/evaluation prompts
+    AI_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    AI_CACHE_L1_MAX_ENTRIES: int = 2048  # In-process LRU in front of Redis
+    GRAMMAR_BATCH_ENABLED: bool = True  # Analyze chat messages in multi-message requests
+    GRAMMAR_BATCH_WINDOW_MS: float = 50.0  # How long the first message waits for others
+    GRAMMAR_BATCH_MAX_TOKENS: int = 2000  # Message tokens per request
+    GRAMMAR_BATCH_MAX_ITEMS: int = 20
 
     # Anthropic
     ANTHROPIC_API_KEY: Optional[str] = None
+    ANTHROPIC_MODEL: str = "claude-2.1"
+    ANTHROPIC_MAX_TOKENS: int = 1024  # When the caller sets no max_tokens
 
     # Email
     EMAILS_ENABLED: bool = False
@@ -68,6 +118,7 @@ class Settings(BaseSettings):
     # Celery
     CELERY_BROKER_URL: str
     CELERY_RESULT_BACKEND: str
+    CELERY_TASK_ALWAYS_EAGER: bool = False  # Run tasks in-process instead of on a worker (tests)
 
     # Logging
     LOG_LEVEL: str = "INFO"
@@ -75,6 +126,10 @@ class Settings(BaseSettings):
     # Spaced Repetition Settings
     FLASHCARD_NEW_CARDS_PER_DAY: int = 20
     FLASHCARD_REVIEW_CARDS_PER_DAY: int = 100
+    FLASHCARD_SCHEDULER: str = "sm2"  # sm2, fsrs
+    FLASHCARD_DESIRED_RETENTION: float = 0.9  # Target recall probability (fsrs)
+    FLASHCARD_FSRS_MIN_REVIEWS: int = 200  # History needed before fitting per-user parameters
+    FLASHCARD_REVIEW_RETENTION_DAYS: int = 365  # Older reviews are compacted into per-card summaries
 
     # Gamification
     XP_PER_FLASHCARD: int = 5
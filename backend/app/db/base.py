@@ -7,7 +7,10 @@ from app.models.vocabulary import (  # noqa
     Vocabulary,
     VocabularyCategory,
     UserVocabulary,
-    FlashcardReview
+    FlashcardReview,
+    FlashcardReviewSummary,
+    UserVocabularyStats,
+    UserSchedulerParameters
 )
 from app.models.exercise import (  # noqa
     Exercise,
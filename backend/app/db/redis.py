@@ -0,0 +1,9 @@
+import redis
+import redis.asyncio
+from app.core.config import settings
+
+# Shared Redis client (connections are opened lazily from the pool)
+redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+# Shared asyncio Redis client, for code running in the event loop
+async_redis_client = redis.asyncio.from_url(settings.REDIS_URL, decode_responses=True)
@@ -29,6 +29,30 @@ app.include_router(api_router, prefix=settings.API_V1_PREFIX)
 app.include_router(websocket.router, prefix=f"{settings.API_V1_PREFIX}/ws", tags=["WebSocket"])
 
 
+@app.on_event("startup")
+def load_prompts():
+    """Read the versioned system prompts once, before the first request"""
+    from app.services.ai.prompt_registry import prompt_registry
+
+    prompt_registry.load()
+
+
+@app.on_event("shutdown")
+async def close_llm_gateway():
+    """Close pooled connections to the AI API"""
+    from app.services.ai.llm_gateway import llm_gateway
+
+    await llm_gateway.close()
+
+
+@app.on_event("shutdown")
+async def leave_websocket_backplane():
+    """Drop this worker's WebSocket presence from Redis"""
+    from app.services.websocket_manager import manager
+
+    await manager.close()
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
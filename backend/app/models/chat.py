@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON, Boolean
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.session import Base
@@ -23,6 +23,10 @@ class ChatConversation(Base):
     difficulty_level = Column(String(20))  # easy, medium, hard
     correction_mode = Column(String(50), default="immediate")  # immediate, end, none
 
+    # Rolling summary of turns that no longer fit in the prompt
+    context_summary = Column(Text)
+    summary_through_message_id = Column(Integer)  # Last message folded into the summary
+
     # Status
     is_active = Column(Boolean, default=True)
     started_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -36,6 +40,10 @@ class ChatConversation(Base):
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Recent turns of a conversation (id > summary_through_message_id)
+        Index("ix_chat_messages_conversation_id_id", "conversation_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     conversation_id = Column(Integer, ForeignKey("chat_conversations.id"), nullable=False)
@@ -50,7 +58,7 @@ class ChatMessage(Base):
     feedback = Column(Text)
 
     # Metadata
-    tokens_used = Column(Integer)
+    tokens_used = Column(Integer)  # Tokens in content
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
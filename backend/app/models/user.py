@@ -33,6 +33,7 @@ class User(Base):
     xp = relationship("UserXP", back_populates="user", uselist=False)
     level = relationship("UserLevel", back_populates="user", uselist=False)
     streaks = relationship("Streak", back_populates="user")
+    assessments = relationship("LevelAssessment", back_populates="user")
 
 
 class UserProfile(Base):
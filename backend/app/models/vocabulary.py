@@ -1,5 +1,6 @@
 from sqlalchemy import (
-    Column, Integer, String, Text, ForeignKey, DateTime, JSON, Float, Boolean
+    Column, Integer, String, Text, ForeignKey, DateTime, JSON, Float, Boolean, Index,
+    UniqueConstraint
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -18,6 +19,10 @@ class VocabularyCategory(Base):
 
 class Vocabulary(Base):
     __tablename__ = "vocabulary"
+    __table_args__ = (
+        # Keyset pagination of new cards in frequency order
+        Index("ix_vocabulary_language_frequency", "language_id", "frequency", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     language_id = Column(Integer, ForeignKey("languages.id"), nullable=False)
@@ -59,10 +64,17 @@ class Vocabulary(Base):
 class UserVocabulary(Base):
     """Tracks user's vocabulary learning progress (flashcard system)"""
     __tablename__ = "user_vocabulary"
+    __table_args__ = (
+        # Due-queue lookups: WHERE user_id = ? AND next_review_date <= now
+        Index("ix_user_vocabulary_due", "user_id", "next_review_date", "status"),
+        # Anti-join probe for "is this word already in the user's deck"
+        Index("ix_user_vocabulary_user_vocabulary", "user_id", "vocabulary_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     vocabulary_id = Column(Integer, ForeignKey("vocabulary.id"), nullable=False)
+    language_id = Column(Integer, ForeignKey("languages.id"))  # Denormalized from vocabulary
 
     # Spaced Repetition Algorithm (SM-2) fields
     ease_factor = Column(Float, default=2.5)  # Ease factor (2.5 is default)
@@ -70,6 +82,10 @@ class UserVocabulary(Base):
     repetitions = Column(Integer, default=0)  # Number of successful repetitions
     next_review_date = Column(DateTime(timezone=True))
 
+    # Memory model (FSRS) fields, unset until the card is scheduled by it
+    stability = Column(Float)  # Days until recall probability drops to 90%
+    difficulty = Column(Float)  # 1 (easy) to 10 (hard)
+
     # Learning status
     status = Column(String(20), default="new")  # new, learning, review, mastered
     times_reviewed = Column(Integer, default=0)
@@ -93,6 +109,12 @@ class UserVocabulary(Base):
 class FlashcardReview(Base):
     """Individual review history for flashcards"""
     __tablename__ = "flashcard_reviews"
+    __table_args__ = (
+        # Per-card history in review order
+        Index("ix_flashcard_reviews_user_vocabulary_reviewed", "user_vocabulary_id", "reviewed_at"),
+        # Time-range scans (compaction, activity histograms)
+        Index("ix_flashcard_reviews_reviewed_at", "reviewed_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_vocabulary_id = Column(Integer, ForeignKey("user_vocabulary.id"), nullable=False)
@@ -108,3 +130,61 @@ class FlashcardReview(Base):
 
     # Relationships
     user_vocabulary = relationship("UserVocabulary", back_populates="reviews")
+
+
+class FlashcardReviewSummary(Base):
+    """Compacted review history: one row per card for reviews past the retention window"""
+    __tablename__ = "flashcard_review_summaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_vocabulary_id = Column(Integer, ForeignKey("user_vocabulary.id"), unique=True, nullable=False)
+
+    # Aggregates over the compacted reviews
+    review_count = Column(Integer, default=0, nullable=False)
+    correct_count = Column(Integer, default=0, nullable=False)
+    mean_quality = Column(Float)  # Mean of the 0-5 quality ratings
+    last_quality = Column(Integer)  # Quality of the latest compacted review
+
+    first_reviewed_at = Column(DateTime(timezone=True))
+    last_reviewed_at = Column(DateTime(timezone=True))
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class UserVocabularyStats(Base):
+    """Per-language deck counters, kept in step with user_vocabulary status changes"""
+    __tablename__ = "user_vocabulary_stats"
+    __table_args__ = (
+        UniqueConstraint("user_id", "language_id", name="uq_user_vocabulary_stats_user_language"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    language_id = Column(Integer, ForeignKey("languages.id"), nullable=False)
+
+    # Counters
+    total_words = Column(Integer, default=0, nullable=False)
+    learning_words = Column(Integer, default=0, nullable=False)
+    review_words = Column(Integer, default=0, nullable=False)
+    mastered_words = Column(Integer, default=0, nullable=False)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class UserSchedulerParameters(Base):
+    """Scheduler choice and fitted scheduler parameters per user"""
+    __tablename__ = "user_scheduler_parameters"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
+
+    algorithm = Column(String(20), default="sm2", nullable=False)  # sm2, fsrs
+    parameters = Column(JSON)  # Fitted parameter vector, None for defaults
+
+    # Fit diagnostics
+    review_count = Column(Integer)
+    log_loss = Column(Float)
+    fitted_at = Column(DateTime(timezone=True))
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -27,6 +27,9 @@ class WritingSubmission(Base):
     # XP earned
     xp_earned = Column(Integer)
 
+    # AI evaluation runs in the background: pending, processing, completed, failed
+    evaluation_status = Column(String(20), nullable=False, default="pending", server_default="pending")
+
     # Dates
     submitted_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
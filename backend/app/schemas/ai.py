@@ -0,0 +1,76 @@
+"""
+Shapes of the JSON the AI services ask the model for
+
+Each task's reply is validated against its schema before use. Scores are
+clamped to 0-100 rather than rejected, since a model answering 105 still
+gave a usable evaluation.
+"""
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field, field_validator
+
+
+def _clamp_score(value: Any) -> float:
+    return min(max(float(value), 0.0), 100.0)
+
+
+# Grammar analysis of a chat message
+class GrammarCorrection(BaseModel):
+    original: str
+    corrected: str
+    explanation: Optional[str] = None
+
+
+class GrammarAnalysis(BaseModel):
+    has_errors: bool
+    corrections: List[GrammarCorrection] = Field(default_factory=list)
+
+
+# Grammar analysis of several chat messages in one request
+class GrammarBatchItem(GrammarAnalysis):
+    id: int = Field(description="Number of the text")
+
+
+class GrammarBatchAnalysis(BaseModel):
+    results: List[GrammarBatchItem]
+
+
+# Writing evaluation
+class WritingEvaluationOutput(BaseModel):
+    overall_score: float = Field(description="0-100")
+    grammar_score: float = Field(description="0-100")
+    vocabulary_score: float = Field(description="0-100")
+    coherence_score: float = Field(description="0-100")
+    style_score: float = Field(description="0-100")
+    grammar_errors: List[Dict[str, Any]] = Field(
+        default_factory=list, description="Each with error, correction and explanation"
+    )
+    vocabulary_suggestions: List[Dict[str, Any]] = Field(
+        default_factory=list, description="Each with original and suggestion"
+    )
+    feedback: str = Field(description="Overall feedback for the learner")
+    corrected_version: str = Field(description="The full text with all corrections applied")
+
+    _scores = field_validator(
+        "overall_score", "grammar_score", "vocabulary_score", "coherence_score", "style_score", mode="before"
+    )(_clamp_score)
+
+
+# Pronunciation evaluation of a transcription
+class PronunciationScores(BaseModel):
+    pronunciation: float = Field(description="0-100")
+    fluency: float = Field(description="0-100")
+    accuracy: float = Field(description="0-100")
+
+    _scores = field_validator("pronunciation", "fluency", "accuracy", mode="before")(_clamp_score)
+
+
+# Generated exercise
+class ExerciseQuestion(BaseModel):
+    question: str
+    options: Optional[List[str]] = None
+    answer: Any
+    explanation: Optional[str] = None
+
+
+class ExerciseContent(BaseModel):
+    questions: List[ExerciseQuestion]
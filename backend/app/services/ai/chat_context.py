@@ -0,0 +1,185 @@
+"""
+Token-budgeted chat context
+
+Instead of sending the whole conversation on every turn, the prompt is
+built from:
+- the conversation's system prompt, from the prompt registry (always
+  first and identical across conversations with the same persona, so it
+  can be cached by the provider as a prompt prefix)
+- a rolling summary of older turns, stored on the conversation
+- the turns not yet summarized: at least the last CHAT_CONTEXT_RECENT_TURNS
+  and at most twice as many, trimmed further if they do not fit in
+  CHAT_CONTEXT_MAX_TOKENS
+
+Turns that fall out of the window are folded into the summary with one
+short completion and are never sent again. Message token counts are
+cached in ChatMessage.tokens_used so history is only tokenized once.
+"""
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional
+import tiktoken
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.chat import ChatConversation, ChatMessage
+from app.services.ai.llm_gateway import llm_gateway
+from app.services.ai.prompt_registry import prompt_registry
+
+logger = logging.getLogger(__name__)
+
+# Per-message overhead of the chat format, and the reply primer
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+
+SUMMARY_PROMPT = """Summarize the earlier part of a language-learning conversation between a learner and an AI tutor.
+Keep what the tutor needs to continue naturally: topics discussed, facts the learner shared about themselves,
+the role-play situation if any, and mistakes the learner keeps making. Write at most {words} words.
+
+Previous summary:
+{summary}
+
+New turns:
+{turns}
+"""
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str) -> Optional[tiktoken.Encoding]:
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable, estimating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Number of tokens in text for the chat model"""
+    encoding = _encoding(model or settings.OPENAI_MODEL)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text or ""))
+
+
+@lru_cache(maxsize=256)
+def _prompt_tokens(prompt: str) -> int:
+    # Registry prompts are shared by many conversations: counted once
+    return count_tokens(prompt) + TOKENS_PER_MESSAGE
+
+
+def _system_prompt(conversation_id: int, conversation: Optional[ChatConversation], db: Session) -> Optional[str]:
+    if conversation and conversation.ai_personality_prompt:
+        return prompt_registry.get(conversation.ai_personality_prompt)
+
+    # Conversations created before the registry have their prompt as a message
+    system_message = db.query(ChatMessage).filter(
+        ChatMessage.conversation_id == conversation_id,
+        ChatMessage.role == "system"
+    ).order_by(ChatMessage.id).first()
+    return system_message.content if system_message else None
+
+
+def _message_tokens(message: ChatMessage) -> int:
+    if message.tokens_used is None:
+        message.tokens_used = count_tokens(message.content)
+    return message.tokens_used + TOKENS_PER_MESSAGE
+
+
+async def _summarize(
+    previous: Optional[str],
+    turns: List[ChatMessage],
+    user_id: Optional[int] = None
+) -> Optional[str]:
+    transcript = "\n".join(f"{message.role}: {message.content}" for message in turns)
+    prompt = SUMMARY_PROMPT.format(
+        words=settings.CHAT_SUMMARY_MAX_WORDS,
+        summary=previous or "(none)",
+        turns=transcript
+    )
+
+    try:
+        response = await llm_gateway.chat(
+            [{"role": "user", "content": prompt}],
+            user_id=user_id,
+            timeout=settings.OPENAI_ANALYSIS_TIMEOUT_SECONDS,
+            temperature=0.3,
+            max_tokens=settings.CHAT_SUMMARY_MAX_WORDS * 2
+        )
+        return response.content.strip()
+    except Exception as e:
+        logger.warning(f"Conversation summary failed: {e!r}")
+        return None
+
+
+async def build_context(
+    conversation_id: int,
+    user_message: str,
+    db: Session,
+    user_id: Optional[int] = None
+) -> List[Dict[str, str]]:
+    """
+    Build the prompt for the next reply in a conversation
+
+    Args:
+        conversation_id: Conversation ID
+        user_message: New user message (may already be saved as the last message)
+        db: Database session
+        user_id: User the summary call is made for
+
+    Returns:
+        Messages in OpenAI format
+    """
+    conversation = db.query(ChatConversation).filter(ChatConversation.id == conversation_id).first()
+    summary = conversation.context_summary if conversation else None
+    summarized_through = (conversation.summary_through_message_id if conversation else None) or 0
+
+    system_prompt = _system_prompt(conversation_id, conversation, db)
+
+    # Only turns that are not in the summary yet are loaded
+    turns = db.query(ChatMessage).filter(
+        ChatMessage.conversation_id == conversation_id,
+        ChatMessage.role.in_(["user", "assistant"]),
+        ChatMessage.id > summarized_through
+    ).order_by(ChatMessage.id).all()
+
+    # The endpoints save the user message before asking for a reply
+    if turns and turns[-1].role == "user" and turns[-1].content == user_message:
+        turns = turns[:-1]
+
+    budget = settings.CHAT_CONTEXT_MAX_TOKENS - TOKENS_PER_REPLY
+    budget -= count_tokens(user_message) + TOKENS_PER_MESSAGE
+    if system_prompt:
+        budget -= _prompt_tokens(system_prompt)
+    if summary:
+        budget -= count_tokens(summary) + TOKENS_PER_MESSAGE
+
+    # Unsummarized turns are sent as-is until there are twice the window's
+    # worth (or they overflow the budget); then they are cut back to the last
+    # K turns, so the summary is only rewritten once every K turns
+    window = settings.CHAT_CONTEXT_RECENT_TURNS * 2
+    keep = turns
+    if len(keep) > 2 * window or sum(_message_tokens(message) for message in keep) > budget:
+        keep = keep[-window:]
+        while keep and sum(_message_tokens(message) for message in keep) > budget:
+            keep = keep[1:]
+    folded = turns[:len(turns) - len(keep)]
+
+    if folded and conversation:
+        new_summary = await _summarize(summary, folded, user_id=user_id)
+        if new_summary:
+            summary = new_summary
+            conversation.context_summary = new_summary
+            conversation.summary_through_message_id = folded[-1].id
+
+    db.commit()  # Persists the summary and newly counted tokens_used
+
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    if summary:
+        messages.append({"role": "system", "content": f"Summary of the conversation so far: {summary}"})
+    messages.extend({"role": message.role, "content": message.content} for message in keep)
+    messages.append({"role": "user", "content": user_message})
+
+    return messages
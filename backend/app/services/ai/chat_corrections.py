@@ -0,0 +1,93 @@
+"""
+Grammar corrections for chat messages
+
+When corrections are delivered depends on ChatConversation.correction_mode:
+- immediate: analysis runs concurrently with the AI reply and is delivered
+  with it (over the WebSocket, as soon as it is ready)
+- end: analysis runs in the background, is written to the user's
+  ChatMessage when ready and pushed as a summary when the conversation ends
+- none: messages are not analyzed
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.chat import ChatMessage
+from app.services.ai.grammar_batcher import grammar_batcher
+from app.services.ai.openai_service import analyze_message_for_errors
+
+logger = logging.getLogger(__name__)
+
+CORRECTION_MODES = ("immediate", "end", "none")
+
+# Background analyses per conversation, so ending a conversation can wait for them
+_pending: Dict[int, Set[asyncio.Task]] = {}
+
+
+def store_corrections(message_id: int, corrections: Optional[Dict], db: Session) -> None:
+    """Write analysis results to a user message"""
+    message = db.query(ChatMessage).filter(ChatMessage.id == message_id).first()
+    if not message:
+        return
+    message.has_errors = bool(corrections)
+    message.corrections = corrections
+    db.commit()
+
+
+async def _analyze_in_background(message_id: int, content: str, user_id: Optional[int]) -> None:
+    if settings.GRAMMAR_BATCH_ENABLED:
+        # The batch writes the result to the message
+        await grammar_batcher.analyze(content, user_id=user_id, message_id=message_id)
+        return
+
+    corrections = await analyze_message_for_errors(content, user_id=user_id)
+
+    db = SessionLocal()
+    try:
+        store_corrections(message_id, corrections, db)
+    except Exception as e:
+        logger.error(f"Failed to store corrections for message {message_id}: {e}")
+    finally:
+        db.close()
+
+
+def defer_corrections(
+    conversation_id: int,
+    message_id: int,
+    content: str,
+    user_id: Optional[int] = None
+) -> None:
+    """Analyze a user message in the background (correction_mode "end")"""
+    task = asyncio.create_task(_analyze_in_background(message_id, content, user_id))
+    tasks = _pending.setdefault(conversation_id, set())
+    tasks.add(task)
+
+    def forget(done: asyncio.Task) -> None:
+        tasks.discard(done)
+        if not tasks:
+            _pending.pop(conversation_id, None)
+
+    task.add_done_callback(forget)
+
+
+async def wait_for_deferred_corrections(conversation_id: int, timeout: float) -> None:
+    """Wait for background analyses of a conversation to finish"""
+    tasks = list(_pending.get(conversation_id, ()))
+    if tasks:
+        await asyncio.wait(tasks, timeout=timeout)
+
+
+def get_conversation_corrections(conversation_id: int, db: Session) -> List[Dict[str, Any]]:
+    """Corrections found in a conversation's user messages"""
+    messages = db.query(ChatMessage).filter(
+        ChatMessage.conversation_id == conversation_id,
+        ChatMessage.role == "user",
+        ChatMessage.has_errors.is_(True)
+    ).order_by(ChatMessage.created_at).all()
+
+    return [
+        {"message_id": message.id, "content": message.content, "corrections": message.corrections}
+        for message in messages
+    ]
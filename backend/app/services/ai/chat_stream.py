@@ -0,0 +1,105 @@
+"""
+Streaming assistant replies
+
+Shared by the SSE chat endpoint and the chat WebSocket. Text is forwarded
+as it is generated and the assistant message is persisted once the stream
+completes. If the client goes away mid-stream, the partial reply is still
+saved so the conversation history stays consistent.
+"""
+import asyncio
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional
+from sqlalchemy.orm import Session
+from app.models.chat import ChatMessage
+from app.services.ai.chat_context import count_tokens
+from app.services.ai.chat_corrections import defer_corrections
+from app.services.ai.openai_service import stream_chat_response, analyze_message_for_errors
+
+
+def save_assistant_message(
+    conversation_id: int,
+    content: str,
+    corrections: Optional[Dict],
+    db: Session
+) -> ChatMessage:
+    """Persist an assistant reply"""
+    message = ChatMessage(
+        conversation_id=conversation_id,
+        role="assistant",
+        content=content,
+        corrections=corrections,
+        tokens_used=count_tokens(content)
+    )
+    db.add(message)
+    db.commit()
+    db.refresh(message)
+    return message
+
+
+def serialize_message(message: ChatMessage) -> Dict[str, Any]:
+    """Message fields as returned by the chat API"""
+    return {
+        "id": message.id,
+        "role": message.role,
+        "content": message.content,
+        "has_errors": bool(message.has_errors),
+        "corrections": message.corrections,
+        "feedback": message.feedback,
+        "created_at": (message.created_at or datetime.utcnow()).isoformat()
+    }
+
+
+async def stream_assistant_message(
+    conversation_id: int,
+    user_message: str,
+    db: Session,
+    correction_mode: str = "immediate",
+    user_message_id: Optional[int] = None,
+    user_id: Optional[int] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Generate, forward and persist the assistant reply to a user message
+
+    Grammar analysis of the user message follows correction_mode: with
+    "immediate" it runs concurrently with the reply, with "end" it is
+    deferred to the background (see chat_corrections).
+
+    Yields:
+        {"type": "token", "content": ...} for every chunk of text,
+        {"type": "corrections", "corrections": ...} as soon as the analysis
+        is ready ("immediate" only), then
+        {"type": "message_complete", "message": ...} once the reply is saved
+    """
+    analysis = None
+    if correction_mode == "immediate":
+        analysis = asyncio.create_task(analyze_message_for_errors(user_message, user_id=user_id))
+    elif correction_mode == "end" and user_message_id:
+        defer_corrections(conversation_id, user_message_id, user_message, user_id=user_id)
+
+    parts = []
+    completed = False
+    corrections_sent = False
+
+    try:
+        async for delta in stream_chat_response(conversation_id, user_message, db, user_id=user_id):
+            parts.append(delta)
+            yield {"type": "token", "content": delta}
+
+            if analysis and analysis.done() and not corrections_sent:
+                corrections_sent = True
+                yield {"type": "corrections", "corrections": analysis.result()}
+        completed = True
+    finally:
+        if not completed:
+            if analysis:
+                analysis.cancel()
+            if parts:
+                save_assistant_message(conversation_id, "".join(parts), None, db)
+
+    corrections = await analysis if analysis else None
+    if analysis and not corrections_sent:
+        yield {"type": "corrections", "corrections": corrections}
+
+    message = save_assistant_message(conversation_id, "".join(parts), corrections, db)
+
+    yield {"type": "message_complete", "message": serialize_message(message)}
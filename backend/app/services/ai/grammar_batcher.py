@@ -0,0 +1,218 @@
+"""
+Batched grammar analysis of chat messages
+
+Every user message is checked for grammar, which is one small request per
+message. With GRAMMAR_BATCH_ENABLED, messages from all conversations are
+collected for up to GRAMMAR_BATCH_WINDOW_MS and sent as one numbered,
+multi-text request, up to GRAMMAR_BATCH_MAX_TOKENS of message text or
+GRAMMAR_BATCH_MAX_ITEMS messages (a full batch goes out at once).
+
+The reply is split back per text by number: each caller gets its own
+analysis, and messages given with a message_id have their ChatMessage row
+updated in one transaction per batch. A message alone in its window is
+sent with the single-message prompt, and texts missing from a batch reply
+are asked for on their own. Results are cached per text like other
+analyses.
+
+Batches mix users, so they count against the global AI concurrency limit
+only, not the per-user one.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.chat import ChatMessage
+from app.schemas.ai import GrammarAnalysis, GrammarBatchAnalysis
+from app.services.ai.chat_context import count_tokens
+from app.services.ai.openai_service import GRAMMAR_PROMPT
+from app.services.ai.response_cache import cached_result
+from app.services.ai.structured_output import structured_chat
+
+logger = logging.getLogger(__name__)
+
+BATCH_PROMPT = """Analyze each of the following numbered texts for grammar, spelling, and usage errors.
+The texts are unrelated messages; analyze each one on its own.
+Return one result per text with its number as id. List each error with its correction and a short
+explanation; set has_errors to false for texts without errors.
+
+{texts}
+"""
+
+
+@dataclass
+class _Item:
+    text: str
+    tokens: int
+    user_id: Optional[int]
+    message_id: Optional[int]
+    future: asyncio.Future
+
+
+class GrammarBatcher:
+    """Coalesces grammar analyses into multi-message requests"""
+
+    def __init__(self):
+        self._items: List[_Item] = []
+        self._tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batches: Set[asyncio.Task] = set()
+        self._stats = {"items": 0, "batches": 0, "batched_items": 0, "single_requests": 0, "failed_batches": 0}
+
+    async def analyze(
+        self,
+        text: str,
+        user_id: Optional[int] = None,
+        message_id: Optional[int] = None
+    ) -> Optional[Dict]:
+        """
+        Analyze a message in the next batch
+
+        Args:
+            text: Message text
+            user_id: User the message is from
+            message_id: ChatMessage to write the result to, if any
+
+        Returns:
+            Corrections, or None if there are no errors or the analysis failed
+        """
+        item: Optional[_Item] = None
+
+        async def compute() -> Dict[str, Any]:
+            nonlocal item
+            item = self._enqueue(text, user_id, message_id)
+            return await item.future
+
+        try:
+            result = await cached_result(
+                "grammar", [{"role": "user", "content": text}], {"schema": "GrammarAnalysis"}, compute
+            )
+        except Exception as e:
+            logger.warning(f"Grammar analysis failed: {e!r}")
+            return None
+
+        corrections = result if result["has_errors"] else None
+        # Cache hits and coalesced duplicates were not part of a batch
+        if message_id is not None and item is None:
+            self._store({message_id: corrections})
+        return corrections
+
+    def _enqueue(self, text: str, user_id: Optional[int], message_id: Optional[int]) -> _Item:
+        loop = asyncio.get_running_loop()
+        item = _Item(text, count_tokens(text), user_id, message_id, loop.create_future())
+        self._stats["items"] += 1
+
+        if self._items and self._tokens + item.tokens > settings.GRAMMAR_BATCH_MAX_TOKENS:
+            self._flush()
+        self._items.append(item)
+        self._tokens += item.tokens
+
+        if len(self._items) >= settings.GRAMMAR_BATCH_MAX_ITEMS or self._tokens >= settings.GRAMMAR_BATCH_MAX_TOKENS:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(settings.GRAMMAR_BATCH_WINDOW_MS / 1000, self._flush)
+        return item
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._items, self._tokens = self._items, [], 0
+        if not items:
+            return
+
+        task = asyncio.ensure_future(self._run(items))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def _analyze_one(self, item: _Item) -> GrammarAnalysis:
+        self._stats["single_requests"] += 1
+        return await structured_chat(
+            GrammarAnalysis,
+            "grammar",
+            [{"role": "user", "content": GRAMMAR_PROMPT.format(message=item.text)}],
+            user_id=item.user_id,
+            timeout=settings.OPENAI_ANALYSIS_TIMEOUT_SECONDS,
+            cache=False,
+            temperature=0.3
+        )
+
+    async def _analyze_batch(self, items: List[_Item]) -> Dict[int, GrammarAnalysis]:
+        self._stats["batches"] += 1
+        self._stats["batched_items"] += len(items)
+        texts = "\n".join(f"[{number}] {item.text}" for number, item in enumerate(items, 1))
+
+        analysis = await structured_chat(
+            GrammarBatchAnalysis,
+            "grammar_batch",
+            [{"role": "user", "content": BATCH_PROMPT.format(texts=texts)}],
+            timeout=settings.OPENAI_ANALYSIS_TIMEOUT_SECONDS,
+            cache=False,
+            temperature=0.3
+        )
+        return {result.id: GrammarAnalysis.model_validate(result.model_dump()) for result in analysis.results}
+
+    async def _run(self, items: List[_Item]) -> None:
+        results: Dict[int, GrammarAnalysis] = {}
+        try:
+            if len(items) == 1:
+                results[1] = await self._analyze_one(items[0])
+            else:
+                results = await self._analyze_batch(items)
+        except Exception as e:
+            self._stats["failed_batches"] += 1
+            for item in items:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        # Texts the reply skipped are asked for separately
+        missing = [number for number in range(1, len(items) + 1) if number not in results]
+        if missing:
+            logger.info(f"Grammar batch reply skipped {len(missing)} of {len(items)} texts")
+            answers = await asyncio.gather(
+                *[self._analyze_one(items[number - 1]) for number in missing], return_exceptions=True
+            )
+            results.update(zip(missing, answers))
+
+        stored = {}
+        for number, item in enumerate(items, 1):
+            result = results[number]
+            if item.future.done():
+                continue
+            if isinstance(result, Exception):
+                item.future.set_exception(result)
+                continue
+            item.future.set_result(result.model_dump())
+            if item.message_id is not None:
+                stored[item.message_id] = result.model_dump() if result.has_errors else None
+
+        if stored:
+            self._store(stored)
+
+    @staticmethod
+    def _store(corrections: Dict[int, Optional[Dict]]) -> None:
+        """Write analysis results to their user messages"""
+        db = SessionLocal()
+        try:
+            for message in db.query(ChatMessage).filter(ChatMessage.id.in_(list(corrections))):
+                message.has_errors = bool(corrections[message.id])
+                message.corrections = corrections[message.id]
+            db.commit()
+        except Exception as e:
+            logger.error(f"Failed to store corrections for messages {sorted(corrections)}: {e}")
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Batching counters of this process"""
+        batches = self._stats["batches"]
+        return {
+            **self._stats,
+            "pending": len(self._items),
+            "average_batch_size": round(self._stats["batched_items"] / batches, 2) if batches else 0.0
+        }
+
+
+grammar_batcher = GrammarBatcher()
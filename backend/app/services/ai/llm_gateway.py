@@ -0,0 +1,190 @@
+"""
+Shared async gateway for every LLM and audio API call
+
+All AI services go through the llm_gateway singleton, which provides:
+- one provider backend (LLM_PROVIDER, see app.services.ai.providers),
+  created lazily and closed on shutdown
+- a global concurrency limit and a per-user limit, so one burst of users
+  (or one user opening many tabs) cannot exhaust the provider rate limit
+- exponential backoff with jitter on errors the provider reports as
+  retryable and on timeouts, honoring Retry-After when the provider sends it
+- a timeout on every call
+
+Streams hold their concurrency slots until they finish and are only
+retried before the first chunk arrives.
+"""
+import asyncio
+import logging
+import random
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, BinaryIO, Dict, List, Optional
+from app.core.config import settings
+from app.services.ai.providers import ChatResult, LLMProvider, get_provider
+
+logger = logging.getLogger(__name__)
+
+
+class LLMGateway:
+    """Rate-limited and retrying access to the configured AI provider"""
+
+    def __init__(self):
+        self._provider: Optional[LLMProvider] = None
+        self._global_slots = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        self._user_slots: Dict[int, asyncio.Semaphore] = {}
+        self._user_waiters: Dict[int, int] = {}
+
+    @property
+    def provider(self) -> LLMProvider:
+        if self._provider is None:
+            self._provider = get_provider()
+        return self._provider
+
+    async def close(self) -> None:
+        """Close the provider's connections"""
+        if self._provider is not None:
+            await self._provider.close()
+            self._provider = None
+
+    @asynccontextmanager
+    async def _slot(self, user_id: Optional[int]):
+        """Hold one global slot and, for a known user, one of their slots"""
+        if user_id is None:
+            async with self._global_slots:
+                yield
+            return
+
+        user_slots = self._user_slots.setdefault(
+            user_id, asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY_PER_USER)
+        )
+        self._user_waiters[user_id] = self._user_waiters.get(user_id, 0) + 1
+        try:
+            async with user_slots, self._global_slots:
+                yield
+        finally:
+            self._user_waiters[user_id] -= 1
+            if not self._user_waiters[user_id]:
+                del self._user_waiters[user_id]
+                del self._user_slots[user_id]
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying, or None if the error is final"""
+        if not isinstance(error, asyncio.TimeoutError):
+            if not self.provider.is_retryable(error):
+                return None
+            retry_after = self.provider.retry_after(error)
+            if retry_after is not None:
+                return min(retry_after, settings.LLM_RETRY_MAX_DELAY_SECONDS)
+
+        delay = settings.LLM_RETRY_BASE_DELAY_SECONDS * 2 ** attempt
+        return min(delay, settings.LLM_RETRY_MAX_DELAY_SECONDS) * random.uniform(0.5, 1.0)
+
+    async def _call(self, request, user_id: Optional[int], timeout: Optional[float]):
+        timeout = timeout or settings.LLM_TIMEOUT_SECONDS
+
+        async with self._slot(user_id):
+            for attempt in range(settings.LLM_MAX_RETRIES + 1):
+                try:
+                    return await asyncio.wait_for(request(), timeout=timeout)
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt)
+                    if delay is None or attempt == settings.LLM_MAX_RETRIES:
+                        raise
+                    logger.warning(f"LLM call failed ({e!r}), retry {attempt + 1} in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        user_id: Optional[int] = None,
+        timeout: Optional[float] = None,
+        **params: Any
+    ) -> ChatResult:
+        """
+        Create a chat completion
+
+        Args:
+            messages: Chat messages
+            user_id: User the call is made for (per-user limit)
+            timeout: Seconds per attempt (defaults to LLM_TIMEOUT_SECONDS)
+            **params: Extra completion parameters (temperature, max_tokens, ...)
+
+        Returns:
+            ChatResult with the reply text
+        """
+        return await self._call(
+            lambda: self.provider.chat(messages, **params),
+            user_id,
+            timeout
+        )
+
+    async def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        user_id: Optional[int] = None,
+        timeout: Optional[float] = None,
+        **params: Any
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat completion as text chunks
+
+        The timeout applies to the first chunk; retries only happen before it.
+        """
+        timeout = timeout or settings.LLM_TIMEOUT_SECONDS
+
+        async with self._slot(user_id):
+            for attempt in range(settings.LLM_MAX_RETRIES + 1):
+                stream = self.provider.chat_stream(messages, **params)
+                try:
+                    first = await asyncio.wait_for(stream.__anext__(), timeout=timeout)
+                    break
+                except StopAsyncIteration:
+                    return
+                except Exception as e:
+                    await stream.aclose()
+                    delay = self._retry_delay(e, attempt)
+                    if delay is None or attempt == settings.LLM_MAX_RETRIES:
+                        raise
+                    logger.warning(f"LLM stream failed ({e!r}), retry {attempt + 1} in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+
+            try:
+                yield first
+                async for chunk in stream:
+                    yield chunk
+            finally:
+                # Lets the provider free its connection if the consumer stops early
+                await stream.aclose()
+
+    async def transcribe(
+        self,
+        audio_file: BinaryIO,
+        user_id: Optional[int] = None,
+        timeout: Optional[float] = None,
+        model: str = "whisper-1"
+    ) -> str:
+        """Transcribe speech audio"""
+        async def request():
+            audio_file.seek(0)
+            return await self.provider.transcribe(audio_file, model=model)
+
+        return await self._call(request, user_id, timeout)
+
+    async def speech(
+        self,
+        text: str,
+        voice: str = "alloy",
+        user_id: Optional[int] = None,
+        timeout: Optional[float] = None,
+        model: str = "tts-1",
+        speed: float = 1.0
+    ) -> bytes:
+        """Synthesize speech audio (mp3)"""
+        return await self._call(
+            lambda: self.provider.speech(text, voice=voice, model=model, speed=speed),
+            user_id,
+            timeout
+        )
+
+
+# Singleton instance
+llm_gateway = LLMGateway()
@@ -1,13 +1,13 @@
 """
 OpenAI GPT-4 integration for chat, evaluation, and content generation
 """
-import openai
-from typing import Optional, Dict, Any, List, Tuple
+import asyncio
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
 from sqlalchemy.orm import Session
 from app.core.config import settings
-from app.models.chat import ChatMessage
-
-openai.api_key = settings.OPENAI_API_KEY
+from app.services.ai.llm_gateway import llm_gateway
+from app.services.ai.structured_output import structured_chat
+from app.schemas.ai import ExerciseContent, GrammarAnalysis, WritingEvaluationOutput
 
 
 def get_initial_chat_prompt(
@@ -15,119 +15,145 @@ def get_initial_chat_prompt(
     scenario: Optional[str] = None,
     character: Optional[str] = "friendly_tutor"
 ) -> str:
-    """Generate initial system prompt for chat conversation"""
-
-    base_prompts = {
-        "friendly_tutor": "You are a friendly and encouraging language tutor. Help the user practice the language naturally, correct their mistakes gently, and provide helpful explanations.",
-        "strict_teacher": "You are a strict but fair language teacher. Focus on accuracy and correct all mistakes immediately. Provide detailed grammar explanations.",
-        "native_speaker": "You are a native speaker having a casual conversation. Speak naturally and help the user understand colloquial expressions and cultural context.",
-        "professional": "You are a professional language instructor. Provide structured lessons and systematic feedback."
-    }
-
-    scenario_prompts = {
-        "restaurant": "We are role-playing a restaurant scenario. You are a waiter/waitress. Help the user practice ordering food, asking questions about the menu, and making requests.",
-        "airport": "We are role-playing an airport scenario. You are an airline staff member. Help the user practice check-in, asking about flights, and handling travel situations.",
-        "job_interview": "We are role-playing a job interview. You are the interviewer. Ask professional questions and help the user practice formal language.",
-        "shopping": "We are role-playing a shopping scenario. You are a shop assistant. Help the user practice asking about products, prices, and making purchases.",
-        "doctor": "We are role-playing a medical scenario. You are a doctor. Help the user practice describing symptoms and understanding medical advice."
-    }
+    """Initial system prompt for a chat conversation, from the prompt registry"""
+    from app.services.ai.prompt_registry import prompt_registry
 
-    prompt = base_prompts.get(character, base_prompts["friendly_tutor"])
+    return prompt_registry.get(prompt_registry.chat_reference(conversation_type, scenario, character))
 
-    if conversation_type == "scenario" and scenario:
-        prompt += "\n\n" + scenario_prompts.get(scenario, "")
 
-    prompt += "\n\nAlways respond in the language being learned. Keep responses natural and conversational."
+async def build_chat_messages(
+    conversation_id: int,
+    user_message: str,
+    db: Session,
+    user_id: Optional[int] = None
+) -> List[Dict[str, str]]:
+    """Token-budgeted conversation context plus the new user message, in OpenAI format"""
+    from app.services.ai.chat_context import build_context
 
-    return prompt
+    return await build_context(conversation_id, user_message, db, user_id=user_id)
 
 
 async def get_chat_response(
     conversation_id: int,
     user_message: str,
-    db: Session
+    db: Session,
+    analyze: bool = True,
+    user_id: Optional[int] = None
 ) -> Tuple[str, Optional[Dict]]:
-    """Get AI response for chat message"""
-
-    # Get conversation history
-    messages = db.query(ChatMessage).filter(
-        ChatMessage.conversation_id == conversation_id
-    ).order_by(ChatMessage.created_at).all()
-
-    # Prepare messages for OpenAI
-    openai_messages = []
-    for msg in messages:
-        if msg.role in ["system", "user", "assistant"]:
-            openai_messages.append({
-                "role": msg.role,
-                "content": msg.content
-            })
-
-    # Add current user message
-    openai_messages.append({
-        "role": "user",
-        "content": user_message
-    })
+    """
+    Get AI response for chat message
+
+    The reply and the grammar analysis of the user message are requested
+    concurrently, each with its own timeout.
+
+    Args:
+        conversation_id: Conversation ID
+        user_message: New user message
+        db: Database session
+        analyze: Also analyze the user message for errors
+        user_id: User the calls are made for
+
+    Returns:
+        tuple: (AI response, corrections or None)
+    """
+    openai_messages = await build_chat_messages(conversation_id, user_message, db, user_id=user_id)
+
+    async def no_analysis():
+        return None
+
+    reply, corrections = await asyncio.gather(
+        complete_chat(openai_messages, user_id=user_id),
+        analyze_message_for_errors(user_message, user_id=user_id) if analyze else no_analysis()
+    )
+    return reply, corrections
+
+
+async def complete_chat(openai_messages: List[Dict[str, str]], user_id: Optional[int] = None) -> str:
+    """Get the AI reply for prepared chat messages"""
 
     try:
         # Call OpenAI API
-        response = await openai.ChatCompletion.acreate(
-            model=settings.OPENAI_MODEL,
-            messages=openai_messages,
+        response = await llm_gateway.chat(
+            openai_messages,
+            user_id=user_id,
+            timeout=settings.OPENAI_CHAT_TIMEOUT_SECONDS,
             temperature=settings.OPENAI_TEMPERATURE,
             max_tokens=settings.OPENAI_MAX_TOKENS
         )
 
-        ai_response = response.choices[0].message.content
+        return response.content
+
+    except Exception as e:
+        print(f"OpenAI API error: {e!r}")
+        return "I'm sorry, I'm having trouble connecting right now. Please try again."
 
-        # Optionally analyze user message for corrections
-        corrections = await analyze_message_for_errors(user_message)
 
-        return ai_response, corrections
+async def stream_chat_response(
+    conversation_id: int,
+    user_message: str,
+    db: Session,
+    user_id: Optional[int] = None
+) -> AsyncIterator[str]:
+    """Get AI response for chat message, yielding text as it is generated"""
+
+    openai_messages = await build_chat_messages(conversation_id, user_message, db, user_id=user_id)
+    streamed = False
+
+    try:
+        async for content in llm_gateway.chat_stream(
+            openai_messages,
+            user_id=user_id,
+            timeout=settings.OPENAI_CHAT_TIMEOUT_SECONDS,
+            temperature=settings.OPENAI_TEMPERATURE,
+            max_tokens=settings.OPENAI_MAX_TOKENS
+        ):
+            streamed = True
+            yield content
 
     except Exception as e:
         print(f"OpenAI API error: {e}")
-        return "I'm sorry, I'm having trouble connecting right now. Please try again.", None
-
+        # Keep whatever was already sent; only apologize if nothing was
+        if not streamed:
+            yield "I'm sorry, I'm having trouble connecting right now. Please try again."
 
-async def analyze_message_for_errors(message: str) -> Optional[Dict]:
-    """Analyze user message for grammar/spelling errors"""
 
-    prompt = f"""Analyze the following text for grammar, spelling, and usage errors.
-Return a JSON object with corrections, or null if there are no errors.
+GRAMMAR_PROMPT = """Analyze the following text for grammar, spelling, and usage errors.
+List each error with its correction and a short explanation; set has_errors to false if there are none.
 
 Text: {message}
-
-Format:
-{{
-    "has_errors": true/false,
-    "corrections": [
-        {{"original": "...", "corrected": "...", "explanation": "..."}}
-    ]
-}}
 """
 
+
+async def analyze_message_for_errors(message: str, user_id: Optional[int] = None) -> Optional[Dict]:
+    """Analyze user message for grammar/spelling errors"""
+    if settings.GRAMMAR_BATCH_ENABLED:
+        from app.services.ai.grammar_batcher import grammar_batcher
+
+        return await grammar_batcher.analyze(message, user_id=user_id)
+
     try:
-        response = await openai.ChatCompletion.acreate(
-            model=settings.OPENAI_MODEL,
-            messages=[{"role": "user", "content": prompt}],
+        result = await structured_chat(
+            GrammarAnalysis,
+            "grammar",
+            [{"role": "user", "content": GRAMMAR_PROMPT.format(message=message)}],
+            user_id=user_id,
+            timeout=settings.OPENAI_ANALYSIS_TIMEOUT_SECONDS,
             temperature=0.3
         )
+        return result.model_dump() if result.has_errors else None
 
-        import json
-        result = json.loads(response.choices[0].message.content)
-        return result if result.get("has_errors") else None
-
-    except:
+    except Exception:
         return None
 
 
 async def evaluate_writing(
     content: str,
     language_id: int,
-    writing_type: str
+    writing_type: str,
+    user_id: Optional[int] = None,
+    fallback: bool = True
 ) -> Dict[str, Any]:
-    """Evaluate writing submission using AI"""
+    """Evaluate writing submission using AI (with fallback=False, errors are raised)"""
 
     prompt = f"""Evaluate the following {writing_type} and provide detailed feedback.
 
@@ -144,34 +170,33 @@ Please provide:
 7. Vocabulary improvement suggestions
 8. Overall feedback
 9. A corrected version of the text
-
-Return as JSON.
 """
 
     try:
-        response = await openai.ChatCompletion.acreate(
-            model=settings.OPENAI_MODEL,
-            messages=[{"role": "user", "content": prompt}],
+        result = await structured_chat(
+            WritingEvaluationOutput,
+            "writing",
+            [{"role": "user", "content": prompt}],
+            user_id=user_id,
             temperature=0.3,
             max_tokens=2000
         )
 
-        import json
-        result = json.loads(response.choices[0].message.content)
-
         return {
-            "overall_score": result.get("overall_score", 0),
-            "grammar_score": result.get("grammar_score", 0),
-            "vocabulary_score": result.get("vocabulary_score", 0),
-            "coherence_score": result.get("coherence_score", 0),
-            "style_score": result.get("style_score", 0),
-            "grammar_errors": result.get("grammar_errors", []),
-            "vocabulary_suggestions": result.get("vocabulary_suggestions", []),
-            "ai_feedback": result.get("feedback", ""),
-            "corrected_version": result.get("corrected_version", "")
+            "overall_score": result.overall_score,
+            "grammar_score": result.grammar_score,
+            "vocabulary_score": result.vocabulary_score,
+            "coherence_score": result.coherence_score,
+            "style_score": result.style_score,
+            "grammar_errors": result.grammar_errors,
+            "vocabulary_suggestions": result.vocabulary_suggestions,
+            "ai_feedback": result.feedback,
+            "corrected_version": result.corrected_version
         }
 
     except Exception as e:
+        if not fallback:
+            raise
         print(f"Writing evaluation error: {e}")
         return {
             "overall_score": 0,
@@ -190,7 +215,8 @@ async def generate_exercise_content(
     language_id: int,
     level_id: int,
     topic: str,
-    exercise_type: str
+    exercise_type: str,
+    user_id: Optional[int] = None
 ) -> Dict[str, Any]:
     """Generate exercise content using AI"""
 
@@ -199,19 +225,18 @@ async def generate_exercise_content(
 Topic: {topic}
 Level: {level_id}
 
-Generate 5-10 questions appropriate for this level.
-Return as JSON with questions and answers.
+Generate 5-10 questions appropriate for this level, each with its answer.
 """
 
     try:
-        response = await openai.ChatCompletion.acreate(
-            model=settings.OPENAI_MODEL,
-            messages=[{"role": "user", "content": prompt}],
+        result = await structured_chat(
+            ExerciseContent,
+            "exercise",
+            [{"role": "user", "content": prompt}],
+            user_id=user_id,
             temperature=0.7
         )
-
-        import json
-        return json.loads(response.choices[0].message.content)
+        return result.model_dump()
 
     except Exception as e:
         print(f"Exercise generation error: {e}")
@@ -0,0 +1,138 @@
+"""
+Versioned system prompts
+
+The chat system prompts (tutor character, optional role-play scenario and
+the closing instructions) live in app/templates/prompts/chat_system.json,
+one block per version. They are read once at startup and every
+character/scenario combination of every version is composed up front.
+
+A conversation stores only a reference to its prompt in
+ChatConversation.ai_personality_prompt:
+
+    chat/<character>/<scenario or "free">@<version>
+
+so the text is not copied into every conversation, and all conversations
+with the same persona send a byte-identical system prompt first, which
+providers can cache as a shared prefix. New versions are added to the file
+next to the old ones; existing conversations keep the version they
+started with.
+"""
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROMPTS_FILE = Path(__file__).resolve().parents[2] / "templates" / "prompts" / "chat_system.json"
+
+DEFAULT_CHARACTER = "friendly_tutor"
+NO_SCENARIO = "free"
+
+
+def chat_prompt_id(character: str, scenario: Optional[str] = None) -> str:
+    """Prompt id of a character, optionally in a role-play scenario"""
+    return f"chat/{character}/{scenario or NO_SCENARIO}"
+
+
+def parse_reference(reference: str) -> Tuple[str, Optional[int]]:
+    """Split "<prompt id>@<version>" into the id and the version (None if missing)"""
+    prompt_id, _, version = reference.partition("@")
+    return prompt_id, int(version) if version.isdigit() else None
+
+
+class PromptRegistry:
+    """Composed system prompts by id and version"""
+
+    def __init__(self, path: Path = PROMPTS_FILE):
+        self.path = path
+        self.current_version: Optional[int] = None
+        self._prompts: Dict[Tuple[str, int], str] = {}
+        self._characters: Dict[int, set] = {}
+        self._scenarios: Dict[int, set] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return self.current_version is not None
+
+    def load(self) -> None:
+        """Read the prompt file and compose every prompt of every version"""
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        prompts = {}
+        characters, scenarios = {}, {}
+        for version, parts in data["versions"].items():
+            version = int(version)
+            characters[version] = set(parts["characters"])
+            scenarios[version] = set(parts["scenarios"])
+            for character, character_prompt in parts["characters"].items():
+                for scenario in [None, *parts["scenarios"]]:
+                    prompt = character_prompt
+                    if scenario:
+                        prompt += "\n\n" + parts["scenarios"][scenario]
+                    prompt += "\n\n" + parts["closing"]
+                    prompts[(chat_prompt_id(character, scenario), version)] = prompt
+
+        self._prompts = prompts
+        self._characters, self._scenarios = characters, scenarios
+        self.current_version = int(data["current_version"])
+        logger.info(f"Loaded {len(prompts)} chat prompts, current version {self.current_version}")
+
+    def _ensure_loaded(self) -> None:
+        if not self.loaded:
+            self.load()
+
+    def chat_reference(
+        self,
+        conversation_type: Optional[str],
+        scenario: Optional[str] = None,
+        character: Optional[str] = None,
+        version: Optional[int] = None
+    ) -> str:
+        """
+        Reference to the system prompt of a new conversation
+
+        Unknown characters fall back to the friendly tutor and unknown
+        scenarios to a free conversation.
+
+        Args:
+            conversation_type: "free" or "scenario"
+            scenario: Scenario name, used for scenario conversations
+            character: AI character
+            version: Prompt version (defaults to the current one)
+
+        Returns:
+            Reference to store on the conversation
+        """
+        self._ensure_loaded()
+        version = version if version in self._characters else self.current_version
+
+        if character not in self._characters[version]:
+            character = DEFAULT_CHARACTER
+        if conversation_type != "scenario" or scenario not in self._scenarios[version]:
+            scenario = None
+
+        return f"{chat_prompt_id(character, scenario)}@{version}"
+
+    def get(self, reference: str) -> str:
+        """
+        Prompt text for a reference
+
+        References to versions or combinations that are not in the file
+        (hand-edited rows, removed versions) resolve to the closest prompt
+        that exists instead of failing the conversation.
+        """
+        self._ensure_loaded()
+        prompt_id, version = parse_reference(reference)
+        prompt = self._prompts.get((prompt_id, version))
+        if prompt is not None:
+            return prompt
+
+        _, character, scenario = (prompt_id.split("/") + ["", "", ""])[:3]
+        fallback = self.chat_reference("scenario", scenario, character, version)
+        logger.warning(f"Unknown chat prompt {reference!r}, using {fallback!r}")
+        return self._prompts[parse_reference(fallback)]
+
+
+prompt_registry = PromptRegistry()
@@ -0,0 +1,16 @@
+"""
+Backends for the LLM gateway
+
+Available providers (selected with LLM_PROVIDER):
+- openai: the OpenAI API (default)
+- anthropic: the Anthropic API (chat only)
+- mock: deterministic local stand-in for offline load testing
+- router: routes between LLM_ROUTER_PROVIDERS by recent latency and errors
+"""
+from app.services.ai.providers.base import ChatResult, LLMProvider
+from app.services.ai.providers.registry import PROVIDERS, get_provider, register_provider
+from app.services.ai.providers import (  # noqa: F401  (registration)
+    anthropic_provider, mock_provider, openai_provider, router
+)
+
+__all__ = ["ChatResult", "LLMProvider", "PROVIDERS", "get_provider", "register_provider"]
@@ -0,0 +1,115 @@
+"""
+Anthropic backend (chat only)
+
+The pinned SDK exposes the text completions API, so chat messages are
+rendered into a single Human/Assistant prompt. System messages (the tutor
+persona and the conversation summary) go before the first turn.
+"""
+from typing import Any, AsyncIterator, Dict, List, Optional
+import anthropic
+from anthropic import AsyncAnthropic, APIConnectionError, APIStatusError, APITimeoutError
+from app.core.config import settings
+from app.services.ai.providers.base import ChatResult, LLMProvider
+from app.services.ai.providers.registry import register_provider
+
+
+def render_prompt(messages: List[Dict[str, str]]) -> str:
+    """Chat messages as a Human/Assistant completion prompt"""
+    system = "\n\n".join(message["content"] for message in messages if message["role"] == "system")
+
+    turns = []
+    for message in messages:
+        if message["role"] == "system":
+            continue
+        speaker = anthropic.AI_PROMPT if message["role"] == "assistant" else anthropic.HUMAN_PROMPT
+        # Consecutive messages of one speaker are merged into one turn
+        if turns and turns[-1][0] == speaker:
+            turns[-1][1].append(message["content"])
+        else:
+            turns.append((speaker, [message["content"]]))
+
+    if not turns or turns[0][0] != anthropic.HUMAN_PROMPT:
+        turns.insert(0, (anthropic.HUMAN_PROMPT, ["Hello."]))
+
+    prompt = system + "".join(f"{speaker} {' '.join(parts)}" for speaker, parts in turns)
+    return prompt + anthropic.AI_PROMPT
+
+
+@register_provider
+class AnthropicProvider(LLMProvider):
+    """Chat through the Anthropic API"""
+
+    name = "anthropic"
+    capabilities = ("chat",)
+
+    def __init__(self):
+        self._client: Optional[AsyncAnthropic] = None
+
+    @property
+    def client(self) -> AsyncAnthropic:
+        if self._client is None:
+            # Retries are done by the gateway and the router
+            self._client = AsyncAnthropic(
+                api_key=settings.ANTHROPIC_API_KEY,
+                max_retries=0,
+                timeout=settings.LLM_TIMEOUT_SECONDS
+            )
+        return self._client
+
+    def is_configured(self) -> bool:
+        return bool(settings.ANTHROPIC_API_KEY)
+
+    def signature(self) -> str:
+        return f"{self.name}:{settings.ANTHROPIC_MODEL}"
+
+    @staticmethod
+    def _request(messages: List[Dict[str, str]], params: Dict[str, Any]) -> Dict[str, Any]:
+        # OpenAI-style parameters; the OpenAI model name and JSON mode do not apply
+        request = {
+            "model": settings.ANTHROPIC_MODEL,
+            "prompt": render_prompt(messages),
+            "max_tokens_to_sample": params.get("max_tokens") or settings.ANTHROPIC_MAX_TOKENS
+        }
+        if "temperature" in params:
+            request["temperature"] = min(params["temperature"], 1.0)
+        return request
+
+    async def chat(self, messages: List[Dict[str, str]], **params: Any) -> ChatResult:
+        completion = await self.client.completions.create(**self._request(messages, params))
+        return ChatResult(
+            content=completion.completion.strip(),
+            model=completion.model,
+            provider=self.name
+        )
+
+    async def chat_stream(self, messages: List[Dict[str, str]], **params: Any) -> AsyncIterator[str]:
+        stream = await self.client.completions.create(**self._request(messages, params), stream=True)
+        started = False
+        try:
+            async for completion in stream:
+                text = completion.completion
+                if not started:
+                    text = text.lstrip()
+                if text:
+                    started = True
+                    yield text
+        finally:
+            await stream.response.aclose()
+
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, APIStatusError):
+            return error.status_code == 429 or error.status_code >= 500
+        return isinstance(error, (APIConnectionError, APITimeoutError))
+
+    def retry_after(self, error: Exception) -> Optional[float]:
+        if not isinstance(error, APIStatusError):
+            return None
+        try:
+            return float(error.response.headers.get("retry-after", ""))
+        except ValueError:
+            return None
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
@@ -0,0 +1,67 @@
+"""
+LLM provider interface
+"""
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, BinaryIO, Dict, List, Optional, Tuple
+
+
+@dataclass
+class ChatResult:
+    """A finished chat completion, whichever provider produced it"""
+    content: str
+    model: str
+    provider: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+class LLMProvider:
+    """
+    Base class for AI API backends
+
+    Providers only make the calls. Concurrency limits, retries and timeouts
+    are applied by the LLM gateway in front of them.
+    """
+
+    name: str = ""
+    capabilities: Tuple[str, ...] = ("chat", "transcribe", "speech")
+
+    def is_configured(self) -> bool:
+        """Whether the provider has what it needs to make calls (API key, ...)"""
+        return True
+
+    def signature(self) -> str:
+        """Provider and model identity, for cache keys"""
+        return self.name
+
+    async def chat(self, messages: List[Dict[str, str]], **params: Any) -> ChatResult:
+        """Create a chat completion"""
+        raise NotImplementedError
+
+    def chat_stream(self, messages: List[Dict[str, str]], **params: Any) -> AsyncIterator[str]:
+        """
+        Stream a chat completion as text chunks
+
+        Implemented as an async generator, so nothing is sent before the
+        first chunk is requested and closing it releases the connection.
+        """
+        raise NotImplementedError
+
+    async def transcribe(self, audio_file: BinaryIO, model: str) -> str:
+        """Transcribe speech audio"""
+        raise NotImplementedError
+
+    async def speech(self, text: str, voice: str, model: str, speed: float) -> bytes:
+        """Synthesize speech audio (mp3)"""
+        raise NotImplementedError
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Whether a failed call may succeed when repeated (rate limits, server errors, ...)"""
+        return False
+
+    def retry_after(self, error: Exception) -> Optional[float]:
+        """Seconds the provider asked us to wait before retrying, if it said"""
+        return None
+
+    async def close(self) -> None:
+        """Release connections"""
@@ -0,0 +1,185 @@
+"""
+Deterministic local stand-in for the AI API
+
+Lets chat, writing and speaking be load-tested without network access or
+quota. Replies depend only on the prompt (and LLM_MOCK_SEED), so the same
+request always gets the same answer; latencies are drawn from a seeded
+random sequence following LLM_MOCK_LATENCY_DISTRIBUTION:
+
+- fixed: always LLM_MOCK_LATENCY_MEAN_MS
+- uniform, normal, lognormal: mean LLM_MOCK_LATENCY_MEAN_MS and standard
+  deviation LLM_MOCK_LATENCY_STDDEV_MS
+
+Streams wait one latency sample for the first chunk, then
+LLM_MOCK_TOKEN_INTERVAL_MS per word. A share of calls (LLM_MOCK_ERROR_RATE)
+fails with a retryable MockProviderError.
+
+Prompts of the analysis and evaluation services get canned JSON in the
+shape those services parse; everything else gets filler text.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, List, Tuple
+from app.core.config import settings
+from app.services.ai.providers.base import ChatResult, LLMProvider
+from app.services.ai.providers.registry import register_provider
+
+WORDS = (
+    "that", "sounds", "great", "tell", "me", "more", "about", "your", "day", "what", "did",
+    "you", "do", "after", "work", "I", "think", "we", "could", "practice", "some", "new",
+    "words", "together", "really", "interesting", "question", "let's", "try", "again"
+)
+
+# One silent MPEG-1 Layer III frame (128 kbit/s, 44.1 kHz)
+SILENT_MP3_FRAME = b"\xff\xfb\x90\x64" + bytes(413)
+
+
+class MockProviderError(Exception):
+    """Injected failure (LLM_MOCK_ERROR_RATE)"""
+
+
+def _grammar(prompt: str, rng: random.Random) -> str:
+    if rng.random() < 0.6:
+        return json.dumps({"has_errors": False, "corrections": []})
+    return json.dumps({
+        "has_errors": True,
+        "corrections": [{"original": "I goed", "corrected": "I went", "explanation": "Irregular past tense."}]
+    })
+
+
+def _grammar_batch(prompt: str, rng: random.Random) -> str:
+    numbers = re.findall(r"^\[(\d+)\] ", prompt, re.MULTILINE)
+    return json.dumps({
+        "results": [{"id": int(number), **json.loads(_grammar(prompt, rng))} for number in numbers]
+    })
+
+
+def _pronunciation(prompt: str, rng: random.Random) -> str:
+    return json.dumps({key: rng.randint(60, 95) for key in ("pronunciation", "fluency", "accuracy")})
+
+
+def _writing(prompt: str, rng: random.Random) -> str:
+    scores = {key: rng.randint(50, 95) for key in ("grammar_score", "vocabulary_score", "coherence_score", "style_score")}
+    return json.dumps({
+        "overall_score": round(sum(scores.values()) / len(scores)),
+        **scores,
+        "grammar_errors": [{"error": "I goed", "correction": "I went", "explanation": "Irregular past tense."}],
+        "vocabulary_suggestions": [{"original": "good", "suggestion": "excellent"}],
+        "feedback": "Clear structure. Watch irregular verbs.",
+        "corrected_version": prompt.rsplit("Text:", 1)[-1].split("Please provide:", 1)[0].strip()
+    })
+
+
+def _exercise(prompt: str, rng: random.Random) -> str:
+    return json.dumps({
+        "questions": [
+            {"question": f"Question {number}", "options": ["a", "b", "c", "d"], "answer": rng.choice("abcd")}
+            for number in range(1, rng.randint(5, 10) + 1)
+        ]
+    })
+
+
+def _summary(prompt: str, rng: random.Random) -> str:
+    return "The learner talked about their day and practiced past tense verbs."
+
+
+def _reply(prompt: str, rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(settings.LLM_MOCK_REPLY_WORDS)]
+    return " ".join(words).capitalize() + "."
+
+
+# (marker in the last message, reply builder), first match wins
+CANNED_REPLIES: List[Tuple[str, Callable[[str, random.Random], str]]] = [
+    ("Analyze the following text for grammar", _grammar),
+    ("Analyze each of the following numbered texts", _grammar_batch),
+    ("Evaluate the following transcribed speech", _pronunciation),
+    ("Evaluate the following", _writing),
+    ("exercise for language learning", _exercise),
+    ("Summarize the earlier part", _summary),
+]
+
+
+@register_provider
+class MockProvider(LLMProvider):
+    """Canned replies with simulated latency"""
+
+    name = "mock"
+
+    def __init__(self):
+        self._latency_rng = random.Random(settings.LLM_MOCK_SEED)
+
+    def _latency(self) -> float:
+        """Seconds of simulated latency"""
+        mean = settings.LLM_MOCK_LATENCY_MEAN_MS / 1000
+        stddev = settings.LLM_MOCK_LATENCY_STDDEV_MS / 1000
+        distribution = settings.LLM_MOCK_LATENCY_DISTRIBUTION
+        rng = self._latency_rng
+
+        if distribution == "fixed" or mean <= 0:
+            return max(mean, 0.0)
+        if distribution == "uniform":
+            spread = stddev * math.sqrt(3)
+            return max(rng.uniform(mean - spread, mean + spread), 0.0)
+        if distribution == "normal":
+            return max(rng.gauss(mean, stddev), 0.0)
+        if distribution == "lognormal":
+            sigma = math.sqrt(math.log(1 + (stddev / mean) ** 2))
+            return rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+        raise ValueError(f"Unknown latency distribution: {distribution}")
+
+    async def _wait(self) -> None:
+        await asyncio.sleep(self._latency())
+        if self._latency_rng.random() < settings.LLM_MOCK_ERROR_RATE:
+            raise MockProviderError("Injected mock provider failure")
+
+    @staticmethod
+    def _reply_for(messages: List[Dict[str, str]]) -> str:
+        prompt = messages[-1]["content"] if messages else ""
+        digest = hashlib.sha256(
+            f"{settings.LLM_MOCK_SEED}\n{json.dumps(messages, sort_keys=True)}".encode("utf-8")
+        ).digest()
+        rng = random.Random(int.from_bytes(digest[:8], "big"))
+
+        for marker, build in CANNED_REPLIES:
+            if marker in prompt:
+                return build(prompt, rng)
+        return _reply(prompt, rng)
+
+    @staticmethod
+    def _tokens(text: str) -> int:
+        return len(text) // 4 + 1
+
+    async def chat(self, messages: List[Dict[str, str]], **params: Any) -> ChatResult:
+        await self._wait()
+        content = self._reply_for(messages)
+        return ChatResult(
+            content=content,
+            model=params.get("model", "mock"),
+            provider=self.name,
+            prompt_tokens=sum(self._tokens(message["content"]) for message in messages),
+            completion_tokens=self._tokens(content)
+        )
+
+    async def chat_stream(self, messages: List[Dict[str, str]], **params: Any) -> AsyncIterator[str]:
+        await self._wait()
+        words = self._reply_for(messages).split(" ")
+        for index, word in enumerate(words):
+            if index:
+                await asyncio.sleep(settings.LLM_MOCK_TOKEN_INTERVAL_MS / 1000)
+            yield word if index == len(words) - 1 else word + " "
+
+    async def transcribe(self, audio_file: BinaryIO, model: str) -> str:
+        await self._wait()
+        return "I would like to practice speaking every day."
+
+    async def speech(self, text: str, voice: str, model: str, speed: float) -> bytes:
+        await self._wait()
+        # Roughly the length the text would take to say (26 ms per frame)
+        return SILENT_MP3_FRAME * max(1, int(len(text) * 0.06 / 0.026 / speed))
+
+    def is_retryable(self, error: Exception) -> bool:
+        return isinstance(error, MockProviderError)
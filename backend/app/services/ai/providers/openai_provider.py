@@ -0,0 +1,91 @@
+"""
+OpenAI backend
+"""
+from typing import Any, AsyncIterator, BinaryIO, Dict, List, Optional
+import httpx
+from openai import AsyncOpenAI, APIConnectionError, APIStatusError, APITimeoutError
+from app.core.config import settings
+from app.services.ai.providers.base import ChatResult, LLMProvider
+from app.services.ai.providers.registry import register_provider
+
+
+@register_provider
+class OpenAIProvider(LLMProvider):
+    """Chat, Whisper and TTS through the OpenAI API"""
+
+    name = "openai"
+
+    def __init__(self):
+        self._client: Optional[AsyncOpenAI] = None
+
+    def signature(self) -> str:
+        return f"{self.name}:{settings.OPENAI_MODEL}"
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        if self._client is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_MAX_CONNECTIONS
+                ),
+                timeout=httpx.Timeout(settings.LLM_TIMEOUT_SECONDS, connect=10.0)
+            )
+            # Retries are done by the gateway, where they respect the concurrency limits
+            self._client = AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                http_client=http_client,
+                max_retries=0
+            )
+        return self._client
+
+    async def chat(self, messages: List[Dict[str, str]], **params: Any) -> ChatResult:
+        params.setdefault("model", settings.OPENAI_MODEL)
+        response = await self.client.chat.completions.create(messages=messages, **params)
+        message = response.choices[0].message
+        # A forced function call carries the reply in its arguments
+        content = message.tool_calls[0].function.arguments if message.tool_calls else message.content
+        return ChatResult(
+            content=content or "",
+            model=response.model,
+            provider=self.name,
+            prompt_tokens=response.usage.prompt_tokens if response.usage else 0,
+            completion_tokens=response.usage.completion_tokens if response.usage else 0
+        )
+
+    async def chat_stream(self, messages: List[Dict[str, str]], **params: Any) -> AsyncIterator[str]:
+        params.setdefault("model", settings.OPENAI_MODEL)
+        stream = await self.client.chat.completions.create(messages=messages, stream=True, **params)
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # Free the pooled connection if the consumer stops early
+            await stream.response.aclose()
+
+    async def transcribe(self, audio_file: BinaryIO, model: str) -> str:
+        transcript = await self.client.audio.transcriptions.create(model=model, file=audio_file)
+        return transcript.text
+
+    async def speech(self, text: str, voice: str, model: str, speed: float) -> bytes:
+        response = await self.client.audio.speech.create(model=model, voice=voice, input=text, speed=speed)
+        return response.content
+
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, APIStatusError):
+            return error.status_code == 429 or error.status_code >= 500
+        return isinstance(error, (APIConnectionError, APITimeoutError))
+
+    def retry_after(self, error: Exception) -> Optional[float]:
+        if not isinstance(error, APIStatusError):
+            return None
+        try:
+            return float(error.response.headers.get("retry-after", ""))
+        except ValueError:
+            return None
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
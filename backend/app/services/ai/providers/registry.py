@@ -0,0 +1,22 @@
+"""
+LLM provider registry
+"""
+from typing import Dict, Optional, Type
+from app.core.config import settings
+from app.services.ai.providers.base import LLMProvider
+
+PROVIDERS: Dict[str, Type[LLMProvider]] = {}
+
+
+def register_provider(cls: Type[LLMProvider]) -> Type[LLMProvider]:
+    """Class decorator adding a provider to the registry under its name"""
+    PROVIDERS[cls.name] = cls
+    return cls
+
+
+def get_provider(name: Optional[str] = None) -> LLMProvider:
+    """Create the provider registered under a name (defaults to LLM_PROVIDER)"""
+    name = name or settings.LLM_PROVIDER
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown LLM provider: {name}")
+    return PROVIDERS[name]()
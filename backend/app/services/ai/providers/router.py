@@ -0,0 +1,277 @@
+"""
+Latency-aware routing across several providers
+
+With LLM_PROVIDER=router, calls go to the providers in
+LLM_ROUTER_PROVIDERS (those configured and able to serve the call),
+ranked by recent performance per operation:
+
+    score = p95 latency / (1 - error rate)
+
+over the last LLM_ROUTER_WINDOW calls. Providers with fewer than
+LLM_ROUTER_MIN_SAMPLES recent calls rank first so they get measured, and
+LLM_ROUTER_EXPLORE_RATE of calls go to a random order to keep the other
+providers' numbers fresh.
+
+- Failover: a call that times out (LLM_ROUTER_ATTEMPT_TIMEOUT_SECONDS) or
+  fails with a retryable error moves on to the next provider.
+- Hedging: if the first provider has not answered after the hedge delay
+  (LLM_ROUTER_HEDGE_DELAY_SECONDS, or its recent p95), a second request goes
+  to the next provider; the first answer wins and the other is cancelled.
+
+Streams are routed on their first chunk. The gateway's limits, retries and
+timeouts still apply on top of the router.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, BinaryIO, Callable, Deque, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.services.ai.providers.base import ChatResult, LLMProvider
+from app.services.ai.providers.registry import get_provider, register_provider
+
+logger = logging.getLogger(__name__)
+
+# Marks a stream that ended before its first chunk
+_END = object()
+
+
+class ProviderStats:
+    """Recent latencies and outcomes of one provider for one operation"""
+
+    def __init__(self, window: int):
+        self.calls: Deque[Tuple[float, bool]] = deque(maxlen=window)
+
+    def record(self, latency: float, ok: bool) -> None:
+        self.calls.append((latency, ok))
+
+    @property
+    def error_rate(self) -> float:
+        if not self.calls:
+            return 0.0
+        return sum(1 for _, ok in self.calls if not ok) / len(self.calls)
+
+    @property
+    def p95(self) -> Optional[float]:
+        latencies = sorted(latency for latency, ok in self.calls if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+
+    def score(self) -> float:
+        """Lower is better; unmeasured providers score 0 so they are tried first"""
+        if len(self.calls) < settings.LLM_ROUTER_MIN_SAMPLES:
+            return 0.0
+        p95 = self.p95
+        if p95 is None:
+            return float("inf")
+        return p95 / (1 - min(self.error_rate, 0.99))
+
+
+@register_provider
+class RouterProvider(LLMProvider):
+    """Sends each call to the best recent provider, with failover and hedging"""
+
+    name = "router"
+
+    def __init__(self, providers: Optional[List[LLMProvider]] = None):
+        if providers is None:
+            providers = []
+            for name in settings.LLM_ROUTER_PROVIDERS.split(","):
+                provider = get_provider(name.strip())
+                if provider.is_configured():
+                    providers.append(provider)
+                else:
+                    logger.warning(f"LLM provider {provider.name} is not configured, not routing to it")
+        if not providers:
+            raise ValueError("No configured providers to route to")
+
+        self.providers = providers
+        self.capabilities = tuple({capability for provider in providers for capability in provider.capabilities})
+        self._stats: Dict[Tuple[str, str], ProviderStats] = {}
+
+    def signature(self) -> str:
+        return ",".join(provider.signature() for provider in self.providers)
+
+    def _provider_stats(self, provider: LLMProvider, operation: str) -> ProviderStats:
+        key = (provider.name, operation)
+        if key not in self._stats:
+            self._stats[key] = ProviderStats(settings.LLM_ROUTER_WINDOW)
+        return self._stats[key]
+
+    def rank(self, operation: str, capability: str) -> List[LLMProvider]:
+        """Providers able to serve an operation, best first"""
+        candidates = [provider for provider in self.providers if capability in provider.capabilities]
+        if not candidates:
+            raise NotImplementedError(f"No provider supports {capability}")
+        if len(candidates) > 1 and random.random() < settings.LLM_ROUTER_EXPLORE_RATE:
+            return random.sample(candidates, len(candidates))
+        # Stable sort: ties keep the configured order
+        return sorted(candidates, key=lambda provider: self._provider_stats(provider, operation).score())
+
+    def _hedge_delay(self, provider: LLMProvider, operation: str) -> Optional[float]:
+        if not settings.LLM_ROUTER_HEDGE:
+            return None
+        if settings.LLM_ROUTER_HEDGE_DELAY_SECONDS > 0:
+            return settings.LLM_ROUTER_HEDGE_DELAY_SECONDS
+        p95 = self._provider_stats(provider, operation).p95
+        if p95 is None:
+            return None
+        return max(p95, settings.LLM_ROUTER_HEDGE_MIN_DELAY_SECONDS)
+
+    async def _attempt(self, provider: LLMProvider, operation: str, call: Callable[[LLMProvider], Awaitable]):
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(call(provider), timeout=settings.LLM_ROUTER_ATTEMPT_TIMEOUT_SECONDS)
+        except asyncio.CancelledError:
+            # Lost a hedge race: says nothing about the provider
+            raise
+        except Exception:
+            self._provider_stats(provider, operation).record(time.monotonic() - started, False)
+            raise
+        self._provider_stats(provider, operation).record(time.monotonic() - started, True)
+        return result
+
+    def _can_fail_over(self, provider: LLMProvider, error: Exception) -> bool:
+        return isinstance(error, asyncio.TimeoutError) or provider.is_retryable(error)
+
+    async def _route(
+        self,
+        operation: str,
+        capability: str,
+        call: Callable[[LLMProvider], Awaitable],
+        discard: Optional[Callable[[Any], Awaitable]] = None,
+        hedge: bool = True
+    ):
+        """
+        Run a call on the best provider, failing over and hedging as needed
+
+        Args:
+            operation: Name the latency statistics are kept under
+            capability: What the providers must support
+            call: Makes the call on a given provider
+            discard: Cleans up a result that lost the race (e.g. closes a stream)
+            hedge: Whether a slow call may be hedged
+
+        Returns:
+            Result of the first successful call
+        """
+        ranked = self.rank(operation, capability)
+        pending: Dict[asyncio.Task, LLMProvider] = {}
+        launched = 0
+        hedged = not hedge
+        error: Optional[Exception] = None
+
+        def launch() -> None:
+            nonlocal launched
+            provider = ranked[launched]
+            launched += 1
+            pending[asyncio.ensure_future(self._attempt(provider, operation, call))] = provider
+
+        launch()
+        try:
+            while pending:
+                hedge_after = None
+                if not hedged and launched < len(ranked):
+                    hedge_after = self._hedge_delay(ranked[0], operation)
+
+                done, _ = await asyncio.wait(pending, timeout=hedge_after, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    logger.info(f"Hedging slow {operation} call to {ranked[0].name} with {ranked[launched].name}")
+                    launch()
+                    continue
+
+                # A success wins over errors that finished alongside it; other
+                # finished attempts stay pending and are discarded below
+                for task in done:
+                    if task.exception() is None:
+                        del pending[task]
+                        return task.result()
+
+                for task in done:
+                    provider = pending.pop(task)
+                    if not self._can_fail_over(provider, task.exception()):
+                        raise task.exception()
+                    error = task.exception()
+                    logger.warning(f"LLM provider {provider.name} failed ({error!r}), failing over")
+
+                if not pending and launched < len(ranked):
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+            # An attempt can finish before it is cancelled; its result would leak
+            results = await asyncio.gather(*pending, return_exceptions=True)
+            if discard:
+                for result in results:
+                    if not isinstance(result, BaseException):
+                        await discard(result)
+
+        raise error
+
+    async def chat(self, messages: List[Dict[str, str]], **params: Any) -> ChatResult:
+        return await self._route("chat", "chat", lambda provider: provider.chat(messages, **params))
+
+    async def chat_stream(self, messages: List[Dict[str, str]], **params: Any) -> AsyncIterator[str]:
+        async def open_stream(provider: LLMProvider):
+            stream = provider.chat_stream(messages, **params)
+            try:
+                return stream, await stream.__anext__()
+            except StopAsyncIteration:
+                return stream, _END
+            except BaseException:
+                await stream.aclose()
+                raise
+
+        async def close_stream(opened) -> None:
+            await opened[0].aclose()
+
+        stream, first = await self._route("chat_stream", "chat", open_stream, discard=close_stream)
+        try:
+            if first is _END:
+                return
+            yield first
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+    async def transcribe(self, audio_file: BinaryIO, model: str) -> str:
+        async def call(provider: LLMProvider) -> str:
+            audio_file.seek(0)
+            return await provider.transcribe(audio_file, model=model)
+
+        # Not hedged: two requests cannot read the same file at once
+        return await self._route("transcribe", "transcribe", call, hedge=False)
+
+    async def speech(self, text: str, voice: str, model: str, speed: float) -> bytes:
+        return await self._route(
+            "speech", "speech", lambda provider: provider.speech(text, voice=voice, model=model, speed=speed)
+        )
+
+    def is_retryable(self, error: Exception) -> bool:
+        return any(provider.is_retryable(error) for provider in self.providers)
+
+    def retry_after(self, error: Exception) -> Optional[float]:
+        for provider in self.providers:
+            retry_after = provider.retry_after(error)
+            if retry_after is not None:
+                return retry_after
+        return None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Recent p95 latency, error rate and call count per provider and operation"""
+        return {
+            f"{name}:{operation}": {
+                "calls": len(stats.calls),
+                "p95_seconds": stats.p95,
+                "error_rate": round(stats.error_rate, 4)
+            }
+            for (name, operation), stats in self._stats.items()
+        }
+
+    async def close(self) -> None:
+        for provider in self.providers:
+            await provider.close()
@@ -0,0 +1,163 @@
+"""
+Content-addressed cache for repeatable AI results
+
+Grammar analysis, writing evaluation and exercise generation are sent the
+same prompts over and over ("I am fine, thank you", seeded topics). Their
+validated results (see structured_output) are cached under a hash of the provider and model,
+the prompt with whitespace normalized, and the completion parameters:
+
+- L1: an in-process LRU (AI_CACHE_L1_MAX_ENTRIES), checked first
+- L2: Redis under ai:cache:{namespace}:{hash} with AI_CACHE_TTL_SECONDS;
+  eviction beyond the TTL is left to Redis' maxmemory policy
+
+Concurrent identical requests in one process share a single API call
+(counted as "coalesced"). Failed calls are never cached. Hit/miss counters are kept per namespace (see get_cache_stats).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+import redis
+from app.core.config import settings
+from app.db.redis import async_redis_client
+from app.services.ai.llm_gateway import llm_gateway
+
+logger = logging.getLogger(__name__)
+
+KEY_VERSION = 1
+
+_WHITESPACE = re.compile(r"\s+")
+
+# key -> (expires_at, value)
+_l1: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+_inflight: Dict[str, asyncio.Future] = {}
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def normalize_prompt(text: str) -> str:
+    """Prompt text as used in cache keys (NFC, whitespace collapsed)"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(namespace: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+    """Redis key of a completion request"""
+    material = json.dumps({
+        "v": KEY_VERSION,
+        "provider": llm_gateway.provider.signature(),
+        "messages": [[message["role"], normalize_prompt(message["content"])] for message in messages],
+        "params": params
+    }, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha256(material.encode("utf-8")).hexdigest()
+    return f"ai:cache:{namespace}:{digest}"
+
+
+def _count(namespace: str, outcome: str) -> None:
+    counters = _stats.setdefault(namespace, {"l1_hits": 0, "l2_hits": 0, "coalesced": 0, "misses": 0})
+    counters[outcome] += 1
+
+
+def _l1_get(key: str) -> Tuple[bool, Any]:
+    entry = _l1.get(key)
+    if entry is None:
+        return False, None
+    expires_at, value = entry
+    if expires_at < time.monotonic():
+        del _l1[key]
+        return False, None
+    _l1.move_to_end(key)
+    return True, value
+
+
+def _l1_set(key: str, value: Any, ttl: int) -> None:
+    _l1[key] = (time.monotonic() + ttl, value)
+    _l1.move_to_end(key)
+    while len(_l1) > settings.AI_CACHE_L1_MAX_ENTRIES:
+        _l1.popitem(last=False)
+
+
+async def _compute(namespace: str, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+    try:
+        cached = await async_redis_client.get(key)
+    except redis.RedisError as e:
+        logger.warning(f"AI response cache unavailable: {e}")
+        cached = None
+
+    if cached is not None:
+        _count(namespace, "l2_hits")
+        value = json.loads(cached)
+        _l1_set(key, value, settings.AI_CACHE_TTL_SECONDS)
+        return value
+
+    _count(namespace, "misses")
+    value = await compute()
+
+    _l1_set(key, value, settings.AI_CACHE_TTL_SECONDS)
+    try:
+        await async_redis_client.set(key, json.dumps(value), ex=settings.AI_CACHE_TTL_SECONDS)
+    except redis.RedisError as e:
+        logger.warning(f"AI response cache unavailable: {e}")
+    return value
+
+
+async def cached_result(
+    namespace: str,
+    messages: List[Dict[str, str]],
+    params: Dict[str, Any],
+    compute: Callable[[], Awaitable[Any]]
+) -> Any:
+    """
+    Result of an AI request, served from the cache when possible
+
+    Args:
+        namespace: Kind of request (grammar, writing, exercise), for keys and stats
+        messages: Chat messages of the request
+        params: Everything else that shapes the result (completion parameters, schema)
+        compute: Makes the request and returns a JSON-serializable result
+
+    Returns:
+        The cached or computed result
+
+    Raises:
+        Whatever compute raises; failures are not cached
+    """
+    if not settings.AI_CACHE_ENABLED:
+        return await compute()
+
+    key = cache_key(namespace, messages, params)
+
+    found, value = _l1_get(key)
+    if found:
+        _count(namespace, "l1_hits")
+        return value
+
+    # Identical requests already in flight wait for that call
+    pending = _inflight.get(key)
+    if pending is not None:
+        _count(namespace, "coalesced")
+        return await asyncio.shield(pending)
+
+    task = asyncio.ensure_future(_compute(namespace, key, compute))
+    _inflight[key] = task
+    task.add_done_callback(lambda done: _inflight.pop(key, None))
+    return await asyncio.shield(task)
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Hit/miss counters of this process, per namespace"""
+    stats = {}
+    for namespace, counters in _stats.items():
+        lookups = sum(counters.values())
+        hits = lookups - counters["misses"]
+        stats[namespace] = {**counters, "hit_rate": round(hits / lookups, 4) if lookups else 0.0}
+    return {"namespaces": stats, "l1_entries": len(_l1)}
+
+
+def clear_local_cache() -> None:
+    """Drop the in-process cache and counters"""
+    _l1.clear()
+    _stats.clear()
@@ -1,14 +1,14 @@
 """
 Speech recognition and text-to-speech services using OpenAI Whisper
 """
-import openai
 from typing import Optional, Dict, Any
 from fastapi import UploadFile
 import os
 from datetime import datetime
 from app.core.config import settings
-
-openai.api_key = settings.OPENAI_API_KEY
+from app.services.ai.llm_gateway import llm_gateway
+from app.services.ai.structured_output import structured_chat
+from app.schemas.ai import PronunciationScores
 
 
 async def save_audio_file(
@@ -36,7 +36,7 @@ async def save_audio_file(
     return f"/uploads/audio/{user_id}/{filename}"
 
 
-async def transcribe_audio(audio_path: str) -> str:
+async def transcribe_audio(audio_path: str, user_id: Optional[int] = None) -> str:
     """Transcribe audio using OpenAI Whisper"""
 
     try:
@@ -44,12 +44,7 @@ async def transcribe_audio(audio_path: str) -> str:
         full_path = os.path.join(os.getcwd(), audio_path.lstrip("/"))
 
         with open(full_path, "rb") as audio_file:
-            transcript = await openai.Audio.atranscribe(
-                model="whisper-1",
-                file=audio_file
-            )
-
-        return transcript.text
+            return await llm_gateway.transcribe(audio_file, user_id=user_id)
 
     except Exception as e:
         print(f"Transcription error: {e}")
@@ -58,7 +53,8 @@ async def transcribe_audio(audio_path: str) -> str:
 
 async def evaluate_pronunciation(
     transcription: str,
-    expected_text: Optional[str] = None
+    expected_text: Optional[str] = None,
+    user_id: Optional[int] = None
 ) -> Dict[str, float]:
     """Evaluate pronunciation quality"""
 
@@ -96,24 +92,18 @@ Rate on a scale of 0-100:
 1. Pronunciation quality
 2. Fluency
 3. Overall accuracy
-
-Return as JSON: {{"pronunciation": X, "fluency": Y, "accuracy": Z}}
 """
 
-        response = await openai.ChatCompletion.acreate(
-            model=settings.OPENAI_MODEL,
-            messages=[{"role": "user", "content": prompt}],
+        scores = await structured_chat(
+            PronunciationScores,
+            "pronunciation",
+            [{"role": "user", "content": prompt}],
+            user_id=user_id,
+            cache=False,
             temperature=0.3
         )
 
-        import json
-        scores = json.loads(response.choices[0].message.content)
-
-        return {
-            "pronunciation": scores.get("pronunciation", 70),
-            "fluency": scores.get("fluency", 70),
-            "accuracy": scores.get("accuracy", accuracy)
-        }
+        return scores.model_dump()
 
     except Exception as e:
         print(f"Evaluation error: {e}")
@@ -124,17 +114,11 @@ Return as JSON: {{"pronunciation": X, "fluency": Y, "accuracy": Z}}
         }
 
 
-async def text_to_speech(text: str, language: str = "en") -> bytes:
+async def text_to_speech(text: str, language: str = "en", user_id: Optional[int] = None) -> bytes:
     """Convert text to speech using OpenAI TTS"""
 
     try:
-        response = await openai.Audio.create_speech(
-            model="tts-1",
-            voice="alloy",
-            input=text
-        )
-
-        return response.content
+        return await llm_gateway.speech(text, voice="alloy", user_id=user_id)
 
     except Exception as e:
         print(f"TTS error: {e}")
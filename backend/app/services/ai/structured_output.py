@@ -0,0 +1,212 @@
+"""
+Structured JSON output from the AI
+
+Tasks that need JSON (grammar analysis, writing and pronunciation
+evaluation, exercises) go through structured_chat with a pydantic schema:
+
+1. The request asks for the schema explicitly: as a forced function call
+   (LLM_STRUCTURED_OUTPUT_MODE=function), with JSON mode (json_mode, for
+   models that support it) or in the prompt only (prompt). The schema is
+   also described in the prompt, so providers that ignore the first two
+   still know the expected keys.
+2. The reply is parsed and validated. If that fails, a local repair pass
+   (code fences, surrounding prose, trailing commas, Python literals) is
+   tried before anything else.
+3. Only then is the model asked again, shown its reply and the error, up
+   to LLM_STRUCTURED_OUTPUT_RETRIES times.
+
+Per-task counters of parse failures, repairs, retries and failures are
+kept (see get_structured_output_stats).
+"""
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional, Type, TypeVar
+from pydantic import BaseModel, ValidationError
+from app.core.config import settings
+from app.services.ai.llm_gateway import llm_gateway
+from app.services.ai.response_cache import cached_result
+
+logger = logging.getLogger(__name__)
+
+Schema = TypeVar("Schema", bound=BaseModel)
+
+_CODE_FENCE = re.compile(r"^\s*```[a-zA-Z]*\s*\n?(.*?)\n?\s*```\s*$", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_PYTHON_LITERAL = re.compile(r"\b(True|False|None)\b")
+
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+class StructuredOutputError(ValueError):
+    """Raised when the AI reply cannot be turned into the task's schema"""
+
+
+def _count(task: str, outcome: str, amount: int = 1) -> None:
+    counters = _stats.setdefault(task, {
+        "requests": 0, "replies": 0, "parse_failures": 0, "repaired": 0, "retries": 0, "failures": 0
+    })
+    counters[outcome] += amount
+
+
+def repair_json(text: str) -> str:
+    """
+    Fix the usual ways a model breaks JSON
+
+    Strips Markdown code fences and any prose around the outermost object,
+    drops trailing commas and turns Python literals into JSON ones.
+    """
+    fenced = _CODE_FENCE.match(text)
+    if fenced:
+        text = fenced.group(1)
+
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        text = text[start:end + 1]
+
+    text = _TRAILING_COMMA.sub(r"\1", text)
+    return _PYTHON_LITERAL.sub(lambda match: _PYTHON_LITERALS[match.group(1)], text)
+
+
+def parse_structured(text: str, schema: Type[Schema], task: Optional[str] = None) -> Schema:
+    """
+    Parse and validate a reply, repairing it locally if needed
+
+    Args:
+        text: Raw reply text
+        schema: Expected shape
+        task: Name the counters are kept under
+
+    Returns:
+        Validated schema instance
+
+    Raises:
+        StructuredOutputError: If the reply is not usable even after repair
+    """
+    try:
+        return schema.model_validate_json(text)
+    except ValidationError as e:
+        error = e
+    if task:
+        _count(task, "parse_failures")
+
+    repaired = repair_json(text)
+    if repaired != text:
+        try:
+            result = schema.model_validate(json.loads(repaired))
+        except (ValueError, ValidationError) as e:
+            error = e
+        else:
+            if task:
+                _count(task, "repaired")
+            return result
+
+    raise StructuredOutputError(f"{schema.__name__}: {error}")
+
+
+def _schema_instruction(schema: Type[BaseModel]) -> str:
+    return (
+        "\n\nRespond with only a JSON object matching this JSON Schema:\n"
+        + json.dumps(schema.model_json_schema(), separators=(",", ":"))
+    )
+
+
+def _request_params(schema: Type[BaseModel], task: str) -> Dict[str, Any]:
+    mode = settings.LLM_STRUCTURED_OUTPUT_MODE
+    if mode == "function":
+        name = f"submit_{task}"
+        return {
+            "tools": [{
+                "type": "function",
+                "function": {"name": name, "parameters": schema.model_json_schema()}
+            }],
+            "tool_choice": {"type": "function", "function": {"name": name}}
+        }
+    if mode == "json_mode":
+        return {"response_format": {"type": "json_object"}}
+    return {}
+
+
+async def _request(
+    schema: Type[Schema],
+    task: str,
+    messages: List[Dict[str, str]],
+    user_id: Optional[int],
+    timeout: Optional[float],
+    params: Dict[str, Any]
+) -> Schema:
+    _count(task, "requests")
+    messages = [*messages[:-1], {
+        "role": messages[-1]["role"],
+        "content": messages[-1]["content"] + _schema_instruction(schema)
+    }]
+    params = {**params, **_request_params(schema, task)}
+
+    for attempt in range(settings.LLM_STRUCTURED_OUTPUT_RETRIES + 1):
+        response = await llm_gateway.chat(messages, user_id=user_id, timeout=timeout, **params)
+        _count(task, "replies")
+        try:
+            return parse_structured(response.content, schema, task)
+        except StructuredOutputError as e:
+            if attempt == settings.LLM_STRUCTURED_OUTPUT_RETRIES:
+                _count(task, "failures")
+                raise
+            _count(task, "retries")
+            logger.warning(f"Unusable {task} reply, asking again: {e}")
+            messages = [
+                *messages,
+                {"role": "assistant", "content": response.content},
+                {"role": "user", "content": f"That reply was not valid ({e}). Send only the corrected JSON object."}
+            ]
+
+
+async def structured_chat(
+    schema: Type[Schema],
+    task: str,
+    messages: List[Dict[str, str]],
+    user_id: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cache: bool = True,
+    **params: Any
+) -> Schema:
+    """
+    Ask for a reply in a given schema
+
+    Args:
+        schema: Expected shape of the reply
+        task: Task name (grammar, writing, ...), for the cache and counters
+        messages: Chat messages; the schema is described after the last one
+        user_id: User the call is made for (per-user limit)
+        timeout: Seconds per attempt
+        cache: Whether results may be served from the response cache
+        **params: Extra completion parameters (temperature, max_tokens, ...)
+
+    Returns:
+        Validated schema instance
+
+    Raises:
+        StructuredOutputError: If no usable reply was obtained
+    """
+    async def compute() -> Dict[str, Any]:
+        result = await _request(schema, task, messages, user_id, timeout, params)
+        return result.model_dump()
+
+    if not cache:
+        return schema.model_validate(await compute())
+
+    value = await cached_result(task, messages, {**params, "schema": schema.__name__}, compute)
+    return schema.model_validate(value)
+
+
+def get_structured_output_stats() -> Dict[str, Dict[str, Any]]:
+    """Parse and retry counters of this process, per task"""
+    stats = {}
+    for task, counters in _stats.items():
+        replies = counters["replies"]
+        stats[task] = {
+            **counters,
+            "parse_failure_rate": round(counters["parse_failures"] / replies, 4) if replies else 0.0,
+            "failure_rate": round(counters["failures"] / counters["requests"], 4) if counters["requests"] else 0.0
+        }
+    return stats
@@ -0,0 +1,99 @@
+"""
+Background evaluation of writing submissions
+
+submit_writing saves the submission with evaluation_status "pending" and
+returns; the evaluation runs on a Celery worker (app.tasks.writing), or
+in-process when CELERY_TASK_ALWAYS_EAGER is set or the broker is down. No database session is
+held while waiting for the AI. Clients poll
+GET /writing/submissions/{id}/status.
+"""
+import logging
+from typing import Optional
+from app.db.session import SessionLocal
+from app.models.writing import WritingSubmission, WritingEvaluation
+from app.services.ai.openai_service import evaluate_writing
+
+logger = logging.getLogger(__name__)
+
+EVALUATION_STATUSES = ("pending", "processing", "completed", "failed")
+
+
+def _set_status(submission_id: int, evaluation_status: str) -> None:
+    db = SessionLocal()
+    try:
+        db.query(WritingSubmission).filter(WritingSubmission.id == submission_id).update(
+            {WritingSubmission.evaluation_status: evaluation_status},
+            synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def mark_evaluation_failed(submission_id: int) -> None:
+    """Record that a submission could not be evaluated"""
+    _set_status(submission_id, "failed")
+
+
+async def evaluate_submission(submission_id: int) -> Optional[str]:
+    """
+    Evaluate a submission and store the result
+
+    Safe to run again for the same submission (e.g. on a task retry).
+
+    Args:
+        submission_id: Writing submission ID
+
+    Returns:
+        The new evaluation status, or None if the submission does not exist
+
+    Raises:
+        Errors of the AI call, so the caller can retry or give up
+    """
+    db = SessionLocal()
+    try:
+        submission = db.query(WritingSubmission).filter(WritingSubmission.id == submission_id).first()
+        if not submission:
+            return None
+        if submission.evaluation_status == "completed":
+            return "completed"
+
+        submission.evaluation_status = "processing"
+        db.commit()
+        content = submission.content
+        language_id = submission.language_id
+        writing_type = submission.writing_type
+        user_id = submission.user_id
+    finally:
+        db.close()
+
+    result = await evaluate_writing(
+        content=content,
+        language_id=language_id,
+        writing_type=writing_type,
+        user_id=user_id,
+        fallback=False
+    )
+
+    db = SessionLocal()
+    try:
+        if not db.query(WritingEvaluation.id).filter(WritingEvaluation.submission_id == submission_id).first():
+            db.add(WritingEvaluation(submission_id=submission_id, **result))
+        db.query(WritingSubmission).filter(WritingSubmission.id == submission_id).update(
+            {WritingSubmission.evaluation_status: "completed"},
+            synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    return "completed"
+
+
+async def run_evaluation_in_process(submission_id: int) -> None:
+    """Eager mode: evaluate right away, marking the submission failed on errors"""
+    try:
+        await evaluate_submission(submission_id)
+    except Exception as e:
+        logger.error(f"Writing evaluation failed for submission {submission_id}: {e!r}")
+        mark_evaluation_failed(submission_id)
@@ -0,0 +1,144 @@
+"""
+Serialized vocabulary card cache
+
+Vocabulary rows are static dictionary data shared by every user, yet each
+/due response used to load and re-serialize them per card. Serialized card
+JSON is cached in Redis under vocabulary:card:{id}, tagged with the row's
+updated_at so a changed row is never served stale. Per-user scheduling
+fields are merged onto the cached blobs as raw JSON text, so cached cards
+are never decoded again.
+
+Admin changes to a word call invalidate_card.
+"""
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+import redis
+from sqlalchemy.orm import Session
+from app.db.redis import redis_client
+from app.models.vocabulary import Vocabulary, UserVocabulary
+
+logger = logging.getLogger(__name__)
+
+CARD_TTL_SECONDS = 7 * 24 * 3600
+
+# Fields of VocabularySchema, in response order
+CARD_FIELDS = (
+    "id", "word", "translation", "pronunciation", "part_of_speech",
+    "definition", "example_sentence", "image_url", "audio_url"
+)
+
+# Per-user fields of UserVocabularySchema, in response order
+PROGRESS_FIELDS = (
+    "id", "vocabulary_id", "status", "ease_factor", "interval", "next_review_date",
+    "times_reviewed", "times_correct", "times_incorrect"
+)
+
+
+def _card_key(vocabulary_id: int) -> str:
+    return f"vocabulary:card:{vocabulary_id}"
+
+
+def card_version(updated_at: Optional[datetime], created_at: Optional[datetime]) -> str:
+    """Cache version tag of a vocabulary row"""
+    stamp = updated_at or created_at
+    return stamp.isoformat() if stamp else ""
+
+
+def serialize_card(vocabulary: Vocabulary) -> str:
+    """Card JSON as returned by the API"""
+    return json.dumps({field: getattr(vocabulary, field) for field in CARD_FIELDS}, separators=(",", ":"))
+
+
+def get_card_payloads(versions: Dict[int, str], db: Session) -> Dict[int, str]:
+    """
+    Read-through lookup of serialized cards
+
+    Args:
+        versions: Mapping of vocabulary_id to its current version tag
+        db: Database session
+
+    Returns:
+        Mapping of vocabulary_id to card JSON
+    """
+    ids = list(versions)
+    payloads: Dict[int, str] = {}
+
+    try:
+        cached = redis_client.mget([_card_key(vocab_id) for vocab_id in ids])
+    except redis.RedisError as e:
+        logger.warning(f"Card cache unavailable: {e}")
+        cached = [None] * len(ids)
+
+    for vocab_id, entry in zip(ids, cached):
+        if entry:
+            version, _, card = entry.partition("\n")
+            if version == versions[vocab_id]:
+                payloads[vocab_id] = card
+
+    missing = [vocab_id for vocab_id in ids if vocab_id not in payloads]
+    if not missing:
+        return payloads
+
+    pipe = redis_client.pipeline(transaction=False)
+    for vocabulary in db.query(Vocabulary).filter(Vocabulary.id.in_(missing)):
+        card = serialize_card(vocabulary)
+        payloads[vocabulary.id] = card
+        version = card_version(vocabulary.updated_at, vocabulary.created_at)
+        pipe.set(_card_key(vocabulary.id), f"{version}\n{card}", ex=CARD_TTL_SECONDS)
+
+    try:
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Card cache unavailable: {e}")
+
+    return payloads
+
+
+def invalidate_card(vocabulary_id: int) -> None:
+    """Drop a word from the card cache"""
+    try:
+        redis_client.delete(_card_key(vocabulary_id))
+    except redis.RedisError as e:
+        logger.warning(f"Card cache unavailable: {e}")
+
+
+def render_due_cards(card_ids: List[int], db: Session) -> str:
+    """
+    Build the /due response body for the given cards
+
+    Args:
+        card_ids: UserVocabulary ids in response order
+        db: Database session
+
+    Returns:
+        JSON array of UserVocabularySchema objects
+    """
+    if not card_ids:
+        return "[]"
+
+    rows = db.query(
+        *[getattr(UserVocabulary, field) for field in PROGRESS_FIELDS],
+        Vocabulary.updated_at,
+        Vocabulary.created_at
+    ).join(Vocabulary, Vocabulary.id == UserVocabulary.vocabulary_id).filter(
+        UserVocabulary.id.in_(card_ids)
+    ).all()
+
+    payloads = get_card_payloads(
+        {row.vocabulary_id: card_version(row.updated_at, row.created_at) for row in rows},
+        db
+    )
+
+    by_id = {row.id: row for row in rows}
+    items = []
+    for card_id in card_ids:
+        row = by_id.get(card_id)
+        if row is None or row.vocabulary_id not in payloads:
+            continue
+        progress = {field: getattr(row, field) for field in PROGRESS_FIELDS}
+        progress = json.dumps(progress, default=datetime.isoformat, separators=(",", ":"))
+        items.append(f'{progress[:-1]},"vocabulary":{payloads[row.vocabulary_id]}}}')
+
+    return f"[{','.join(items)}]"
@@ -0,0 +1,201 @@
+"""
+Daily flashcard session materialization
+
+A user's session for the day is built once from the due-card and new-card
+queries and stored in Redis as an ordered list of vocabulary ids. Later
+requests only pop ids from the list and hydrate those cards.
+
+When Redis is unavailable the session is rebuilt from the database on
+every request instead. Reviewed cards drop out of the due and new-card
+queries, so the user still works through the day's queue; only the
+bookkeeping of the stored session is lost.
+"""
+import logging
+from datetime import datetime, date
+from typing import List, Dict, Any, Optional
+import redis
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.redis import redis_client
+from app.models.user import UserPreference
+from app.models.vocabulary import Vocabulary, UserVocabulary
+from app.services.flashcard.spaced_repetition import get_daily_review_cards
+
+logger = logging.getLogger(__name__)
+
+# Sessions outlive the day they were built for by a few hours so late
+# reviewers around midnight keep their queue
+SESSION_TTL_SECONDS = 30 * 60 * 60
+
+
+def _session_keys(user_id: int, language_id: int, day: date) -> tuple[str, str]:
+    """Redis keys for the card list and the session summary"""
+    base = f"flashcards:session:{user_id}:{language_id}:{day.isoformat()}"
+    return f"{base}:cards", f"{base}:meta"
+
+
+def _new_cards_limit(user_id: int, db: Session) -> int:
+    """Daily new-card budget from the user's preferences"""
+    new_words_per_day = db.query(UserPreference.new_words_per_day).filter(
+        UserPreference.user_id == user_id
+    ).scalar()
+
+    if new_words_per_day is None:
+        return settings.FLASHCARD_NEW_CARDS_PER_DAY
+    return new_words_per_day
+
+
+def _collect_session(
+    user_id: int,
+    language_id: int,
+    db: Session,
+    day: date
+) -> tuple[List[int], Dict[str, Any]]:
+    """Vocabulary ids of the day's session, in order, and its summary"""
+    cards = get_daily_review_cards(
+        user_id=user_id,
+        language_id=language_id,
+        max_new=_new_cards_limit(user_id, db),
+        max_review=settings.FLASHCARD_REVIEW_CARDS_PER_DAY,
+        db=db
+    )
+
+    # Due reviews come first, then new words
+    vocabulary_ids = [card.vocabulary_id for card in cards["review_cards"]]
+    vocabulary_ids += [word.id for word in cards["new_cards"]]
+
+    meta = {
+        "date": day.isoformat(),
+        "review_cards": len(cards["review_cards"]),
+        "new_cards": len(cards["new_cards"]),
+        "total_cards": len(vocabulary_ids)
+    }
+    return vocabulary_ids, meta
+
+
+def build_daily_session(
+    user_id: int,
+    language_id: int,
+    db: Session,
+    day: Optional[date] = None
+) -> Dict[str, Any]:
+    """
+    Build (or rebuild) a user's session for the day and store it in Redis
+
+    Args:
+        user_id: User ID
+        language_id: Language ID
+        db: Database session
+        day: Session date, defaults to today (UTC)
+
+    Returns:
+        Session summary
+    """
+    day = day or datetime.utcnow().date()
+    cards_key, meta_key = _session_keys(user_id, language_id, day)
+    vocabulary_ids, meta = _collect_session(user_id, language_id, db, day)
+
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.delete(cards_key)
+    if vocabulary_ids:
+        pipe.rpush(cards_key, *vocabulary_ids)
+        pipe.expire(cards_key, SESSION_TTL_SECONDS)
+    pipe.hset(meta_key, mapping=meta)
+    pipe.expire(meta_key, SESSION_TTL_SECONDS)
+    pipe.execute()
+
+    return {**meta, "remaining": len(vocabulary_ids)}
+
+
+def start_daily_session(user_id: int, language_id: int, db: Session) -> Dict[str, Any]:
+    """
+    Get today's session summary, materializing the session on first use
+
+    Args:
+        user_id: User ID
+        language_id: Language ID
+        db: Database session
+
+    Returns:
+        Session summary with the number of remaining cards
+    """
+    day = datetime.utcnow().date()
+    cards_key, meta_key = _session_keys(user_id, language_id, day)
+
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hgetall(meta_key)
+        pipe.llen(cards_key)
+        meta, remaining = pipe.execute()
+
+        if not meta:
+            return build_daily_session(user_id, language_id, db, day=day)
+    except redis.RedisError as e:
+        logger.warning(f"Session store unavailable, building the session from the database: {e}")
+        vocabulary_ids, meta = _collect_session(user_id, language_id, db, day)
+        return {**meta, "remaining": len(vocabulary_ids)}
+
+    return {
+        "date": meta["date"],
+        "review_cards": int(meta["review_cards"]),
+        "new_cards": int(meta["new_cards"]),
+        "total_cards": int(meta["total_cards"]),
+        "remaining": remaining
+    }
+
+
+def pop_session_cards(
+    user_id: int,
+    language_id: int,
+    count: int,
+    db: Session
+) -> List[Dict[str, Any]]:
+    """
+    Hand out the next cards of today's session
+
+    Args:
+        user_id: User ID
+        language_id: Language ID
+        count: Number of cards to take
+        db: Database session
+
+    Returns:
+        List of dicts with the vocabulary, the user's progress on it (None
+        for new words) and an is_new flag, in session order
+    """
+    day = datetime.utcnow().date()
+    cards_key, meta_key = _session_keys(user_id, language_id, day)
+
+    try:
+        if not redis_client.exists(meta_key):
+            build_daily_session(user_id, language_id, db, day=day)
+
+        vocabulary_ids = [int(vocab_id) for vocab_id in redis_client.lpop(cards_key, count) or []]
+    except redis.RedisError as e:
+        logger.warning(f"Session store unavailable, building the session from the database: {e}")
+        vocabulary_ids = _collect_session(user_id, language_id, db, day)[0][:count]
+
+    if not vocabulary_ids:
+        return []
+
+    words = {
+        word.id: word
+        for word in db.query(Vocabulary).filter(Vocabulary.id.in_(vocabulary_ids)).all()
+    }
+    progress = {
+        user_vocab.vocabulary_id: user_vocab
+        for user_vocab in db.query(UserVocabulary).filter(
+            UserVocabulary.user_id == user_id,
+            UserVocabulary.vocabulary_id.in_(vocabulary_ids)
+        ).all()
+    }
+
+    return [
+        {
+            "vocabulary": words[vocab_id],
+            "progress": progress.get(vocab_id),
+            "is_new": vocab_id not in progress
+        }
+        for vocab_id in vocabulary_ids
+        if vocab_id in words
+    ]
@@ -0,0 +1,311 @@
+"""
+Offline deck sync
+
+A user's whole deck for one language is exported as a compact binary
+snapshot (card content plus SM-2 state), so mobile clients can review
+without a connection. Reviews made offline come back as a binary review
+log and are applied in bulk.
+
+Deck snapshot (format version 1), zlib-compressed after the header:
+
+    header  "LLDK" | version u16 | flags u16 | language_id u32
+            | watermark i64 (epoch microseconds) | card count u32
+    card    user_vocabulary_id u32 | vocabulary_id u32 | status u8
+            | ease_factor f32 | interval u32 | repetitions u16
+            | next_review_date i64 (epoch seconds, 0 = none)
+            | times_reviewed u32 | times_correct u32 | times_incorrect u32
+            | 8 strings (CARD_FIELDS), each u16 byte length + UTF-8,
+              length 0xFFFF = null
+
+The watermark is the newest change in the deck. The deck's ETag carries
+it, so a client sending If-None-Match gets 304 when nothing changed, or a
+delta snapshot (FLAG_DELTA) holding only the cards changed since then.
+
+Review log (format version 1), uncompressed:
+
+    header  "LLRV" | version u16 | review count u32
+    review  vocabulary_id u32 | quality u8 | time_taken_seconds u16
+            | reviewed_at i64 (epoch seconds)
+
+All integers are little-endian.
+"""
+import re
+import struct
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from app.models.vocabulary import Vocabulary, UserVocabulary
+
+DECK_MAGIC = b"LLDK"
+REVIEWS_MAGIC = b"LLRV"
+FORMAT_VERSION = 1
+
+FLAG_DELTA = 1
+
+DECK_HEADER = struct.Struct("<4sHHIqI")
+CARD_STATE = struct.Struct("<IIBfIHqIII")
+REVIEWS_HEADER = struct.Struct("<4sHI")
+REVIEW_RECORD = struct.Struct("<IBHq")
+STRING_LENGTH = struct.Struct("<H")
+NULL_STRING = 0xFFFF
+
+STATUSES = ("new", "learning", "review", "mastered")
+
+CARD_FIELDS = (
+    "word", "translation", "pronunciation", "part_of_speech",
+    "definition", "example_sentence", "image_url", "audio_url"
+)
+
+# Latest reviewed_at a review log may carry (end of datetime's range)
+MAX_REVIEWED_AT = int(datetime(9999, 12, 31, tzinfo=timezone.utc).timestamp())
+
+ETAG_PATTERN = re.compile(r'^(?:W/)?"deck-(\d+)-(\d+)-(\d+)"$')
+
+
+class DeckFormatError(ValueError):
+    """Raised for malformed or unsupported binary payloads"""
+
+
+def _to_epoch_micros(value: Optional[datetime]) -> int:
+    if value is None:
+        return 0
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1_000_000)
+
+
+def _from_epoch_micros(value: int) -> datetime:
+    return datetime.fromtimestamp(value / 1_000_000, tz=timezone.utc)
+
+
+def deck_etag(language_id: int, watermark: int) -> str:
+    """ETag of a deck snapshot"""
+    return f'"deck-{FORMAT_VERSION}-{language_id}-{watermark}"'
+
+
+def parse_deck_etag(etag: Optional[str], language_id: int) -> Optional[int]:
+    """Watermark of a client's ETag, or None when it is missing or not usable"""
+    match = ETAG_PATTERN.match((etag or "").strip())
+    if not match:
+        return None
+    version, etag_language, watermark = (int(group) for group in match.groups())
+    if version != FORMAT_VERSION or etag_language != language_id:
+        return None
+    return watermark
+
+
+def encode_deck(language_id: int, watermark: int, cards: List[Dict[str, Any]], delta: bool = False) -> bytes:
+    """
+    Pack cards into a deck snapshot
+
+    Args:
+        language_id: Language of the deck
+        watermark: Newest change in the deck (epoch microseconds)
+        cards: Dicts with the card state and CARD_FIELDS
+        delta: Whether the snapshot only holds changed cards
+
+    Returns:
+        Snapshot bytes
+    """
+    body = bytearray()
+    for card in cards:
+        next_review = card.get("next_review_date")
+        body += CARD_STATE.pack(
+            card["id"],
+            card["vocabulary_id"],
+            STATUSES.index(card.get("status") or "new"),
+            card.get("ease_factor") or 2.5,
+            card.get("interval") or 0,
+            min(card.get("repetitions") or 0, 0xFFFF),
+            _to_epoch_micros(next_review) // 1_000_000 if next_review else 0,
+            card.get("times_reviewed") or 0,
+            card.get("times_correct") or 0,
+            card.get("times_incorrect") or 0
+        )
+        for field in CARD_FIELDS:
+            value = card.get(field)
+            if value is None:
+                body += STRING_LENGTH.pack(NULL_STRING)
+                continue
+            # Cut on a character boundary so the client always gets valid UTF-8
+            encoded = value.encode("utf-8")[:NULL_STRING - 1].decode("utf-8", "ignore").encode("utf-8")
+            body += STRING_LENGTH.pack(len(encoded)) + encoded
+
+    header = DECK_HEADER.pack(
+        DECK_MAGIC, FORMAT_VERSION, FLAG_DELTA if delta else 0, language_id, watermark, len(cards)
+    )
+    return header + zlib.compress(bytes(body))
+
+
+def decode_deck(payload: bytes) -> Dict[str, Any]:
+    """
+    Unpack a deck snapshot (the client side of encode_deck)
+
+    Returns:
+        Dict with language_id, watermark, delta and cards
+    """
+    try:
+        magic, version, flags, language_id, watermark, count = DECK_HEADER.unpack_from(payload)
+    except struct.error:
+        raise DeckFormatError("Truncated deck header")
+    if magic != DECK_MAGIC or version != FORMAT_VERSION:
+        raise DeckFormatError("Unsupported deck format")
+
+    try:
+        body = zlib.decompress(payload[DECK_HEADER.size:])
+    except zlib.error:
+        raise DeckFormatError("Corrupt deck body")
+
+    cards = []
+    offset = 0
+    try:
+        for _ in range(count):
+            (card_id, vocabulary_id, status_index, ease_factor, interval, repetitions,
+             next_review, times_reviewed, times_correct, times_incorrect) = CARD_STATE.unpack_from(body, offset)
+            offset += CARD_STATE.size
+            card = {
+                "id": card_id,
+                "vocabulary_id": vocabulary_id,
+                "status": STATUSES[status_index],
+                "ease_factor": ease_factor,
+                "interval": interval,
+                "repetitions": repetitions,
+                "next_review_date": _from_epoch_micros(next_review * 1_000_000) if next_review else None,
+                "times_reviewed": times_reviewed,
+                "times_correct": times_correct,
+                "times_incorrect": times_incorrect
+            }
+            for field in CARD_FIELDS:
+                (length,) = STRING_LENGTH.unpack_from(body, offset)
+                offset += STRING_LENGTH.size
+                if length == NULL_STRING:
+                    card[field] = None
+                    continue
+                card[field] = body[offset:offset + length].decode("utf-8")
+                offset += length
+            cards.append(card)
+    except (struct.error, IndexError):
+        raise DeckFormatError("Truncated deck body")
+
+    return {
+        "language_id": language_id,
+        "watermark": watermark,
+        "delta": bool(flags & FLAG_DELTA),
+        "cards": cards
+    }
+
+
+def encode_reviews(reviews: List[Dict[str, Any]]) -> bytes:
+    """Pack an offline review log (the client side of decode_reviews)"""
+    body = bytearray(REVIEWS_HEADER.pack(REVIEWS_MAGIC, FORMAT_VERSION, len(reviews)))
+    for review in reviews:
+        body += REVIEW_RECORD.pack(
+            review["vocabulary_id"],
+            review["quality"],
+            min(review.get("time_taken_seconds") or 0, 0xFFFF),
+            _to_epoch_micros(review["reviewed_at"]) // 1_000_000
+        )
+    return bytes(body)
+
+
+def decode_reviews(payload: bytes) -> List[Dict[str, Any]]:
+    """
+    Unpack an offline review log
+
+    Returns:
+        Review dicts accepted by apply_flashcard_reviews_batch
+    """
+    try:
+        magic, version, count = REVIEWS_HEADER.unpack_from(payload)
+    except struct.error:
+        raise DeckFormatError("Truncated review log header")
+    if magic != REVIEWS_MAGIC or version != FORMAT_VERSION:
+        raise DeckFormatError("Unsupported review log format")
+    if len(payload) != REVIEWS_HEADER.size + count * REVIEW_RECORD.size:
+        raise DeckFormatError("Review log length does not match its header")
+
+    reviews = []
+    for vocabulary_id, quality, time_taken, reviewed_at in REVIEW_RECORD.iter_unpack(payload[REVIEWS_HEADER.size:]):
+        if quality > 5:
+            raise DeckFormatError(f"Invalid quality {quality} for vocabulary {vocabulary_id}")
+        if not 0 <= reviewed_at <= MAX_REVIEWED_AT:
+            raise DeckFormatError(f"Invalid review time {reviewed_at} for vocabulary {vocabulary_id}")
+        reviews.append({
+            "vocabulary_id": vocabulary_id,
+            "quality": quality,
+            "time_taken_seconds": time_taken,
+            "reviewed_at": _from_epoch_micros(reviewed_at * 1_000_000)
+        })
+    return reviews
+
+
+def get_deck_watermark(user_id: int, language_id: int, db: Session) -> int:
+    """Newest change to a user's deck or its vocabulary (epoch microseconds)"""
+    changed = db.query(
+        func.max(func.coalesce(UserVocabulary.updated_at, UserVocabulary.created_at)),
+        func.max(func.coalesce(Vocabulary.updated_at, Vocabulary.created_at))
+    ).join(Vocabulary, Vocabulary.id == UserVocabulary.vocabulary_id).filter(
+        UserVocabulary.user_id == user_id,
+        UserVocabulary.language_id == language_id
+    ).one()
+
+    return max(_to_epoch_micros(value) for value in changed)
+
+
+def export_deck(
+    user_id: int,
+    language_id: int,
+    db: Session,
+    since: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Build a deck snapshot
+
+    Args:
+        user_id: User ID
+        language_id: Language ID
+        db: Database session
+        since: Watermark of the client's copy; only newer changes are exported
+
+    Returns:
+        Dict with watermark, etag and payload (None when nothing changed)
+    """
+    watermark = get_deck_watermark(user_id, language_id, db)
+    etag = deck_etag(language_id, watermark)
+
+    if since is not None and since >= watermark:
+        return {"watermark": watermark, "etag": etag, "payload": None}
+
+    query = db.query(
+        UserVocabulary.id,
+        UserVocabulary.vocabulary_id,
+        UserVocabulary.status,
+        UserVocabulary.ease_factor,
+        UserVocabulary.interval,
+        UserVocabulary.repetitions,
+        UserVocabulary.next_review_date,
+        UserVocabulary.times_reviewed,
+        UserVocabulary.times_correct,
+        UserVocabulary.times_incorrect,
+        *[getattr(Vocabulary, field) for field in CARD_FIELDS]
+    ).join(Vocabulary, Vocabulary.id == UserVocabulary.vocabulary_id).filter(
+        UserVocabulary.user_id == user_id,
+        UserVocabulary.language_id == language_id
+    )
+
+    if since is not None:
+        changed_after = _from_epoch_micros(since)
+        query = query.filter(or_(
+            func.coalesce(UserVocabulary.updated_at, UserVocabulary.created_at) > changed_after,
+            func.coalesce(Vocabulary.updated_at, Vocabulary.created_at) > changed_after
+        ))
+
+    cards = [row._asdict() for row in query.order_by(UserVocabulary.id)]
+
+    return {
+        "watermark": watermark,
+        "etag": etag,
+        "payload": encode_deck(language_id, watermark, cards, delta=since is not None)
+    }
@@ -0,0 +1,170 @@
+"""
+Review load forecasting
+
+Projects how many flashcard reviews will come due per day (and per hour)
+over the next N days. The inputs are two histogram queries:
+- scheduled due dates per (day, interval) from user_vocabulary
+- recent review outcomes per hour of day from flashcard_reviews
+
+Reviews that come due inside the horizon are assumed to be done on their
+due day and rescheduled with SM-2 style interval growth, so follow-up
+reviews generated within the window are included in the projection.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models.vocabulary import UserVocabulary, FlashcardReview
+
+# Window of review history used for the recall rate and the hourly profile
+HISTORY_DAYS = 30
+
+
+def project_review_load(
+    scheduled: np.ndarray,
+    success_rate: float,
+    ease_factor: float
+) -> np.ndarray:
+    """
+    Propagate scheduled reviews through the horizon
+
+    Args:
+        scheduled: Due-card counts of shape (days, days + 1); column i holds
+            cards with a current interval of i days (the last column collects
+            every interval that is at least the horizon)
+        success_rate: Share of reviews that are recalled
+        ease_factor: Average interval growth on successful recall
+
+    Returns:
+        Expected reviews per day, including follow-ups
+    """
+    days = scheduled.shape[0]
+    counts = scheduled.astype(np.float64).copy()
+    intervals = np.arange(days + 1)
+    next_intervals = np.select(
+        [intervals == 0, intervals == 1],
+        [1, 6],
+        default=np.rint(intervals * ease_factor)
+    ).astype(np.int64)
+    next_buckets = np.minimum(next_intervals, days)
+
+    total = np.zeros(days)
+    for day in range(days):
+        row = counts[day]
+        total[day] = row.sum()
+
+        # Lapsed cards come back the next day
+        if day + 1 < days:
+            counts[day + 1, 1] += total[day] * (1 - success_rate)
+
+        targets = day + next_intervals
+        inside = targets < days
+        np.add.at(counts, (targets[inside], next_buckets[inside]), row[inside] * success_rate)
+
+    return total
+
+
+def forecast_review_load(
+    db: Session,
+    days: int = 14,
+    language_id: Optional[int] = None,
+    hourly: bool = False
+) -> Dict[str, Any]:
+    """
+    Forecast review volume for the next `days` days
+
+    Args:
+        db: Database session
+        days: Forecast horizon in days
+        language_id: Restrict to one language (all languages if None)
+        hourly: Also break the forecast down per hour
+
+    Returns:
+        Forecast with per-day (and optionally per-hour) expected reviews
+    """
+    now = datetime.utcnow()
+    today = datetime(now.year, now.month, now.day)
+    horizon = today + timedelta(days=days)
+
+    # Histogram of scheduled reviews per (due day, interval)
+    due_day = func.date_trunc("day", UserVocabulary.next_review_date)
+    scheduled_query = db.query(
+        due_day.label("day"),
+        UserVocabulary.interval,
+        func.count().label("cards"),
+        func.avg(UserVocabulary.ease_factor).label("ease_factor")
+    ).filter(UserVocabulary.next_review_date < horizon)
+    if language_id:
+        scheduled_query = scheduled_query.filter(UserVocabulary.language_id == language_id)
+    buckets = scheduled_query.group_by(due_day, UserVocabulary.interval).all()
+
+    scheduled = np.zeros((days, days + 1))
+    backlog = 0
+    ease_sum = 0.0
+    for bucket in buckets:
+        offset = (bucket.day.replace(tzinfo=None) - today).days
+        if offset < 0:
+            backlog += bucket.cards
+        scheduled[max(offset, 0), min(bucket.interval or 0, days)] += bucket.cards
+        ease_sum += (bucket.ease_factor or 2.5) * bucket.cards
+    cards = scheduled.sum()
+    ease_factor = ease_sum / cards if cards else 2.5
+
+    # Histogram of recent reviews per hour of day
+    review_hour = func.extract("hour", FlashcardReview.reviewed_at)
+    history_query = db.query(
+        review_hour.label("hour"),
+        func.count().label("reviews"),
+        func.count().filter(FlashcardReview.was_correct.is_(True)).label("correct")
+    ).filter(FlashcardReview.reviewed_at >= now - timedelta(days=HISTORY_DAYS))
+    if language_id:
+        history_query = history_query.join(UserVocabulary).filter(
+            UserVocabulary.language_id == language_id
+        )
+    history = history_query.group_by(review_hour).all()
+
+    hour_profile = np.zeros(24)
+    correct = 0
+    for row in history:
+        hour_profile[int(row.hour)] = row.reviews
+        correct += row.correct
+    reviews = hour_profile.sum()
+    success_rate = correct / reviews if reviews else 0.85
+    hour_profile = hour_profile / reviews if reviews else np.full(24, 1 / 24)
+
+    total = project_review_load(scheduled, success_rate, ease_factor)
+    initial = scheduled.sum(axis=1)
+
+    forecast = {
+        "generated_at": now.isoformat(),
+        "days": days,
+        "language_id": language_id,
+        "backlog": int(backlog),
+        "recall_rate": round(float(success_rate), 4),
+        "daily": [
+            {
+                "date": (today + timedelta(days=d)).date().isoformat(),
+                "scheduled": int(initial[d]),
+                "follow_ups": round(float(total[d] - initial[d]), 1),
+                "expected_reviews": round(float(total[d]), 1)
+            }
+            for d in range(days)
+        ]
+    }
+
+    if hourly:
+        # Today's load is spread over the hours that are left
+        today_profile = np.where(np.arange(24) >= now.hour, hour_profile, 0)
+        today_profile = today_profile / today_profile.sum() if today_profile.sum() else hour_profile
+        forecast["hourly"] = [
+            {
+                "hour": (today + timedelta(days=d, hours=h)).isoformat(),
+                "expected_reviews": round(float(total[d] * (today_profile if d == 0 else hour_profile)[h]), 1)
+            }
+            for d in range(days)
+            for h in range(24)
+            if d > 0 or h >= now.hour
+        ]
+
+    return forecast
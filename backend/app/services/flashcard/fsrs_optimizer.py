@@ -0,0 +1,204 @@
+"""
+Offline fitting of per-user memory model (FSRS) parameters
+
+A user's review history is replayed card by card: every review after the
+first is a prediction of recall probability that can be scored against
+whether the user actually recalled the word. Parameters minimize the log
+loss of those predictions.
+
+All cards are replayed together as a padded (cards x reviews) matrix, and
+each optimizer step evaluates the current parameters and every finite-
+difference perturbation in a single broadcast pass, so the cost of a fit
+grows with the number of reviews per card rather than the number of cards.
+
+Cards whose early reviews have been compacted into a summary row no longer
+have a replayable sequence and are left out of the fit.
+"""
+from datetime import datetime
+from typing import Dict, Any, Optional
+import numpy as np
+from sqlalchemy import exists
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.vocabulary import (
+    UserVocabulary, FlashcardReview, FlashcardReviewSummary, UserSchedulerParameters
+)
+from app.services.flashcard.schedulers import (
+    FSRS_DEFAULT_PARAMETERS,
+    FSRS_LOWER_BOUNDS,
+    FSRS_UPPER_BOUNDS,
+    fsrs_step,
+    quality_to_grade,
+)
+
+EPSILON = 1e-6
+
+
+def build_review_matrix(
+    card_ids: np.ndarray,
+    reviewed_at: np.ndarray,
+    quality: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    Pack a review log into padded per-card sequences
+
+    Args:
+        card_ids: Card of each review
+        reviewed_at: Review times as datetime64
+        quality: Quality ratings (0-5)
+
+    Returns:
+        Dict with grade, elapsed_days and mask arrays of shape (cards, max_reviews)
+    """
+    order = np.lexsort((reviewed_at, card_ids))
+    card_ids, reviewed_at, quality = card_ids[order], reviewed_at[order], quality[order]
+
+    _, card_index, counts = np.unique(card_ids, return_inverse=True, return_counts=True)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    step = np.arange(len(card_ids)) - starts[card_index]
+
+    elapsed = np.zeros(len(card_ids))
+    same_card = np.concatenate([[False], card_ids[1:] == card_ids[:-1]])
+    elapsed[1:] = np.diff(reviewed_at).astype("timedelta64[s]").astype(np.float64) / 86400
+    elapsed[~same_card] = 0.0
+
+    shape = (len(counts), int(counts.max()))
+    grade = np.ones(shape, dtype=np.int64)
+    elapsed_days = np.zeros(shape)
+    mask = np.zeros(shape, dtype=bool)
+    grade[card_index, step] = quality_to_grade(quality)
+    elapsed_days[card_index, step] = elapsed
+    mask[card_index, step] = True
+
+    return {"grade": grade, "elapsed_days": elapsed_days, "mask": mask}
+
+
+def log_loss(w: np.ndarray, reviews: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Mean log loss of recall predictions for one or many parameter vectors
+
+    Args:
+        w: Parameters, shape (17,) or (P, 17)
+        reviews: Output of build_review_matrix
+
+    Returns:
+        Loss per parameter vector
+    """
+    grade, elapsed_days, mask = reviews["grade"], reviews["elapsed_days"], reviews["mask"]
+    state_shape = w.shape[:-1] + (grade.shape[0],)
+    stability = np.full(state_shape, np.nan)
+    difficulty = np.full(state_shape, np.nan)
+
+    total = np.zeros(w.shape[:-1])
+    count = 0
+    for k in range(grade.shape[1]):
+        active = mask[:, k]
+        next_s, next_d, r = fsrs_step(w, stability, difficulty, elapsed_days[:, k], grade[:, k])
+
+        if k > 0:
+            recalled = grade[:, k] > 1
+            r = np.clip(r, EPSILON, 1 - EPSILON)
+            loss = -np.where(recalled, np.log(r), np.log(1 - r))
+            total += np.where(active, loss, 0.0).sum(axis=-1)
+            count += int(active.sum())
+
+        stability = np.where(active, next_s, stability)
+        difficulty = np.where(active, next_d, difficulty)
+
+    return total / max(count, 1)
+
+
+def fit_parameters(
+    reviews: Dict[str, np.ndarray],
+    initial: Optional[np.ndarray] = None,
+    iterations: int = 100,
+    learning_rate: float = 0.02
+) -> tuple[np.ndarray, float]:
+    """
+    Minimize log_loss with Adam on central finite-difference gradients
+
+    Parameters are optimized relative to the defaults so that one learning
+    rate suits parameters of very different magnitudes.
+
+    Returns:
+        tuple: (fitted parameters, final log loss)
+    """
+    scale = np.maximum(np.abs(FSRS_DEFAULT_PARAMETERS), 0.05)
+    theta = (initial if initial is not None else FSRS_DEFAULT_PARAMETERS) / scale
+    lower, upper = FSRS_LOWER_BOUNDS / scale, FSRS_UPPER_BOUNDS / scale
+
+    n = len(theta)
+    h = 1e-3
+    probes = np.vstack([np.eye(n) * h, -np.eye(n) * h])
+    m = np.zeros(n)
+    v = np.zeros(n)
+    beta1, beta2 = 0.9, 0.999
+
+    for t in range(1, iterations + 1):
+        losses = log_loss((theta + probes) * scale, reviews)
+        gradient = (losses[:n] - losses[n:]) / (2 * h)
+
+        m = beta1 * m + (1 - beta1) * gradient
+        v = beta2 * v + (1 - beta2) * gradient ** 2
+        theta -= learning_rate * (m / (1 - beta1 ** t)) / (np.sqrt(v / (1 - beta2 ** t)) + 1e-8)
+        theta = np.clip(theta, lower, upper)
+
+    w = theta * scale
+    return w, float(log_loss(w, reviews))
+
+
+def fit_user_parameters(user_id: int, db: Session, iterations: int = 100) -> Optional[Dict[str, Any]]:
+    """
+    Fit and store memory model parameters from a user's review history
+
+    Args:
+        user_id: User ID
+        db: Database session
+        iterations: Optimizer steps
+
+    Returns:
+        Fit summary, or None when the user has too little history
+    """
+    history = db.query(
+        FlashcardReview.user_vocabulary_id,
+        FlashcardReview.reviewed_at,
+        FlashcardReview.quality
+    ).join(UserVocabulary).filter(
+        UserVocabulary.user_id == user_id,
+        FlashcardReview.quality.isnot(None),
+        FlashcardReview.reviewed_at.isnot(None),
+        ~exists().where(FlashcardReviewSummary.user_vocabulary_id == FlashcardReview.user_vocabulary_id)
+    ).all()
+
+    if len(history) < settings.FLASHCARD_FSRS_MIN_REVIEWS:
+        return None
+
+    card_ids, reviewed_at, quality = zip(*history)
+    reviews = build_review_matrix(
+        np.array(card_ids, dtype=np.int64),
+        np.array([ts.replace(tzinfo=None) for ts in reviewed_at], dtype="datetime64[s]"),
+        np.array(quality, dtype=np.int64)
+    )
+
+    baseline = float(log_loss(FSRS_DEFAULT_PARAMETERS, reviews))
+    parameters, loss = fit_parameters(reviews, iterations=iterations)
+
+    row = db.query(UserSchedulerParameters).filter(
+        UserSchedulerParameters.user_id == user_id
+    ).first()
+    if row is None:
+        row = UserSchedulerParameters(user_id=user_id, algorithm=settings.FLASHCARD_SCHEDULER)
+        db.add(row)
+
+    row.parameters = [round(float(x), 6) for x in parameters]
+    row.review_count = len(history)
+    row.log_loss = loss
+    row.fitted_at = datetime.utcnow()
+    db.commit()
+
+    return {
+        "user_id": user_id,
+        "review_count": len(history),
+        "default_log_loss": baseline,
+        "log_loss": loss
+    }
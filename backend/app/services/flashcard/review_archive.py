@@ -0,0 +1,182 @@
+"""
+Flashcard review archival
+
+flashcard_reviews keeps one row per review. Reviews older than
+FLASHCARD_REVIEW_RETENTION_DAYS are compacted into one
+flashcard_review_summaries row per card (count, correct count, mean and
+last quality, first/last review time), so the table stays bounded by the
+retention window instead of growing forever.
+
+Compaction moves rows with a single DELETE ... RETURNING feeding an
+INSERT ... ON CONFLICT DO UPDATE, so a review is never both deleted and
+missing from its summary.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.vocabulary import FlashcardReview, FlashcardReviewSummary
+
+
+def compact_flashcard_reviews(
+    db: Session,
+    retention_days: Optional[int] = None,
+    batch_size: int = 1000
+) -> int:
+    """
+    Fold reviews older than the retention window into per-card summaries
+
+    Args:
+        db: Database session
+        retention_days: Keep raw reviews this recent (defaults to settings)
+        batch_size: Cards compacted per transaction
+
+    Returns:
+        Number of card summaries written
+    """
+    if retention_days is None:
+        retention_days = settings.FLASHCARD_REVIEW_RETENTION_DAYS
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    summary = FlashcardReviewSummary.__table__
+    written = 0
+
+    while True:
+        cards = select(FlashcardReview.user_vocabulary_id).where(
+            FlashcardReview.reviewed_at < cutoff
+        ).distinct().limit(batch_size).scalar_subquery()
+
+        moved = delete(FlashcardReview).where(
+            FlashcardReview.reviewed_at < cutoff,
+            FlashcardReview.user_vocabulary_id.in_(cards)
+        ).returning(
+            FlashcardReview.user_vocabulary_id,
+            FlashcardReview.quality,
+            FlashcardReview.was_correct,
+            FlashcardReview.reviewed_at
+        ).cte("moved")
+
+        rollup = select(
+            moved.c.user_vocabulary_id,
+            func.count(),
+            func.count().filter(moved.c.was_correct.is_(True)),
+            func.avg(moved.c.quality),
+            func.array_agg(aggregate_order_by(moved.c.quality, moved.c.reviewed_at.desc()))[1],
+            func.min(moved.c.reviewed_at),
+            func.max(moved.c.reviewed_at)
+        ).group_by(moved.c.user_vocabulary_id)
+
+        stmt = insert(summary).from_select([
+            "user_vocabulary_id", "review_count", "correct_count", "mean_quality",
+            "last_quality", "first_reviewed_at", "last_reviewed_at"
+        ], rollup)
+        existing, new = summary.c, stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[summary.c.user_vocabulary_id],
+            set_={
+                "review_count": existing.review_count + new.review_count,
+                "correct_count": existing.correct_count + new.correct_count,
+                "mean_quality": (
+                    func.coalesce(existing.mean_quality * existing.review_count, 0)
+                    + func.coalesce(new.mean_quality * new.review_count, 0)
+                ) / (existing.review_count + new.review_count),
+                # Offline imports can compact reviews older than the ones already summarized
+                "last_quality": case(
+                    (
+                        existing.last_reviewed_at.is_(None)
+                        | (new.last_reviewed_at > existing.last_reviewed_at),
+                        new.last_quality
+                    ),
+                    else_=existing.last_quality
+                ),
+                "first_reviewed_at": func.least(existing.first_reviewed_at, new.first_reviewed_at),
+                "last_reviewed_at": func.greatest(existing.last_reviewed_at, new.last_reviewed_at),
+                "updated_at": func.now()
+            }
+        )
+
+        result = db.execute(stmt)
+        db.commit()
+
+        if not result.rowcount:
+            return written
+        written += result.rowcount
+
+
+def _merge_history(archived: Optional[Dict[str, Any]], recent: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine a card's compacted summary with the totals of its raw reviews"""
+    if not archived:
+        return recent
+
+    mean_quality = recent["mean_quality"]
+    if archived["mean_quality"] is not None and mean_quality is not None:
+        mean_quality = (
+            archived["mean_quality"] * archived["review_count"] + mean_quality * recent["review_count"]
+        ) / (archived["review_count"] + recent["review_count"])
+
+    # Raw reviews are usually the newer ones, but not after a late offline import
+    latest = recent
+    if archived["last_reviewed_at"] and archived["last_reviewed_at"] > recent["last_reviewed_at"]:
+        latest = archived
+
+    return {
+        "review_count": archived["review_count"] + recent["review_count"],
+        "correct_count": archived["correct_count"] + recent["correct_count"],
+        "mean_quality": mean_quality if mean_quality is not None else archived["mean_quality"],
+        "last_quality": latest["last_quality"],
+        "last_reviewed_at": latest["last_reviewed_at"]
+    }
+
+
+def get_review_history_summary(
+    user_vocabulary_ids: List[int],
+    db: Session
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Review totals per card across compacted and raw history
+
+    Args:
+        user_vocabulary_ids: Cards to summarize
+        db: Database session
+
+    Returns:
+        Mapping of user_vocabulary_id to review_count, correct_count,
+        mean_quality, last_quality and last_reviewed_at
+    """
+    history: Dict[int, Dict[str, Any]] = {}
+
+    for row in db.query(FlashcardReviewSummary).filter(
+        FlashcardReviewSummary.user_vocabulary_id.in_(user_vocabulary_ids)
+    ):
+        history[row.user_vocabulary_id] = {
+            "review_count": row.review_count,
+            "correct_count": row.correct_count,
+            "mean_quality": row.mean_quality,
+            "last_quality": row.last_quality,
+            "last_reviewed_at": row.last_reviewed_at
+        }
+
+    recent = db.query(
+        FlashcardReview.user_vocabulary_id,
+        func.count().label("review_count"),
+        func.count().filter(FlashcardReview.was_correct.is_(True)).label("correct_count"),
+        func.avg(FlashcardReview.quality).label("mean_quality"),
+        func.array_agg(
+            aggregate_order_by(FlashcardReview.quality, FlashcardReview.reviewed_at.desc())
+        )[1].label("last_quality"),
+        func.max(FlashcardReview.reviewed_at).label("last_reviewed_at")
+    ).filter(
+        FlashcardReview.user_vocabulary_id.in_(user_vocabulary_ids)
+    ).group_by(FlashcardReview.user_vocabulary_id)
+
+    for row in recent:
+        history[row.user_vocabulary_id] = _merge_history(history.get(row.user_vocabulary_id), {
+            "review_count": row.review_count,
+            "correct_count": row.correct_count,
+            "mean_quality": float(row.mean_quality) if row.mean_quality is not None else None,
+            "last_quality": row.last_quality,
+            "last_reviewed_at": row.last_reviewed_at
+        })
+
+    return history
@@ -0,0 +1,237 @@
+"""
+Flashcard scheduler registry
+
+Every scheduler works on whole batches of cards at once. Card state is a
+dict of NumPy arrays (ease_factor, interval, repetitions, stability,
+difficulty); cards without a memory state yet carry NaN stability and
+difficulty.
+
+Available schedulers:
+- sm2: SuperMemo 2 (default)
+- fsrs: memory model with per-card stability and difficulty, following the
+  FSRS family of algorithms, with optional per-user fitted parameters
+"""
+from typing import Dict, Optional, Sequence, Type
+import numpy as np
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.vocabulary import UserSchedulerParameters
+
+SCHEDULERS: Dict[str, "Scheduler"] = {}
+
+
+def register_scheduler(cls: Type["Scheduler"]) -> Type["Scheduler"]:
+    """Class decorator adding a scheduler to the registry under its name"""
+    SCHEDULERS[cls.name] = cls()
+    return cls
+
+
+def get_scheduler(name: Optional[str] = None) -> "Scheduler":
+    """Look up a scheduler by name (defaults to FLASHCARD_SCHEDULER)"""
+    name = name or settings.FLASHCARD_SCHEDULER
+    if name not in SCHEDULERS:
+        raise ValueError(f"Unknown scheduler: {name}")
+    return SCHEDULERS[name]
+
+
+def get_user_scheduler(user_id: int, db: Session) -> tuple["Scheduler", Optional[list]]:
+    """
+    Resolve the scheduler and fitted parameters used for a user
+
+    Returns:
+        tuple: (scheduler, parameters or None for the scheduler defaults)
+    """
+    row = db.query(
+        UserSchedulerParameters.algorithm,
+        UserSchedulerParameters.parameters
+    ).filter(UserSchedulerParameters.user_id == user_id).first()
+
+    if row is None:
+        return get_scheduler(), None
+
+    scheduler = get_scheduler(row.algorithm)
+    return scheduler, row.parameters if row.parameters and scheduler.fits_parameters else None
+
+
+def card_status(repetitions: np.ndarray, interval: np.ndarray) -> np.ndarray:
+    """Learning status shared by all schedulers"""
+    return np.select(
+        [(repetitions >= 5) & (interval >= 21), repetitions > 0],
+        ["mastered", "review"],
+        default="learning"
+    )
+
+
+class Scheduler:
+    """Base class for batch schedulers"""
+
+    name: str = ""
+    fits_parameters: bool = False
+
+    def schedule(
+        self,
+        quality: np.ndarray,
+        state: Dict[str, np.ndarray],
+        elapsed_days: np.ndarray,
+        parameters: Optional[Sequence[float]] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Schedule the next review of a batch of independent cards
+
+        Args:
+            quality: Quality ratings (0-5)
+            state: Current card state arrays
+            elapsed_days: Days since each card's previous review (0 if none)
+            parameters: Optional per-user parameters
+
+        Returns:
+            New card state arrays plus a "status" array
+        """
+        raise NotImplementedError
+
+
+@register_scheduler
+class SM2Scheduler(Scheduler):
+    """SuperMemo 2"""
+
+    name = "sm2"
+
+    def schedule(self, quality, state, elapsed_days, parameters=None):
+        from app.services.flashcard.spaced_repetition import calculate_next_intervals_batch
+
+        ease_factor, interval, repetitions, status = calculate_next_intervals_batch(
+            quality, state["ease_factor"], state["interval"], state["repetitions"]
+        )
+
+        return {
+            **state,
+            "ease_factor": ease_factor,
+            "interval": interval,
+            "repetitions": repetitions,
+            "status": status
+        }
+
+
+# ========== Memory model (FSRS) ==========
+
+# Forgetting curve R(t, S) = (1 + FACTOR * t / S) ** DECAY, so that R(S, S) = 0.9
+DECAY = -0.5
+FACTOR = 0.9 ** (1 / DECAY) - 1
+
+# Published FSRS-4.5 defaults and the box the optimizer keeps parameters in
+FSRS_DEFAULT_PARAMETERS = np.array([
+    0.4872, 1.4003, 3.7145, 13.8206, 5.1618, 1.2298, 0.8975, 0.031, 1.6474,
+    0.1367, 1.0461, 2.1072, 0.0793, 0.3246, 1.587, 0.2272, 2.8755
+])
+FSRS_LOWER_BOUNDS = np.array([
+    0.1, 0.1, 0.1, 0.1, 1.0, 0.1, 0.1, 0.0, 0.0,
+    0.0, 0.01, 0.1, 0.01, 0.01, 0.01, 0.0, 1.0
+])
+FSRS_UPPER_BOUNDS = np.array([
+    100.0, 100.0, 100.0, 100.0, 10.0, 5.0, 5.0, 0.5, 3.0,
+    0.8, 2.5, 5.0, 0.2, 0.9, 4.0, 1.0, 6.0
+])
+
+
+def quality_to_grade(quality: np.ndarray) -> np.ndarray:
+    """Map SM-2 quality (0-5) to FSRS grades: 1 again, 2 hard, 3 good, 4 easy"""
+    quality = np.asarray(quality, dtype=np.int64)
+    return np.select([quality < 3, quality == 3, quality == 4], [1, 2, 3], default=4)
+
+
+def retrievability(elapsed_days: np.ndarray, stability: np.ndarray) -> np.ndarray:
+    """
+    Probability of recall after elapsed_days for a memory of given stability
+
+    Negative or missing elapsed time (clock skew, replayed offline reviews)
+    counts as a review right after the last one, so R stays within (0, 1].
+    """
+    elapsed_days = np.nan_to_num(np.maximum(elapsed_days, 0.0), nan=0.0)
+    return (1 + FACTOR * elapsed_days / stability) ** DECAY
+
+
+def fsrs_step(
+    w: np.ndarray,
+    stability: np.ndarray,
+    difficulty: np.ndarray,
+    elapsed_days: np.ndarray,
+    grade: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Update memory state after one review
+
+    w is either one parameter vector of shape (17,) or a stack of shape
+    (P, 17); in the latter case card arrays broadcast to shape (P, cards),
+    which lets the optimizer evaluate many parameter sets in one pass.
+
+    Returns:
+        tuple: (new_stability, new_difficulty, retrievability before review)
+    """
+    def p(i):
+        return w[..., i:i + 1] if w.ndim > 1 else w[i]
+
+    first = np.isnan(stability)
+    s = np.where(first, 1.0, stability)
+    d = np.where(first, 5.0, difficulty)
+    r = np.where(first, 1.0, retrievability(elapsed_days, s))
+
+    # Difficulty moves with the grade and reverts towards the "easy" initial value
+    initial_easy = p(4) - p(5)
+    next_d = d - p(6) * (grade - 3)
+    next_d = np.clip(p(7) * initial_easy + (1 - p(7)) * next_d, 1, 10)
+
+    recall_s = s * (
+        1
+        + np.exp(p(8)) * (11 - d) * s ** (-p(9)) * (np.exp(p(10) * (1 - r)) - 1)
+        * np.where(grade == 2, p(15), 1.0)
+        * np.where(grade == 4, p(16), 1.0)
+    )
+    forget_s = np.minimum(
+        p(11) * d ** (-p(12)) * ((s + 1) ** p(13) - 1) * np.exp(p(14) * (1 - r)),
+        s
+    )
+    next_s = np.where(grade == 1, forget_s, recall_s)
+
+    # First review: initial state from the grade alone
+    next_s = np.where(first, w[..., grade - 1], next_s)
+    next_d = np.where(first, np.clip(p(4) - (grade - 3) * p(5), 1, 10), next_d)
+
+    return np.clip(next_s, 0.1, 36500.0), next_d, r
+
+
+def fsrs_interval(stability: np.ndarray, desired_retention: float) -> np.ndarray:
+    """Days until recall probability falls to desired_retention"""
+    days = stability / FACTOR * (desired_retention ** (1 / DECAY) - 1)
+    return np.maximum(np.rint(days), 1).astype(np.int64)
+
+
+@register_scheduler
+class FSRSScheduler(Scheduler):
+    """Memory model scheduler (stability / difficulty)"""
+
+    name = "fsrs"
+    fits_parameters = True
+
+    def schedule(self, quality, state, elapsed_days, parameters=None):
+        w = np.asarray(parameters if parameters is not None else FSRS_DEFAULT_PARAMETERS, dtype=np.float64)
+        grade = quality_to_grade(quality)
+        passed = grade > 1
+
+        stability, difficulty, _ = fsrs_step(
+            w,
+            np.asarray(state["stability"], dtype=np.float64),
+            np.asarray(state["difficulty"], dtype=np.float64),
+            np.asarray(elapsed_days, dtype=np.float64),
+            grade
+        )
+        interval = np.where(passed, fsrs_interval(stability, settings.FLASHCARD_DESIRED_RETENTION), 1)
+        repetitions = np.where(passed, np.asarray(state["repetitions"], dtype=np.int64) + 1, 0)
+
+        return {
+            **state,
+            "stability": stability,
+            "difficulty": difficulty,
+            "interval": interval,
+            "repetitions": repetitions,
+            "status": card_status(repetitions, interval)
+        }
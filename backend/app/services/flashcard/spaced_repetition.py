@@ -1,10 +1,18 @@
 """
 Spaced Repetition Algorithm (SM-2)
 Based on SuperMemo 2 algorithm
+
+Reviews are scheduled by the user's scheduler from the registry in
+app.services.flashcard.schedulers; SM-2 is the default.
 """
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from app.models.vocabulary import UserVocabulary
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional
+import numpy as np
+from sqlalchemy import insert, or_, update, tuple_
+from sqlalchemy.orm import Session, joinedload
+from app.models.vocabulary import Vocabulary, UserVocabulary, FlashcardReview
+from app.services.flashcard.schedulers import get_user_scheduler, card_status
+from app.services.flashcard.vocabulary_stats import status_change_deltas, adjust_vocabulary_stats
 
 
 def calculate_next_interval(
@@ -58,6 +66,60 @@ def calculate_next_interval(
     return new_ease_factor, new_interval, new_repetitions
 
 
+def calculate_next_intervals_batch(
+    quality: np.ndarray,
+    ease_factor: np.ndarray,
+    interval: np.ndarray,
+    repetitions: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized SM-2 for a batch of independent cards
+
+    Produces the same values as calculate_next_interval applied element-wise,
+    plus the resulting learning status of each card.
+
+    Args:
+        quality: Quality ratings (0-5)
+        ease_factor: Current easiness factors
+        interval: Current intervals in days
+        repetitions: Current successful repetition counts
+
+    Returns:
+        tuple: (new_ease_factors, new_intervals, new_repetitions, new_statuses)
+    """
+    quality = np.asarray(quality, dtype=np.int64)
+    ease_factor = np.asarray(ease_factor, dtype=np.float64)
+    interval = np.asarray(interval, dtype=np.int64)
+    repetitions = np.asarray(repetitions, dtype=np.int64)
+
+    lapse = 5 - quality
+    new_ease_factor = np.maximum(ease_factor + (0.1 - lapse * (0.08 + lapse * 0.02)), 1.3)
+
+    passed = quality >= 3
+    new_repetitions = np.where(passed, repetitions + 1, 0)
+
+    grown = (interval * new_ease_factor).astype(np.int64)
+    new_interval = np.select(
+        [~passed | (new_repetitions == 1), new_repetitions == 2],
+        [1, 6],
+        default=grown
+    )
+
+    return new_ease_factor, new_interval, new_repetitions, card_status(new_repetitions, new_interval)
+
+
+def _to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Normalize client timestamps to the naive UTC datetimes used server-side"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _optional_float(value: float) -> Optional[float]:
+    """NaN marks an unset memory model field; store it as NULL"""
+    return None if np.isnan(value) else float(value)
+
+
 def update_flashcard_review(
     user_vocab: UserVocabulary,
     quality: int,
@@ -75,20 +137,35 @@ def update_flashcard_review(
         Updated UserVocabulary instance
     """
 
-    # Calculate new values using SM-2
-    new_ease_factor, new_interval, new_repetitions = calculate_next_interval(
-        quality=quality,
-        ease_factor=user_vocab.ease_factor,
-        interval=user_vocab.interval,
-        repetitions=user_vocab.repetitions
+    old_status = user_vocab.status
+    now = datetime.utcnow()
+    last_reviewed_at = _to_naive_utc(user_vocab.last_reviewed_at)
+    elapsed_days = (now - last_reviewed_at).total_seconds() / 86400 if last_reviewed_at else 0.0
+
+    # Calculate new values with the user's scheduler
+    scheduler, parameters = get_user_scheduler(user_vocab.user_id, db)
+    result = scheduler.schedule(
+        np.array([quality]),
+        {
+            "ease_factor": np.array([user_vocab.ease_factor], dtype=np.float64),
+            "interval": np.array([user_vocab.interval], dtype=np.int64),
+            "repetitions": np.array([user_vocab.repetitions], dtype=np.int64),
+            "stability": np.array([user_vocab.stability], dtype=np.float64),
+            "difficulty": np.array([user_vocab.difficulty], dtype=np.float64)
+        },
+        np.array([elapsed_days]),
+        parameters
     )
+    new_interval = int(result["interval"][0])
 
     # Update user vocabulary
-    user_vocab.ease_factor = new_ease_factor
+    user_vocab.ease_factor = float(result["ease_factor"][0])
     user_vocab.interval = new_interval
-    user_vocab.repetitions = new_repetitions
-    user_vocab.last_reviewed_at = datetime.utcnow()
-    user_vocab.next_review_date = datetime.utcnow() + timedelta(days=new_interval)
+    user_vocab.repetitions = int(result["repetitions"][0])
+    user_vocab.stability = _optional_float(result["stability"][0])
+    user_vocab.difficulty = _optional_float(result["difficulty"][0])
+    user_vocab.last_reviewed_at = now
+    user_vocab.next_review_date = now + timedelta(days=new_interval)
     user_vocab.times_reviewed += 1
 
     # Update counters
@@ -98,13 +175,16 @@ def update_flashcard_review(
         user_vocab.times_incorrect += 1
 
     # Update status
-    if new_repetitions >= 5 and new_interval >= 21:
-        user_vocab.status = "mastered"
-        user_vocab.mastered_at = datetime.utcnow()
-    elif new_repetitions > 0:
-        user_vocab.status = "review"
-    else:
-        user_vocab.status = "learning"
+    user_vocab.status = str(result["status"][0])
+    if user_vocab.status == "mastered":
+        user_vocab.mastered_at = now
+
+    adjust_vocabulary_stats(
+        user_vocab.user_id,
+        user_vocab.language_id,
+        status_change_deltas(old_status, user_vocab.status),
+        db
+    )
 
     db.commit()
     db.refresh(user_vocab)
@@ -112,6 +192,148 @@ def update_flashcard_review(
     return user_vocab
 
 
+def get_due_card_ids(
+    user_id: int,
+    language_id: int,
+    limit: int,
+    db: Session,
+    exclude_mastered: bool = False
+) -> List[int]:
+    """
+    Get the ids of a user's most overdue cards, oldest due date first
+
+    Ids are selected from user_vocabulary alone, walking the
+    (user_id, next_review_date, status) index.
+
+    Args:
+        user_id: User ID
+        language_id: Language ID
+        limit: Maximum number of cards
+        db: Database session
+        exclude_mastered: Skip cards that are already mastered
+
+    Returns:
+        List of UserVocabulary ids
+    """
+    query = db.query(UserVocabulary.id).filter(
+        UserVocabulary.user_id == user_id,
+        UserVocabulary.next_review_date <= datetime.utcnow(),
+        UserVocabulary.language_id == language_id
+    )
+
+    if exclude_mastered:
+        query = query.filter(UserVocabulary.status != "mastered")
+
+    return [row.id for row in query.order_by(UserVocabulary.next_review_date).limit(limit)]
+
+
+def get_due_queue(
+    user_id: int,
+    language_id: int,
+    limit: int,
+    db: Session,
+    exclude_mastered: bool = False
+) -> List[UserVocabulary]:
+    """
+    Get the most overdue cards of a user, oldest due date first
+
+    Vocabulary rows are only loaded for the final page.
+
+    Args:
+        user_id: User ID
+        language_id: Language ID
+        limit: Maximum number of cards
+        db: Database session
+        exclude_mastered: Skip cards that are already mastered
+
+    Returns:
+        List of due UserVocabulary instances with vocabulary loaded
+    """
+    due_ids = get_due_card_ids(user_id, language_id, limit, db, exclude_mastered)
+    if not due_ids:
+        return []
+
+    cards = db.query(UserVocabulary).options(
+        joinedload(UserVocabulary.vocabulary)
+    ).filter(UserVocabulary.id.in_(due_ids)).all()
+
+    rank = {card_id: i for i, card_id in enumerate(due_ids)}
+    return sorted(cards, key=lambda card: rank[card.id])
+
+
+def get_new_cards(
+    user_id: int,
+    language_id: int,
+    limit: int,
+    db: Session,
+    level_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    after: Optional[tuple[int, int]] = None
+) -> List[Vocabulary]:
+    """
+    Get words the user has not started learning, most frequent first
+
+    Already learned words are excluded with a correlated NOT EXISTS, so the
+    database does the anti-join instead of receiving every learned id back
+    as bind parameters. Pages are keyed on (frequency, id).
+
+    Args:
+        user_id: User ID
+        language_id: Language ID
+        limit: Maximum number of words
+        db: Database session
+        level_id: Optional difficulty level filter
+        category_id: Optional category filter
+        after: (frequency, id) of the last word of the previous page;
+            frequency is None when that word has no frequency
+
+    Returns:
+        List of Vocabulary instances
+    """
+    learned = db.query(UserVocabulary.id).filter(
+        UserVocabulary.user_id == user_id,
+        UserVocabulary.vocabulary_id == Vocabulary.id
+    )
+
+    query = db.query(Vocabulary).filter(
+        Vocabulary.language_id == language_id,
+        ~learned.exists()
+    )
+
+    if level_id:
+        query = query.filter(Vocabulary.difficulty_level_id == level_id)
+
+    if category_id:
+        query = query.filter(Vocabulary.category_id == category_id)
+
+    # Words without a frequency sort after all others
+    if after:
+        frequency, vocabulary_id = after
+        if frequency is None:
+            query = query.filter(Vocabulary.frequency.is_(None), Vocabulary.id > vocabulary_id)
+        else:
+            query = query.filter(or_(
+                tuple_(Vocabulary.frequency, Vocabulary.id) > tuple_(frequency, vocabulary_id),
+                Vocabulary.frequency.is_(None)
+            ))
+
+    return query.order_by(
+        Vocabulary.frequency.asc().nulls_last(), Vocabulary.id
+    ).limit(limit).all()
+
+
+def encode_new_cards_cursor(vocabulary: Vocabulary) -> str:
+    """Build the opaque keyset cursor pointing after the given word"""
+    frequency = "null" if vocabulary.frequency is None else vocabulary.frequency
+    return f"{frequency}:{vocabulary.id}"
+
+
+def decode_new_cards_cursor(cursor: str) -> tuple[Optional[int], int]:
+    """Parse a cursor built by encode_new_cards_cursor (raises ValueError)"""
+    frequency, vocabulary_id = cursor.split(":")
+    return None if frequency == "null" else int(frequency), int(vocabulary_id)
+
+
 def get_daily_review_cards(
     user_id: int,
     language_id: int,
@@ -132,35 +354,258 @@ def get_daily_review_cards(
     Returns:
         Dictionary with new and review cards
     """
-    from app.models.vocabulary import Vocabulary
-
-    now = datetime.utcnow()
-
     # Get due review cards
-    review_cards = db.query(UserVocabulary).join(Vocabulary).filter(
-        UserVocabulary.user_id == user_id,
-        Vocabulary.language_id == language_id,
-        UserVocabulary.next_review_date <= now,
-        UserVocabulary.status != "mastered"
-    ).order_by(UserVocabulary.next_review_date).limit(max_review).all()
+    review_cards = get_due_queue(
+        user_id=user_id,
+        language_id=language_id,
+        limit=max_review,
+        db=db,
+        exclude_mastered=True
+    )
 
     # Get new cards
-    learned_ids = db.query(UserVocabulary.vocabulary_id).filter(
-        UserVocabulary.user_id == user_id
-    ).all()
-    learned_ids = [id[0] for id in learned_ids] if learned_ids else []
-
-    new_cards_query = db.query(Vocabulary).filter(
-        Vocabulary.language_id == language_id
+    new_cards = get_new_cards(
+        user_id=user_id,
+        language_id=language_id,
+        limit=max_new,
+        db=db
     )
 
-    if learned_ids:
-        new_cards_query = new_cards_query.filter(~Vocabulary.id.in_(learned_ids))
-
-    new_cards = new_cards_query.limit(max_new).all()
-
     return {
         "review_cards": review_cards,
         "new_cards": new_cards,
         "total_due": len(review_cards)
     }
+
+
+def apply_flashcard_reviews_batch(
+    user_id: int,
+    reviews: List[Dict[str, Any]],
+    db: Session
+) -> List[Dict[str, Any]]:
+    """
+    Apply many flashcard reviews in one transaction
+
+    Reviews of the same card are replayed in chronological order; reviews of
+    different cards are scheduled together by the user's batch scheduler.
+    Reviews dated before the card's last stored review are replayed right
+    after it, so the card never moves back in time.
+    Scheduling state is written back with a single bulk UPDATE and the review
+    history with a single bulk INSERT.
+
+    Args:
+        user_id: User ID
+        reviews: Dicts with vocabulary_id, quality, time_taken_seconds and
+            an optional reviewed_at timestamp (future times count as now)
+        db: Database session
+
+    Returns:
+        Final scheduling state of every reviewed card
+    """
+    if not reviews:
+        return []
+
+    now = datetime.utcnow()
+    # Client clocks are not trusted to be ahead of ours
+    reviews = sorted(
+        ({**r, "reviewed_at": min(_to_naive_utc(r.get("reviewed_at")) or now, now)} for r in reviews),
+        key=lambda r: r["reviewed_at"]
+    )
+    vocabulary_ids = list(dict.fromkeys(r["vocabulary_id"] for r in reviews))
+    position = {vocab_id: i for i, vocab_id in enumerate(vocabulary_ids)}
+
+    # Load current scheduling state, creating rows for cards seen for the first time
+    rows = db.query(
+        UserVocabulary.id,
+        UserVocabulary.vocabulary_id,
+        UserVocabulary.language_id,
+        UserVocabulary.status,
+        UserVocabulary.ease_factor,
+        UserVocabulary.interval,
+        UserVocabulary.repetitions,
+        UserVocabulary.stability,
+        UserVocabulary.difficulty,
+        UserVocabulary.last_reviewed_at,
+        UserVocabulary.times_reviewed,
+        UserVocabulary.times_correct,
+        UserVocabulary.times_incorrect,
+        UserVocabulary.mastered_at
+    ).filter(
+        UserVocabulary.user_id == user_id,
+        UserVocabulary.vocabulary_id.in_(vocabulary_ids)
+    ).all()
+    existing = {row.vocabulary_id: row for row in rows}
+
+    missing = [vocab_id for vocab_id in vocabulary_ids if vocab_id not in existing]
+    if missing:
+        languages = dict(db.query(Vocabulary.id, Vocabulary.language_id).filter(
+            Vocabulary.id.in_(missing)
+        ).all())
+        unknown = [vocab_id for vocab_id in missing if vocab_id not in languages]
+        if unknown:
+            raise ValueError(f"Unknown vocabulary ids: {unknown}")
+
+        created = db.execute(
+            insert(UserVocabulary).returning(UserVocabulary.id, UserVocabulary.vocabulary_id),
+            [
+                {
+                    "user_id": user_id,
+                    "vocabulary_id": vocab_id,
+                    "language_id": languages[vocab_id],
+                    "status": "learning"
+                }
+                for vocab_id in missing
+            ]
+        ).all()
+        new_ids = {row.vocabulary_id: row.id for row in created}
+    else:
+        new_ids = {}
+
+    n = len(vocabulary_ids)
+    card_ids = np.empty(n, dtype=np.int64)
+    ease_factor = np.full(n, 2.5)
+    interval = np.zeros(n, dtype=np.int64)
+    repetitions = np.zeros(n, dtype=np.int64)
+    stability = np.full(n, np.nan)
+    difficulty = np.full(n, np.nan)
+    times_reviewed = np.zeros(n, dtype=np.int64)
+    times_correct = np.zeros(n, dtype=np.int64)
+    times_incorrect = np.zeros(n, dtype=np.int64)
+    language_id = np.full(n, None, dtype=object)
+    old_status = np.full(n, None, dtype=object)
+    status = np.full(n, "learning", dtype=object)
+    reviewed_at = np.full(n, None, dtype=object)
+    mastered_at = np.full(n, None, dtype=object)
+
+    for vocab_id, i in position.items():
+        row = existing.get(vocab_id)
+        if row is None:
+            card_ids[i] = new_ids[vocab_id]
+            language_id[i] = languages[vocab_id]
+            continue
+        card_ids[i] = row.id
+        language_id[i] = row.language_id
+        old_status[i] = row.status
+        ease_factor[i] = row.ease_factor if row.ease_factor is not None else 2.5
+        interval[i] = row.interval or 0
+        repetitions[i] = row.repetitions or 0
+        stability[i] = row.stability if row.stability is not None else np.nan
+        difficulty[i] = row.difficulty if row.difficulty is not None else np.nan
+        reviewed_at[i] = _to_naive_utc(row.last_reviewed_at)
+        times_reviewed[i] = row.times_reviewed or 0
+        times_correct[i] = row.times_correct or 0
+        times_incorrect[i] = row.times_incorrect or 0
+        mastered_at[i] = row.mastered_at
+
+    # The k-th review of every card forms wave k; cards within a wave are independent
+    card_index = np.array([position[r["vocabulary_id"]] for r in reviews], dtype=np.int64)
+    quality = np.array([r["quality"] for r in reviews], dtype=np.int64)
+    timestamps = np.array([r["reviewed_at"] for r in reviews], dtype=object)
+    wave = np.zeros(len(reviews), dtype=np.int64)
+    seen: Dict[int, int] = {}
+    for j, i in enumerate(card_index):
+        wave[j] = seen.get(i, 0)
+        seen[i] = wave[j] + 1
+
+    scheduler, parameters = get_user_scheduler(user_id, db)
+
+    for k in range(int(wave.max()) + 1):
+        in_wave = wave == k
+        idx = card_index[in_wave]
+        q = quality[in_wave]
+        # A review older than the stored state (late offline sync) is replayed
+        # right after it instead of moving the card back in time
+        at = np.array([
+            max(t, prev) if prev is not None else t
+            for t, prev in zip(timestamps[in_wave], reviewed_at[idx])
+        ], dtype=object)
+        elapsed_days = np.array([
+            max((t - prev).total_seconds() / 86400, 0.0) if prev is not None else 0.0
+            for t, prev in zip(at, reviewed_at[idx])
+        ])
+
+        result = scheduler.schedule(
+            q,
+            {
+                "ease_factor": ease_factor[idx],
+                "interval": interval[idx],
+                "repetitions": repetitions[idx],
+                "stability": stability[idx],
+                "difficulty": difficulty[idx]
+            },
+            elapsed_days,
+            parameters
+        )
+        new_status = result["status"]
+        ease_factor[idx] = result["ease_factor"]
+        interval[idx] = result["interval"]
+        repetitions[idx] = result["repetitions"]
+        stability[idx] = result["stability"]
+        difficulty[idx] = result["difficulty"]
+        status[idx] = new_status
+        reviewed_at[idx] = at
+        times_reviewed[idx] += 1
+        times_correct[idx] += q >= 3
+        times_incorrect[idx] += q < 3
+        mastered = idx[new_status == "mastered"]
+        mastered_at[mastered] = reviewed_at[mastered]
+
+    next_review = [reviewed_at[i] + timedelta(days=int(interval[i])) for i in range(n)]
+
+    db.execute(
+        update(UserVocabulary),
+        [
+            {
+                "id": int(card_ids[i]),
+                "ease_factor": float(ease_factor[i]),
+                "interval": int(interval[i]),
+                "repetitions": int(repetitions[i]),
+                "stability": _optional_float(stability[i]),
+                "difficulty": _optional_float(difficulty[i]),
+                "last_reviewed_at": reviewed_at[i],
+                "next_review_date": next_review[i],
+                "times_reviewed": int(times_reviewed[i]),
+                "times_correct": int(times_correct[i]),
+                "times_incorrect": int(times_incorrect[i]),
+                "status": status[i],
+                "mastered_at": mastered_at[i],
+                "updated_at": now
+            }
+            for i in range(n)
+        ]
+    )
+
+    db.execute(
+        insert(FlashcardReview),
+        [
+            {
+                "user_vocabulary_id": int(card_ids[card_index[j]]),
+                "quality": int(quality[j]),
+                "time_taken_seconds": r.get("time_taken_seconds"),
+                "was_correct": bool(quality[j] >= 3),
+                "reviewed_at": timestamps[j]
+            }
+            for j, r in enumerate(reviews)
+        ]
+    )
+
+    # Keep the per-language deck counters in step
+    deltas: Dict[Optional[int], Dict[str, int]] = {}
+    for i in range(n):
+        language_deltas = deltas.setdefault(language_id[i], {})
+        for column, delta in status_change_deltas(old_status[i], status[i]).items():
+            language_deltas[column] = language_deltas.get(column, 0) + delta
+    for lang_id, language_deltas in deltas.items():
+        adjust_vocabulary_stats(user_id, lang_id, language_deltas, db)
+
+    db.commit()
+
+    return [
+        {
+            "vocabulary_id": vocab_id,
+            "status": status[i],
+            "interval": int(interval[i]),
+            "next_review": next_review[i]
+        }
+        for vocab_id, i in position.items()
+    ]
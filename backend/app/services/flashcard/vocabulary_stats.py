@@ -0,0 +1,152 @@
+"""
+Vocabulary deck statistics
+
+Counts per (user, language) live in user_vocabulary_stats and are adjusted
+in the same transaction as every status change. When a counter row does
+not exist yet it is built from user_vocabulary with a single aggregate.
+"""
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models.vocabulary import UserVocabulary, UserVocabularyStats
+
+# Learning status -> counter column
+STATUS_COLUMNS = {
+    "learning": "learning_words",
+    "review": "review_words",
+    "mastered": "mastered_words",
+}
+
+
+def status_change_deltas(old_status: Optional[str], new_status: str) -> Dict[str, int]:
+    """
+    Counter changes for one card moving between statuses
+
+    Args:
+        old_status: Previous status, or None for a card new to the deck
+        new_status: Status after the change
+
+    Returns:
+        Mapping of counter column to delta
+    """
+    deltas: Dict[str, int] = {}
+
+    if old_status is None:
+        deltas["total_words"] = 1
+
+    if old_status != new_status:
+        if old_status in STATUS_COLUMNS:
+            deltas[STATUS_COLUMNS[old_status]] = -1
+        if new_status in STATUS_COLUMNS:
+            deltas[STATUS_COLUMNS[new_status]] = 1
+
+    return deltas
+
+
+def adjust_vocabulary_stats(
+    user_id: int,
+    language_id: Optional[int],
+    deltas: Dict[str, int],
+    db: Session
+) -> None:
+    """
+    Apply counter deltas to the user's stats row (without committing)
+
+    A missing row is left alone: it is built from user_vocabulary on the
+    next read, which already reflects the change.
+    """
+    deltas = {column: delta for column, delta in deltas.items() if delta}
+    if not deltas or language_id is None:
+        return
+
+    db.query(UserVocabularyStats).filter(
+        UserVocabularyStats.user_id == user_id,
+        UserVocabularyStats.language_id == language_id
+    ).update(
+        {
+            getattr(UserVocabularyStats, column): getattr(UserVocabularyStats, column) + delta
+            for column, delta in deltas.items()
+        },
+        synchronize_session=False
+    )
+
+
+def refresh_vocabulary_stats(user_id: int, language_id: int, db: Session) -> Dict[str, int]:
+    """
+    Recount a user's deck in one pass and store the counters
+
+    Args:
+        user_id: User ID
+        language_id: Language ID
+        db: Database session
+
+    Returns:
+        Counters plus the number of cards currently due
+    """
+    row = db.query(
+        func.count().label("total_words"),
+        func.count().filter(UserVocabulary.status == "learning").label("learning_words"),
+        func.count().filter(UserVocabulary.status == "review").label("review_words"),
+        func.count().filter(UserVocabulary.status == "mastered").label("mastered_words"),
+        func.count().filter(UserVocabulary.next_review_date <= datetime.utcnow()).label("due_for_review")
+    ).filter(
+        UserVocabulary.user_id == user_id,
+        UserVocabulary.language_id == language_id
+    ).one()
+
+    counters = {
+        "total_words": row.total_words,
+        "learning_words": row.learning_words,
+        "review_words": row.review_words,
+        "mastered_words": row.mastered_words,
+    }
+
+    db.execute(
+        insert(UserVocabularyStats)
+        .values(user_id=user_id, language_id=language_id, **counters)
+        .on_conflict_do_update(
+            constraint="uq_user_vocabulary_stats_user_language",
+            set_=counters
+        )
+    )
+    db.commit()
+
+    return {**counters, "due_for_review": row.due_for_review}
+
+
+def get_vocabulary_stats(user_id: int, language_id: int, db: Session) -> Dict[str, int]:
+    """
+    Read a user's deck statistics for a language
+
+    Args:
+        user_id: User ID
+        language_id: Language ID
+        db: Database session
+
+    Returns:
+        Counters plus the number of cards currently due
+    """
+    stats = db.query(UserVocabularyStats).filter(
+        UserVocabularyStats.user_id == user_id,
+        UserVocabularyStats.language_id == language_id
+    ).first()
+
+    if stats is None:
+        return refresh_vocabulary_stats(user_id, language_id, db)
+
+    # Due cards depend on the clock, so they are counted on the due index
+    due_for_review = db.query(func.count(UserVocabulary.id)).filter(
+        UserVocabulary.user_id == user_id,
+        UserVocabulary.next_review_date <= datetime.utcnow(),
+        UserVocabulary.language_id == language_id
+    ).scalar()
+
+    return {
+        "total_words": stats.total_words,
+        "learning_words": stats.learning_words,
+        "review_words": stats.review_words,
+        "mastered_words": stats.mastered_words,
+        "due_for_review": due_for_review
+    }
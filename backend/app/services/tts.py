@@ -5,8 +5,8 @@ Text-to-Speech service using OpenAI TTS API
 from typing import Optional, BinaryIO
 from pathlib import Path
 import hashlib
-from openai import OpenAI
 from app.core.config import settings
+from app.services.ai.llm_gateway import llm_gateway
 import logging
 
 logger = logging.getLogger(__name__)
@@ -26,7 +26,6 @@ class TTSService:
     }
 
     def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
         self.cache_dir = Path(settings.UPLOAD_DIR) / "tts_cache"
         self.cache_dir.mkdir(parents=True, exist_ok=True)
 
@@ -41,7 +40,7 @@ class TTSService:
         cache_path = self._get_cache_path(text, language_code, voice)
         return cache_path.exists()
 
-    def generate_speech(
+    async def generate_speech(
         self,
         text: str,
         language_code: str,
@@ -74,15 +73,15 @@ class TTSService:
             # Generate audio using OpenAI TTS
             logger.info(f"Generating TTS audio for text: {text[:50]}...")
 
-            response = self.client.audio.speech.create(
-                model="tts-1",  # Use tts-1-hd for higher quality
+            audio = await llm_gateway.speech(
+                text,
                 voice=voice,
-                input=text,
+                model="tts-1",  # Use tts-1-hd for higher quality
                 speed=1.0  # Normal speed, can be 0.25 to 4.0
             )
 
             # Save to cache
-            response.stream_to_file(cache_path)
+            cache_path.write_bytes(audio)
             logger.info(f"TTS audio generated and cached: {cache_path}")
 
             return cache_path
@@ -91,7 +90,7 @@ class TTSService:
             logger.error(f"Failed to generate TTS audio: {e}")
             return None
 
-    def generate_pronunciation(
+    async def generate_pronunciation(
         self,
         word: str,
         language_code: str,
@@ -108,14 +107,14 @@ class TTSService:
         Returns:
             Path to audio file or None if generation failed
         """
-        return self.generate_speech(
+        return await self.generate_speech(
             text=word,
             language_code=language_code,
             voice=voice,
             use_cache=True
         )
 
-    def generate_sentence_audio(
+    async def generate_sentence_audio(
         self,
         sentence: str,
         language_code: str,
@@ -132,7 +131,7 @@ class TTSService:
         Returns:
             Path to audio file or None if generation failed
         """
-        return self.generate_speech(
+        return await self.generate_speech(
             text=sentence,
             language_code=language_code,
             voice=voice,
@@ -1,68 +1,403 @@
 """
 WebSocket connection manager for real-time chat
+
+Each worker process only holds its own sockets. With WS_BACKPLANE=redis,
+workers are joined through Redis:
+
+- Broadcasts are delivered to local sockets directly and published on the
+  conversation's channel (ws:conversation:<id>); personal messages on the
+  user's channel (ws:user:<id>). Each worker subscribes to the channels of
+  the conversations and users it has sockets for, and delivers what other
+  workers publish there.
+- Presence (who is connected to what) is kept in Redis hashes, one field
+  per worker, so is_user_online and get_active_users_in_conversation see
+  the whole cluster. Every worker refreshes a ws:worker:<id> key; fields of
+  a worker whose key expired (it crashed) are ignored and cleaned up.
+
+If Redis is unavailable, sockets on the same worker are still served and
+presence falls back to this worker's view.
+
+Sending never waits for a client. A message is serialized once per
+broadcast and put on each recipient socket's bounded queue
+(WS_SEND_QUEUE_SIZE), which a writer task per socket drains. When a queue
+is full, WS_SLOW_CONSUMER_POLICY decides: disconnect the socket (the
+client reconnects and reloads the conversation), or drop the oldest or the
+newest frame. A socket that takes longer than WS_SEND_TIMEOUT_SECONDS to
+accept a frame is disconnected.
+
+Sockets are registered by connection id, with sets of ids per user and per
+conversation and a reverse index from socket to connection, so connecting,
+disconnecting and membership checks take the same time however many
+sockets a conversation has (see scripts/benchmark_websocket_registry.py).
+
+Inbound frames are rate limited per socket with token buckets: chat
+messages (each answered by the AI) and all other frames separately.
+Typing indicators are debounced per user and conversation: peers see at
+most one change per WS_TYPING_MIN_INTERVAL_SECONDS, and "typing" is
+cleared after WS_TYPING_TIMEOUT_SECONDS unless the client repeats it.
 """
 
-from typing import Dict, List
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
 from fastapi import WebSocket
+import asyncio
+import itertools
 import json
 import logging
+import time
+import uuid
 from datetime import datetime
+from app.core.config import settings
+from app.db.redis import async_redis_client
 
 logger = logging.getLogger(__name__)
 
 
+def _conversation_channel(conversation_id: int) -> str:
+    return f"ws:conversation:{conversation_id}"
+
+
+def _user_channel(user_id: int) -> str:
+    return f"ws:user:{user_id}"
+
+
+def _conversation_presence_key(conversation_id: int) -> str:
+    return f"ws:presence:conversation:{conversation_id}"
+
+
+def _user_presence_key(user_id: int) -> str:
+    return f"ws:presence:user:{user_id}"
+
+
+def _worker_key(worker_id: str) -> str:
+    return f"ws:worker:{worker_id}"
+
+
+def serialize(message: dict) -> str:
+    """A message as a WebSocket text frame (as WebSocket.send_json would send it)"""
+    return json.dumps(message, separators=(",", ":"), default=str)
+
+
+def _discard(index: Dict[int, Set[int]], key: int, connection_id: int) -> None:
+    connections = index.get(key)
+    if connections is not None:
+        connections.discard(connection_id)
+        if not connections:
+            del index[key]
+
+
+class TokenBucket:
+    """Allows rate events per second on average, in bursts of up to burst"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class TypingState:
+    """Typing indicator of one user in one conversation"""
+
+    def __init__(self):
+        self.shown = False  # Last state broadcast to peers
+        self.wanted = False  # Last state the client sent
+        self.changed_at = float("-inf")
+        self.flush: Optional[asyncio.TimerHandle] = None
+        self.expiry: Optional[asyncio.TimerHandle] = None
+
+    def cancel(self) -> None:
+        for timer in (self.flush, self.expiry):
+            if timer is not None:
+                timer.cancel()
+        self.flush = self.expiry = None
+
+
+class ClientConnection:
+    """One socket: whose it is, and its bounded outbound queue drained by its own writer task"""
+
+    def __init__(
+        self,
+        connection_id: int,
+        websocket: WebSocket,
+        user_id: int,
+        conversation_id: int,
+        on_stalled: Callable[["ClientConnection"], None]
+    ):
+        self.id = connection_id
+        self.websocket = websocket
+        self.user_id = user_id
+        self.conversation_id = conversation_id
+        self.dropped = 0
+        self.closing = False
+        # Inbound rate limits, and whether the client was told it hit one
+        self.message_limit = TokenBucket(
+            settings.WS_RATE_LIMIT_MESSAGES_PER_MINUTE / 60, settings.WS_RATE_LIMIT_MESSAGE_BURST
+        )
+        self.frame_limit = TokenBucket(settings.WS_RATE_LIMIT_FRAMES_PER_SECOND, settings.WS_RATE_LIMIT_FRAME_BURST)
+        self.throttled = False
+        self._on_stalled = on_stalled
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=settings.WS_SEND_QUEUE_SIZE)
+        self._writer = asyncio.create_task(self._write())
+
+    def offer(self, text: str) -> bool:
+        """
+        Queue a frame without waiting
+
+        Returns:
+            False if the socket is too slow and should be disconnected
+        """
+        if self._writer.done():
+            return True
+        try:
+            self._queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        policy = settings.WS_SLOW_CONSUMER_POLICY
+        if policy == "disconnect":
+            return False
+        self.dropped += 1
+        if policy == "drop_oldest":
+            self._queue.get_nowait()
+            self._queue.put_nowait(text)
+        return True
+
+    async def _write(self) -> None:
+        while True:
+            text = await self._queue.get()
+            try:
+                async with asyncio.timeout(settings.WS_SEND_TIMEOUT_SECONDS):
+                    await self.websocket.send_text(text)
+            except Exception as e:
+                logger.warning(f"Failed to send message to user {self.user_id}: {e!r}")
+                self._on_stalled(self)
+                return
+
+    def close(self) -> None:
+        """Stop writing; queued frames are discarded"""
+        self._writer.cancel()
+
+
 class ConnectionManager:
     """Manage WebSocket connections for real-time communication"""
 
     def __init__(self):
-        # Dictionary mapping user_id to list of WebSocket connections
-        self.active_connections: Dict[int, List[WebSocket]] = {}
-        # Dictionary mapping conversation_id to list of connected user_ids
-        self.conversation_participants: Dict[int, List[int]] = {}
+        # Sockets on this worker by connection id, and the reverse index
+        self.connections: Dict[int, ClientConnection] = {}
+        self.connection_ids: Dict[WebSocket, int] = {}
+        # Connection ids per user and per conversation
+        self.user_connections: Dict[int, Set[int]] = {}
+        self.conversation_connections: Dict[int, Set[int]] = {}
+        # Sockets per user in each conversation: a user stays a participant
+        # until their last socket in the conversation closes
+        self.conversation_participants: Dict[int, Dict[int, int]] = {}
+        self._connection_ids = itertools.count(1)
+        # Typing indicators by (user_id, conversation_id)
+        self._typing: Dict[Tuple[int, int], TypingState] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+        # Identifies this worker on the backplane
+        self.worker_id = uuid.uuid4().hex
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._channels: Set[str] = set()
+
+    @property
+    def backplane(self) -> bool:
+        return settings.WS_BACKPLANE == "redis"
 
     async def connect(self, websocket: WebSocket, user_id: int, conversation_id: int):
         """Connect a user to a conversation"""
         await websocket.accept()
+        connection = ClientConnection(
+            next(self._connection_ids), websocket, user_id, conversation_id, self._disconnect_slow
+        )
+        self.connections[connection.id] = connection
+        self.connection_ids[websocket] = connection.id
+        self.user_connections.setdefault(user_id, set()).add(connection.id)
+        self.conversation_connections.setdefault(conversation_id, set()).add(connection.id)
 
-        # Add connection to active connections
-        if user_id not in self.active_connections:
-            self.active_connections[user_id] = []
-        self.active_connections[user_id].append(websocket)
+        participants = self.conversation_participants.setdefault(conversation_id, {})
+        participants[user_id] = participants.get(user_id, 0) + 1
 
-        # Add user to conversation participants
-        if conversation_id not in self.conversation_participants:
-            self.conversation_participants[conversation_id] = []
-        if user_id not in self.conversation_participants[conversation_id]:
-            self.conversation_participants[conversation_id].append(user_id)
+        if self.backplane:
+            await self._sync_presence(user_id, conversation_id)
 
         logger.info(f"User {user_id} connected to conversation {conversation_id}")
 
-    def disconnect(self, websocket: WebSocket, user_id: int, conversation_id: int):
-        """Disconnect a user from a conversation"""
-        # Remove connection
-        if user_id in self.active_connections:
-            if websocket in self.active_connections[user_id]:
-                self.active_connections[user_id].remove(websocket)
-            if not self.active_connections[user_id]:
-                del self.active_connections[user_id]
-
-        # Remove user from conversation participants
-        if conversation_id in self.conversation_participants:
-            if user_id in self.conversation_participants[conversation_id]:
-                self.conversation_participants[conversation_id].remove(user_id)
-            if not self.conversation_participants[conversation_id]:
+    async def disconnect(self, websocket: WebSocket):
+        """Disconnect a socket from its conversation"""
+        connection_id = self.connection_ids.pop(websocket, None)
+        if connection_id is None:
+            return
+        connection = self.connections.pop(connection_id)
+        connection.close()
+        user_id, conversation_id = connection.user_id, connection.conversation_id
+
+        _discard(self.user_connections, user_id, connection_id)
+        _discard(self.conversation_connections, conversation_id, connection_id)
+
+        participants = self.conversation_participants[conversation_id]
+        participants[user_id] -= 1
+        if not participants[user_id]:
+            del participants[user_id]
+            if not participants:
                 del self.conversation_participants[conversation_id]
 
+            # The user's last socket here closed: they are not typing any more
+            typing = self._typing.pop((user_id, conversation_id), None)
+            if typing:
+                typing.cancel()
+                if typing.shown:
+                    await self._broadcast_typing(conversation_id, user_id, False)
+
+        if self.backplane:
+            await self._sync_presence(user_id, conversation_id)
+
         logger.info(f"User {user_id} disconnected from conversation {conversation_id}")
 
+    async def _sync_presence(self, user_id: int, conversation_id: int) -> None:
+        """Publish this worker's sockets of a user and conversation, and follow their channels"""
+        conversation_count = self.conversation_participants.get(conversation_id, {}).get(user_id, 0)
+        user_count = len(self.user_connections.get(user_id, ()))
+        field = f"{user_id}@{self.worker_id}"
+
+        try:
+            async with async_redis_client.pipeline(transaction=False) as pipe:
+                pipe.set(_worker_key(self.worker_id), 1, ex=settings.WS_PRESENCE_TTL_SECONDS)
+                if conversation_count:
+                    pipe.hset(_conversation_presence_key(conversation_id), field, conversation_count)
+                else:
+                    pipe.hdel(_conversation_presence_key(conversation_id), field)
+                if user_count:
+                    pipe.hset(_user_presence_key(user_id), self.worker_id, user_count)
+                else:
+                    pipe.hdel(_user_presence_key(user_id), self.worker_id)
+                await pipe.execute()
+
+            channels = {
+                _conversation_channel(conversation_id): conversation_id in self.conversation_connections,
+                _user_channel(user_id): user_id in self.user_connections
+            }
+            await self._follow(channels)
+        except Exception as e:
+            logger.warning(f"WebSocket backplane unavailable, presence not shared: {e!r}")
+
+    async def _follow(self, channels: Dict[str, bool]) -> None:
+        """Subscribe to channels that are needed and unsubscribe from those that no longer are"""
+        subscribe = [channel for channel, needed in channels.items() if needed and channel not in self._channels]
+        unsubscribe = [channel for channel, needed in channels.items() if not needed and channel in self._channels]
+
+        if subscribe:
+            if self._pubsub is None:
+                self._pubsub = async_redis_client.pubsub()
+            await self._pubsub.subscribe(*subscribe)
+            self._channels.update(subscribe)
+            if self._listener is None or self._listener.done():
+                self._listener = asyncio.create_task(self._listen())
+        if unsubscribe:
+            self._channels.difference_update(unsubscribe)
+            await self._pubsub.unsubscribe(*unsubscribe)
+
+    async def _listen(self) -> None:
+        """Deliver messages published by other workers, and keep this worker's presence alive"""
+        heartbeat_at = 0.0
+        while True:
+            try:
+                if time.monotonic() >= heartbeat_at:
+                    await async_redis_client.set(
+                        _worker_key(self.worker_id), 1, ex=settings.WS_PRESENCE_TTL_SECONDS
+                    )
+                    heartbeat_at = time.monotonic() + settings.WS_PRESENCE_TTL_SECONDS / 3
+
+                if not self._pubsub.subscribed:
+                    await asyncio.sleep(1)
+                    continue
+                event = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if event:
+                    await self._on_published(event["channel"], event["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"WebSocket backplane error: {e!r}")
+                await asyncio.sleep(1)
+
+    async def _on_published(self, channel: str, data: str) -> None:
+        envelope = json.loads(data)
+        if envelope["origin"] == self.worker_id:
+            return
+
+        kind, _, target = channel.rpartition(":")
+        if kind == "ws:conversation":
+            self._deliver_to_conversation(envelope["text"], int(target), envelope.get("sender_id"))
+        elif kind == "ws:user":
+            self._deliver_to_user(envelope["text"], int(target))
+
+    async def _publish(self, channel: str, text: str, sender_id: Optional[int] = None) -> None:
+        # The frame is passed on as text, so other workers do not serialize it again
+        try:
+            await async_redis_client.publish(channel, json.dumps(
+                {"origin": self.worker_id, "sender_id": sender_id, "text": text}
+            ))
+        except Exception as e:
+            logger.warning(f"Failed to publish to {channel}: {e!r}")
+
+    def _disconnect_slow(self, connection: ClientConnection) -> None:
+        """Close a socket that cannot keep up; the endpoint then disconnects it"""
+        if connection.closing:
+            return
+        connection.closing = True
+        connection.close()
+        logger.warning(f"Disconnecting slow WebSocket client of user {connection.user_id}")
+
+        self._spawn(connection.websocket.close(code=1013, reason="Client too slow"))
+
+    def _spawn(self, coroutine: Awaitable) -> None:
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _send_text(self, connection: ClientConnection, text: str) -> None:
+        if not connection.closing and not connection.offer(text):
+            self._disconnect_slow(connection)
+
+    def _deliver_to_user(self, text: str, user_id: int) -> None:
+        """Queue a frame for a user's sockets on this worker"""
+        for connection_id in self.user_connections.get(user_id, ()):
+            self._send_text(self.connections[connection_id], text)
+
+    def _deliver_to_conversation(self, text: str, conversation_id: int, sender_id: int = None) -> None:
+        """Queue a frame for the sockets in a conversation on this worker"""
+        for connection_id in self.conversation_connections.get(conversation_id, ()):
+            connection = self.connections[connection_id]
+            # Optionally skip sender
+            if sender_id and connection.user_id == sender_id:
+                continue
+
+            self._send_text(connection, text)
+
+    async def send_to_socket(self, websocket: WebSocket, message: dict):
+        """Send message to one socket, in order with the broadcasts it receives"""
+        connection_id = self.connection_ids.get(websocket)
+        if connection_id is not None:
+            self._send_text(self.connections[connection_id], serialize(message))
+
     async def send_personal_message(self, message: dict, user_id: int):
         """Send message to a specific user"""
-        if user_id in self.active_connections:
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    logger.error(f"Failed to send message to user {user_id}: {e}")
+        text = serialize(message)
+        self._deliver_to_user(text, user_id)
+        if self.backplane:
+            await self._publish(_user_channel(user_id), text)
 
     async def broadcast_to_conversation(
         self,
@@ -71,16 +406,40 @@ class ConnectionManager:
         sender_id: int = None
     ):
         """Broadcast message to all participants in a conversation"""
-        if conversation_id not in self.conversation_participants:
-            return
+        text = serialize(message)
+        self._deliver_to_conversation(text, conversation_id, sender_id)
+        if self.backplane:
+            await self._publish(_conversation_channel(conversation_id), text, sender_id)
 
-        participants = self.conversation_participants[conversation_id]
-        for user_id in participants:
-            # Optionally skip sender
-            if sender_id and user_id == sender_id:
-                continue
+    def allow_frame(self, websocket: WebSocket, frame_type: str) -> bool:
+        """
+        Check an inbound frame against the socket's rate limits
+
+        The first rejected frame in a row is answered with a "rate_limited"
+        error frame; the ones after it are dropped silently.
+
+        Returns:
+            Whether the frame may be handled
+        """
+        connection_id = self.connection_ids.get(websocket)
+        if connection_id is None:
+            return True
+        connection = self.connections[connection_id]
+
+        bucket = connection.message_limit if frame_type == "message" else connection.frame_limit
+        if bucket.take():
+            connection.throttled = False
+            return True
 
-            await self.send_personal_message(message, user_id)
+        if not connection.throttled:
+            connection.throttled = True
+            self._send_text(connection, serialize({
+                "type": "error",
+                "code": "rate_limited",
+                "frame_type": frame_type,
+                "timestamp": datetime.utcnow().isoformat()
+            }))
+        return False
 
     async def send_typing_indicator(
         self,
@@ -88,7 +447,54 @@ class ConnectionManager:
         user_id: int,
         is_typing: bool
     ):
-        """Send typing indicator to other participants"""
+        """Send typing indicator to other participants, debounced"""
+        key = (user_id, conversation_id)
+        state = self._typing.get(key)
+        if state is None:
+            state = self._typing[key] = TypingState()
+
+        state.wanted = bool(is_typing)
+        if state.expiry is not None:
+            state.expiry.cancel()
+            state.expiry = None
+        if state.wanted:
+            state.expiry = asyncio.get_running_loop().call_later(
+                settings.WS_TYPING_TIMEOUT_SECONDS, self._expire_typing, key
+            )
+
+        await self._update_typing(key, state)
+
+    async def _update_typing(self, key: Tuple[int, int], state: TypingState) -> None:
+        """Broadcast the wanted typing state, unless the last change was too recent"""
+        if state.flush is not None or state.wanted == state.shown:
+            # A pending flush sends the latest wanted state
+            return
+
+        loop = asyncio.get_running_loop()
+        wait = state.changed_at + settings.WS_TYPING_MIN_INTERVAL_SECONDS - loop.time()
+        if wait > 0:
+            state.flush = loop.call_later(wait, self._flush_typing, key)
+            return
+
+        state.shown = state.wanted
+        state.changed_at = loop.time()
+        user_id, conversation_id = key
+        await self._broadcast_typing(conversation_id, user_id, state.shown)
+
+    def _flush_typing(self, key: Tuple[int, int]) -> None:
+        state = self._typing.get(key)
+        if state is not None:
+            state.flush = None
+            self._spawn(self._update_typing(key, state))
+
+    def _expire_typing(self, key: Tuple[int, int]) -> None:
+        state = self._typing.get(key)
+        if state is not None:
+            state.expiry = None
+            state.wanted = False
+            self._spawn(self._update_typing(key, state))
+
+    async def _broadcast_typing(self, conversation_id: int, user_id: int, is_typing: bool):
         message = {
             "type": "typing",
             "user_id": user_id,
@@ -103,13 +509,80 @@ class ConnectionManager:
             sender_id=user_id  # Don't send to the typer
         )
 
-    def get_active_users_in_conversation(self, conversation_id: int) -> List[int]:
-        """Get list of active users in a conversation"""
-        return self.conversation_participants.get(conversation_id, [])
+    async def _live_workers(self, workers: Iterable[str]) -> Set[str]:
+        workers = list(set(workers) - {self.worker_id})
+        live = {self.worker_id}
+        if workers:
+            alive = await async_redis_client.mget([_worker_key(worker) for worker in workers])
+            live.update(worker for worker, value in zip(workers, alive) if value)
+        return live
+
+    async def get_active_users_in_conversation(self, conversation_id: int) -> List[int]:
+        """Get list of active users in a conversation, on any worker"""
+        local = list(self.conversation_participants.get(conversation_id, {}))
+        if not self.backplane:
+            return local
+
+        key = _conversation_presence_key(conversation_id)
+        try:
+            fields = await async_redis_client.hkeys(key)
+            live = await self._live_workers(field.rpartition("@")[2] for field in fields)
+            stale = [field for field in fields if field.rpartition("@")[2] not in live]
+            if stale:
+                await async_redis_client.hdel(key, *stale)
+        except Exception as e:
+            logger.warning(f"Shared presence unavailable: {e!r}")
+            return local
+
+        users = {int(field.rpartition("@")[0]) for field in fields if field not in stale}
+        return sorted(users | set(local))
+
+    async def is_user_online(self, user_id: int) -> bool:
+        """Check if a user is currently online, on any worker"""
+        if user_id in self.user_connections:
+            return True
+        if not self.backplane:
+            return False
+
+        key = _user_presence_key(user_id)
+        try:
+            workers = await async_redis_client.hkeys(key)
+            live = await self._live_workers(workers)
+            stale = [worker for worker in workers if worker not in live]
+            if stale:
+                await async_redis_client.hdel(key, *stale)
+        except Exception as e:
+            logger.warning(f"Shared presence unavailable: {e!r}")
+            return False
+
+        return any(worker in live and worker != self.worker_id for worker in workers)
+
+    async def close(self):
+        """Leave the backplane: drop this worker's presence and subscriptions"""
+        for state in self._typing.values():
+            state.cancel()
+        self._typing.clear()
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if not self.backplane:
+            return
 
-    def is_user_online(self, user_id: int) -> bool:
-        """Check if a user is currently online"""
-        return user_id in self.active_connections and len(self.active_connections[user_id]) > 0
+        try:
+            async with async_redis_client.pipeline(transaction=False) as pipe:
+                for conversation_id, participants in self.conversation_participants.items():
+                    for user_id in participants:
+                        pipe.hdel(_conversation_presence_key(conversation_id), f"{user_id}@{self.worker_id}")
+                for user_id in self.user_connections:
+                    pipe.hdel(_user_presence_key(user_id), self.worker_id)
+                pipe.delete(_worker_key(self.worker_id))
+                await pipe.execute()
+            if self._pubsub is not None:
+                await self._pubsub.aclose()
+        except Exception as e:
+            logger.warning(f"Failed to leave the WebSocket backplane: {e!r}")
+        self._pubsub = None
+        self._channels.clear()
 
 
 # Singleton instance
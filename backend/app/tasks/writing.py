@@ -0,0 +1,35 @@
+"""
+Writing evaluation tasks
+"""
+import asyncio
+import logging
+from typing import Optional
+from app.celery_worker import celery_app
+from app.services.ai.writing_evaluation import evaluate_submission, mark_evaluation_failed
+
+logger = logging.getLogger(__name__)
+
+# One event loop per worker process, so the LLM gateway's pooled
+# connections and limits carry over from one task to the next
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def run_async(coroutine):
+    """Run a coroutine on the worker process' event loop"""
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coroutine)
+
+
+@celery_app.task(bind=True, name="writing.evaluate_submission", max_retries=2, default_retry_delay=30)
+def evaluate_writing_submission(self, submission_id: int) -> Optional[str]:
+    """Evaluate a writing submission with AI, retrying failed AI calls"""
+    try:
+        return run_async(evaluate_submission(submission_id))
+    except Exception as e:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e)
+        logger.error(f"Writing evaluation failed for submission {submission_id}: {e!r}")
+        mark_evaluation_failed(submission_id)
+        return "failed"
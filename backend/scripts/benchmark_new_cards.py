@@ -0,0 +1,125 @@
+"""
+Benchmark for the "new cards" query
+
+Compares the NOT EXISTS anti-join used by get_new_cards with the old
+approach of loading every learned vocabulary_id and sending it back as
+NOT IN (...). The first page still skips the learned prefix of the
+frequency list inside the index; pages fetched with the keyset cursor
+start past it.
+
+Runs against a throwaway in-memory SQLite database by default; pass
+--database-url to point it at a scratch PostgreSQL database.
+
+Usage:
+    python scripts/benchmark_new_cards.py [--database-url URL] [--vocabulary 100000]
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker, Session
+
+import app.db.base  # noqa: F401  (registers every model)
+from app.db.session import Base
+from app.models.vocabulary import Vocabulary, UserVocabulary
+from app.services.flashcard.spaced_repetition import get_new_cards, decode_new_cards_cursor, encode_new_cards_cursor
+
+LANGUAGE_ID = 1
+PAGE_SIZE = 20
+LEARNED_SIZES = [100, 1000, 10000, 50000]
+
+
+def legacy_new_cards(user_id: int, db: Session) -> list:
+    """The pre-anti-join implementation, kept here for comparison"""
+    learned_ids = [row[0] for row in db.query(UserVocabulary.vocabulary_id).filter(
+        UserVocabulary.user_id == user_id
+    ).all()]
+
+    query = db.query(Vocabulary).filter(Vocabulary.language_id == LANGUAGE_ID)
+    if learned_ids:
+        query = query.filter(~Vocabulary.id.in_(learned_ids))
+
+    return query.limit(PAGE_SIZE).all()
+
+
+def seed(db: Session, vocabulary_size: int) -> None:
+    """Create a vocabulary and one user per learned-deck size"""
+    db.execute(insert(Vocabulary), [
+        {"id": i, "language_id": LANGUAGE_ID, "word": f"word{i}", "frequency": i}
+        for i in range(1, vocabulary_size + 1)
+    ])
+
+    rng = random.Random(0)
+    for user_id, learned in enumerate(LEARNED_SIZES, start=1):
+        # Learned words are biased towards the frequent end, as in real decks
+        learned_ids = set(range(1, learned // 2 + 1))
+        learned_ids.update(rng.sample(range(learned // 2 + 1, vocabulary_size + 1), learned - len(learned_ids)))
+        db.execute(insert(UserVocabulary), [
+            {"user_id": user_id, "vocabulary_id": vocab_id, "language_id": LANGUAGE_ID, "status": "review"}
+            for vocab_id in learned_ids
+        ])
+
+    db.commit()
+
+
+def time_call(fn, repeat: int) -> float:
+    """Median wall-clock time of fn() in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--vocabulary", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    tables = [Vocabulary.__table__, UserVocabulary.__table__]
+    Base.metadata.drop_all(engine, tables=tables)
+    Base.metadata.create_all(engine, tables=tables)
+    db = sessionmaker(bind=engine)()
+
+    print(f"Seeding {args.vocabulary} words...")
+    seed(db, args.vocabulary)
+
+    print(f"\n{'learned':>8} | {'first page (ms)':>15} | {'next page (ms)':>14} | {'NOT IN list (ms)':>16}")
+    print("-" * 64)
+
+    for user_id, learned in enumerate(LEARNED_SIZES, start=1):
+        first_page = time_call(
+            lambda: get_new_cards(user_id, LANGUAGE_ID, PAGE_SIZE, db), args.repeat
+        )
+
+        cursor = encode_new_cards_cursor(get_new_cards(user_id, LANGUAGE_ID, PAGE_SIZE, db)[-1])
+        next_page = time_call(
+            lambda: get_new_cards(user_id, LANGUAGE_ID, PAGE_SIZE, db, after=decode_new_cards_cursor(cursor)),
+            args.repeat
+        )
+
+        try:
+            legacy = f"{time_call(lambda: legacy_new_cards(user_id, db), args.repeat):16.2f}"
+        except Exception as e:
+            db.rollback()
+            legacy = f"{'failed':>16}"
+            print(f"  NOT IN with {learned} ids: {type(e).__name__}")
+
+        print(f"{learned:>8} | {first_page:15.2f} | {next_page:14.2f} | {legacy}")
+
+    Base.metadata.drop_all(engine, tables=tables)
+
+
+if __name__ == "__main__":
+    main()
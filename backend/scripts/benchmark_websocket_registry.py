@@ -0,0 +1,104 @@
+"""
+Micro-benchmark for the WebSocket connection registry
+
+Connects up to --connections in-memory sockets to a ConnectionManager
+(WS_BACKPLANE=local, no network), then churns: random sockets disconnect
+and new ones connect. Reports the median cost of connect and disconnect
+at each size step, for one big room and for many small ones; the cost should
+stay flat as the rooms grow.
+
+Usage:
+    python scripts/benchmark_websocket_registry.py [--connections 10000] [--churn 20000] [--rooms 100]
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import List
+
+from app.core.config import settings
+from app.services.websocket_manager import ConnectionManager
+
+
+class NullSocket:
+    """Accepts everything instantly"""
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        pass
+
+    async def close(self, code=1000, reason=None):
+        pass
+
+
+async def bench(connections: int, churn: int, rooms: int, steps: int) -> List[str]:
+    manager = ConnectionManager()
+    rng = random.Random(1)
+    sockets = []
+    lines = []
+
+    async def connect() -> float:
+        socket = NullSocket()
+        started = time.perf_counter()
+        await manager.connect(socket, rng.randrange(connections // 2 + 1), rng.randrange(rooms))
+        elapsed = time.perf_counter() - started
+        sockets.append(socket)
+        return elapsed
+
+    async def disconnect() -> float:
+        index = rng.randrange(len(sockets))
+        sockets[index], sockets[-1] = sockets[-1], sockets[index]
+        socket = sockets.pop()
+        started = time.perf_counter()
+        await manager.disconnect(socket)
+        return time.perf_counter() - started
+
+    step = connections // steps
+    for size in range(step, connections + 1, step):
+        connect_times = [await connect() for _ in range(step)]
+        # Churn at this size: one disconnect and one connect per round
+        disconnect_times, churn_connect_times = [], []
+        for _ in range(max(churn // steps, 1)):
+            disconnect_times.append(await disconnect())
+            churn_connect_times.append(await connect())
+        # Let writer tasks of closed sockets finish cancelling
+        await asyncio.sleep(0)
+
+        lines.append(
+            f"{rooms:>6} {size:>12} {statistics.median(connect_times) * 1e6:>12.1f} "
+            f"{statistics.median(churn_connect_times) * 1e6:>14.1f} "
+            f"{statistics.median(disconnect_times) * 1e6:>14.1f}"
+        )
+
+    while sockets:
+        await disconnect()
+    await asyncio.sleep(0)
+    assert not manager.connections and not manager.conversation_connections and not manager.user_connections
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark WebSocket connect/disconnect cost")
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--churn", type=int, default=20000, help="Disconnect/connect rounds in total")
+    parser.add_argument("--rooms", type=int, default=100, help="Conversations for the many-rooms run")
+    parser.add_argument("--steps", type=int, default=5)
+    args = parser.parse_args()
+
+    settings.WS_BACKPLANE = "local"
+    print(f"{'rooms':>6} {'connections':>12} {'connect us':>12} {'churn connect us':>14} {'disconnect us':>14}")
+    for rooms in (1, args.rooms):
+        for line in asyncio.run(bench(args.connections, args.churn, rooms, args.steps)):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Compact old flashcard reviews into per-card summary rows
+
+Reviews older than FLASHCARD_REVIEW_RETENTION_DAYS are folded into
+flashcard_review_summaries and deleted from flashcard_reviews. Meant to
+run periodically (e.g. nightly); safe to re-run.
+
+Usage:
+    python scripts/compact_flashcard_reviews.py [--retention-days 365] [--batch-size 1000]
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+
+import app.db.base  # noqa: F401  (registers every model)
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.flashcard.review_archive import compact_flashcard_reviews
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact old flashcard reviews")
+    parser.add_argument("--retention-days", type=int, default=settings.FLASHCARD_REVIEW_RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        cards = compact_flashcard_reviews(db, args.retention_days, args.batch_size)
+        print(f"Compacted reviews older than {args.retention_days} days for {cards} card(s)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
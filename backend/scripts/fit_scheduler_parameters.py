@@ -0,0 +1,58 @@
+"""
+Fit per-user memory model (FSRS) parameters from flashcard review history
+
+Meant to run offline (e.g. nightly). Users with fewer than
+FLASHCARD_FSRS_MIN_REVIEWS reviews keep the default parameters.
+
+Usage:
+    python scripts/fit_scheduler_parameters.py [--user-id ID] [--iterations 100]
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+
+from sqlalchemy import func
+
+import app.db.base  # noqa: F401  (registers every model)
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.vocabulary import UserVocabulary, FlashcardReview
+from app.services.flashcard.fsrs_optimizer import fit_user_parameters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit per-user FSRS parameters")
+    parser.add_argument("--user-id", type=int, help="Only fit this user")
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.user_id:
+            user_ids = [args.user_id]
+        else:
+            user_ids = [row.user_id for row in db.query(UserVocabulary.user_id).join(
+                FlashcardReview
+            ).group_by(UserVocabulary.user_id).having(
+                func.count(FlashcardReview.id) >= settings.FLASHCARD_FSRS_MIN_REVIEWS
+            )]
+
+        print(f"Fitting parameters for {len(user_ids)} user(s)...")
+        for user_id in user_ids:
+            summary = fit_user_parameters(user_id, db, iterations=args.iterations)
+            if summary is None:
+                print(f"  user {user_id}: not enough reviews")
+                continue
+            print(
+                f"  user {user_id}: {summary['review_count']} reviews, "
+                f"log loss {summary['default_log_loss']:.4f} -> {summary['log_loss']:.4f}"
+            )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Load test for the AI-backed endpoints
+
+Drives chat (plain and streaming) and writing evaluation against a running
+API with a number of concurrent virtual users, then reports throughput and
+latency percentiles per endpoint. Start the API with LLM_PROVIDER=mock to
+benchmark the whole stack offline without spending quota; the mock's
+latency is shaped by the LLM_MOCK_* settings.
+
+All virtual users share one account, so set LLM_MAX_CONCURRENCY_PER_USER
+high enough on the server, or the per-user limit is what gets measured.
+
+Usage:
+    LLM_PROVIDER=mock uvicorn app.main:app
+    python scripts/load_test_ai.py --email user@example.com --password secret \\
+        [--base-url http://localhost:8000] [--users 20] [--duration 60]
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+
+MESSAGES = (
+    "I am fine, thank you",
+    "Yesterday I goed to the market with my sister",
+    "What do you usually eat for breakfast?",
+    "I would like to practice ordering food in a restaurant",
+    "My favourite hobby are reading books",
+)
+
+ESSAY = (
+    "Last summer I visited my grandparents in a small village. Every morning we walked "
+    "to the bakery and buyed fresh bread. I learned a lot about their life when they was young."
+)
+
+
+def percentile(values: List[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+async def virtual_user(
+    client: httpx.AsyncClient,
+    language_id: int,
+    deadline: float,
+    latencies: Dict[str, List[float]],
+    errors: Dict[str, int]
+) -> None:
+    async def timed(name: str, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            response.raise_for_status()
+            latencies[name].append(time.perf_counter() - started)
+            return response
+        except httpx.HTTPError:
+            errors[name] += 1
+            raise
+
+    conversation = await timed("create conversation", "POST", "/chat/conversations", json={"language_id": language_id})
+    conversation_id = conversation.json()["id"]
+
+    while time.perf_counter() < deadline:
+        action = random.random()
+        try:
+            if action < 0.5:
+                await timed("chat message", "POST", f"/chat/conversations/{conversation_id}/messages",
+                            json={"content": random.choice(MESSAGES)})
+            elif action < 0.85:
+                await timed("chat message (stream)", "POST",
+                            f"/chat/conversations/{conversation_id}/messages?stream=true",
+                            json={"content": random.choice(MESSAGES)})
+            else:
+                await timed("writing submission", "POST", "/writing/submit", json={
+                    "language_id": language_id, "prompt": None, "topic": "Holidays",
+                    "title": None, "content": ESSAY, "time_spent_seconds": 300
+                })
+        except httpx.HTTPError:
+            await asyncio.sleep(1)
+
+
+async def run(args) -> None:
+    async with httpx.AsyncClient(base_url=args.base_url.rstrip("/") + "/api/v1", timeout=120) as client:
+        login = await client.post("/auth/login", json={"email": args.email, "password": args.password})
+        login.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {login.json()['access_token']}"
+
+        latencies: Dict[str, List[float]] = defaultdict(list)
+        errors: Dict[str, int] = defaultdict(int)
+        started = time.perf_counter()
+        deadline = started + args.duration
+
+        await asyncio.gather(*[
+            virtual_user(client, args.language_id, deadline, latencies, errors)
+            for _ in range(args.users)
+        ], return_exceptions=True)
+        elapsed = time.perf_counter() - started
+
+    print(f"{args.users} users, {elapsed:.1f}s")
+    print(f"{'endpoint':<24} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name in sorted(set(latencies) | set(errors)):
+        values = latencies.get(name) or [0.0]
+        print(
+            f"{name:<24} {len(latencies.get(name, [])):>9} {errors.get(name, 0):>7} "
+            f"{len(latencies.get(name, [])) / elapsed:>8.1f} "
+            f"{statistics.median(values) * 1000:>8.0f} {percentile(values, 0.95) * 1000:>8.0f} "
+            f"{percentile(values, 0.99) * 1000:>8.0f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the AI-backed endpoints")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--language-id", type=int, default=1)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Tests for the daily flashcard session when its Redis store is down
+"""
+
+from datetime import datetime, timedelta
+import pytest
+import redis
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.db.base  # noqa: F401 - registers every model on Base
+from app.db.session import Base
+from app.models.vocabulary import UserVocabulary, Vocabulary
+from app.services.flashcard import daily_session
+
+
+class UnreachableRedis:
+    """Every command fails like a Redis server that is down"""
+
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise redis.ConnectionError("Connection refused")
+        return fail
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """One due card and two new words, with the session store unreachable"""
+    monkeypatch.setattr(daily_session, "redis_client", UnreachableRedis())
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        Vocabulary(id=1, language_id=3, word="kedi", frequency=1),
+        Vocabulary(id=2, language_id=3, word="köpek", frequency=2),
+        Vocabulary(id=3, language_id=3, word="kuş", frequency=3),
+        UserVocabulary(
+            id=1, user_id=1, vocabulary_id=3, language_id=3, status="review",
+            next_review_date=datetime.utcnow() - timedelta(days=1)
+        ),
+    ])
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.mark.unit
+def test_session_is_built_from_the_database_without_redis(db):
+    """Starting and taking cards still work, due reviews first"""
+    summary = daily_session.start_daily_session(1, 3, db)
+    assert (summary["review_cards"], summary["new_cards"], summary["remaining"]) == (1, 2, 3)
+
+    cards = daily_session.pop_session_cards(1, 3, 2, db)
+    assert [(card["vocabulary"].id, card["is_new"]) for card in cards] == [(3, False), (1, True)]
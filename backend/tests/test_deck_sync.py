@@ -0,0 +1,156 @@
+"""
+Tests for the offline deck snapshot and review log formats
+"""
+
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.db.base  # noqa: F401 - registers every model on Base
+from app.api.v1.endpoints import vocabulary
+from app.core.dependencies import get_db, get_current_user
+from app.db.session import Base
+from app.models.vocabulary import UserVocabulary, Vocabulary
+from app.services.flashcard.deck_sync import (
+    MAX_REVIEWED_AT,
+    NULL_STRING,
+    REVIEW_RECORD,
+    REVIEWS_HEADER,
+    DeckFormatError,
+    decode_deck,
+    decode_reviews,
+    deck_etag,
+    encode_deck,
+    encode_reviews,
+    parse_deck_etag,
+)
+
+
+@pytest.mark.unit
+def test_deck_round_trip():
+    """Card state and content survive encoding, including nulls and non-ASCII"""
+    card = {
+        "id": 7, "vocabulary_id": 42, "status": "review", "ease_factor": 2.5, "interval": 6,
+        "repetitions": 2, "next_review_date": datetime(2024, 5, 1, 9, 30, tzinfo=timezone.utc),
+        "times_reviewed": 3, "times_correct": 2, "times_incorrect": 1,
+        "word": "çiçek", "translation": "flower", "pronunciation": None, "part_of_speech": "noun",
+        "definition": None, "example_sentence": "Bir çiçek.", "image_url": None, "audio_url": None,
+    }
+
+    deck = decode_deck(encode_deck(3, 123, [card], delta=True))
+
+    assert deck["language_id"] == 3
+    assert deck["watermark"] == 123
+    assert deck["delta"] is True
+    assert deck["cards"] == [card]
+
+    # Over-long text is cut without splitting a multi-byte character
+    long_card = {**card, "definition": "a" + "ç" * NULL_STRING}
+    definition = decode_deck(encode_deck(3, 123, [long_card]))["cards"][0]["definition"]
+    assert long_card["definition"].startswith(definition)
+    assert len(definition.encode("utf-8")) == NULL_STRING - 2
+
+
+@pytest.mark.unit
+def test_review_log_round_trip_and_validation():
+    """Review logs decode to batch review dicts; malformed logs are rejected"""
+    reviewed_at = datetime(2024, 5, 2, 8, 0, tzinfo=timezone.utc)
+    log = encode_reviews([{"vocabulary_id": 42, "quality": 4, "time_taken_seconds": 5, "reviewed_at": reviewed_at}])
+
+    assert decode_reviews(log) == [
+        {"vocabulary_id": 42, "quality": 4, "time_taken_seconds": 5, "reviewed_at": reviewed_at}
+    ]
+    with pytest.raises(DeckFormatError):
+        decode_reviews(log[:-1])
+    with pytest.raises(DeckFormatError):
+        decode_deck(b"JUNK" + log)
+
+    # Review times outside datetime's range are a format error, not a crash
+    header, record = log[:REVIEWS_HEADER.size], log[REVIEWS_HEADER.size:]
+    for reviewed_at in (-1, 2 ** 63 - 1, MAX_REVIEWED_AT + 1):
+        vocabulary_id, quality, time_taken, _ = REVIEW_RECORD.unpack(record)
+        with pytest.raises(DeckFormatError):
+            decode_reviews(header + REVIEW_RECORD.pack(vocabulary_id, quality, time_taken, reviewed_at))
+
+
+@pytest.mark.unit
+def test_etag_is_scoped_to_language():
+    """An ETag only yields a delta for the deck it was issued for"""
+    etag = deck_etag(3, 123)
+
+    assert parse_deck_etag(etag, 3) == 123
+    assert parse_deck_etag(f"W/{etag}", 3) == 123
+    assert parse_deck_etag(etag, 4) is None
+    assert parse_deck_etag('"something-else"', 3) is None
+
+
+@pytest.fixture
+def deck_api():
+    """The vocabulary API on an in-memory database holding a two-card deck"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)
+
+    created = datetime(2024, 5, 1)
+    db = session()
+    db.add_all([
+        Vocabulary(id=1, language_id=3, word="kedi", created_at=created),
+        Vocabulary(id=2, language_id=3, word="köpek", created_at=created),
+        UserVocabulary(id=1, user_id=1, vocabulary_id=1, language_id=3, status="learning", created_at=created),
+        UserVocabulary(id=2, user_id=1, vocabulary_id=2, language_id=3, status="learning", created_at=created),
+    ])
+    db.commit()
+    db.close()
+
+    def get_test_db():
+        db = session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    api = FastAPI()
+    api.include_router(vocabulary.router)
+    api.dependency_overrides[get_db] = get_test_db
+    api.dependency_overrides[get_current_user] = lambda: type("User", (), {"id": 1})()
+
+    with TestClient(api) as test_client:
+        yield test_client, session
+    engine.dispose()
+
+
+@pytest.mark.unit
+def test_import_keeps_changes_made_elsewhere_in_next_delta(deck_api):
+    """After an import the client's own ETag still yields cards changed by another device"""
+    client, session = deck_api
+    etag = client.get("/deck/export", params={"language_id": 3}).headers["etag"]
+
+    # Another device reviews card 2 while this client is offline
+    db = session()
+    db.query(UserVocabulary).filter(UserVocabulary.id == 2).update(
+        {UserVocabulary.status: "review", UserVocabulary.updated_at: datetime.utcnow() - timedelta(minutes=5)}
+    )
+    db.commit()
+    db.close()
+
+    log = encode_reviews([{
+        "vocabulary_id": 1, "quality": 4, "time_taken_seconds": 3,
+        "reviewed_at": datetime.now(timezone.utc) - timedelta(minutes=1)
+    }])
+    imported = client.post(
+        "/deck/import", params={"language_id": 3}, content=log,
+        headers={"Content-Type": "application/octet-stream"}
+    )
+    assert imported.status_code == 201
+    assert "etag" not in imported.json()
+
+    delta = client.get("/deck/export", params={"language_id": 3}, headers={"If-None-Match": etag})
+    deck = decode_deck(delta.content)
+    assert deck["delta"] is True
+    assert {card["vocabulary_id"]: card["times_reviewed"] for card in deck["cards"]} == {1: 1, 2: 0}
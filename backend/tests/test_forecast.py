@@ -0,0 +1,21 @@
+"""
+Tests for review load forecasting
+"""
+
+import numpy as np
+import pytest
+from app.services.flashcard.forecast import project_review_load
+
+
+@pytest.mark.unit
+def test_projection_adds_follow_up_reviews():
+    """New cards come back after 1 and 6 days; lapses come back the next day"""
+    scheduled = np.zeros((10, 11))
+    scheduled[0, 0] = 100
+
+    perfect = project_review_load(scheduled, 1.0, 2.5)
+    assert list(perfect) == [100, 100, 0, 0, 0, 0, 0, 100, 0, 0]
+
+    with_lapses = project_review_load(scheduled, 0.8, 2.5)
+    assert with_lapses[2] == pytest.approx(20)
+    assert with_lapses.sum() > perfect.sum()
@@ -0,0 +1,71 @@
+"""
+Tests for batched grammar analysis of chat messages
+"""
+
+import asyncio
+import json
+import re
+import pytest
+from app.core.config import settings
+from app.services.ai import structured_output
+from app.services.ai.grammar_batcher import GrammarBatcher
+from app.services.ai.providers import ChatResult
+
+
+def _analysis(text):
+    if "goed" in text:
+        return {"has_errors": True, "corrections": [{"original": "goed", "corrected": "went"}]}
+    return {"has_errors": False, "corrections": []}
+
+
+@pytest.fixture
+def stub_gateway(monkeypatch):
+    """Answers batch prompts in reverse order, leaving out the last text"""
+    monkeypatch.setattr(settings, "AI_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "GRAMMAR_BATCH_WINDOW_MS", 20.0)
+    requests = []
+
+    async def chat(messages, **params):
+        prompt = messages[-1]["content"]
+        requests.append(prompt)
+        texts = re.findall(r"^\[(\d+)\] (.*)$", prompt, re.MULTILINE)
+        if texts:
+            results = [{"id": int(number), **_analysis(text)} for number, text in texts[:-1]]
+            content = json.dumps({"results": results[::-1]})
+        else:
+            content = json.dumps(_analysis(prompt.split("Text:", 1)[1]))
+        return ChatResult(content=content, model="stub", provider="stub")
+
+    monkeypatch.setattr(structured_output.llm_gateway, "chat", chat)
+    return requests
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_messages_in_a_window_share_one_request(stub_gateway):
+    """Concurrent messages go out together and each caller gets its own result"""
+    batcher = GrammarBatcher()
+    texts = ["I goed home", "Fine, thanks", "We goed out", "See you"]
+
+    results = await asyncio.gather(*[batcher.analyze(text) for text in texts])
+
+    assert [bool(result) for result in results] == [True, False, True, False]
+    # One batch, plus the text the reply left out asked for on its own
+    assert len(stub_gateway) == 2
+    assert batcher.stats()["batches"] == 1 and batcher.stats()["single_requests"] == 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_token_budget_splits_batches(stub_gateway, monkeypatch):
+    """A batch is sent as soon as the next message would not fit"""
+    monkeypatch.setattr(settings, "GRAMMAR_BATCH_MAX_TOKENS", 12)
+    batcher = GrammarBatcher()
+    texts = ["I goed to the market today", "We goed to the park", "All fine here", "Nothing to fix"]
+
+    results = await asyncio.gather(*[batcher.analyze(text) for text in texts])
+
+    assert [bool(result) for result in results] == [True, True, False, False]
+    stats = batcher.stats()
+    assert stats["items"] == 4 and stats["pending"] == 0
+    assert stats["batches"] + stats["single_requests"] == len(stub_gateway) > 1
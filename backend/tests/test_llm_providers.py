@@ -0,0 +1,181 @@
+"""
+Tests for the mock LLM provider, the router and the gateway in front of them
+"""
+
+import asyncio
+import json
+import pytest
+from app.core.config import settings
+from app.services.ai.llm_gateway import LLMGateway
+from app.services.ai.providers import ChatResult, LLMProvider, get_provider
+from app.services.ai.providers.mock_provider import MockProviderError
+from app.services.ai.providers.router import RouterProvider
+
+
+class StubProvider(LLMProvider):
+    """Answers after a fixed delay, or fails"""
+
+    def __init__(self, name, delay=0.0, error=None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def chat(self, messages, **params):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return ChatResult(content=self.name, model="stub", provider=self.name)
+
+    async def chat_stream(self, messages, **params):
+        result = await self.chat(messages, **params)
+        for word in (result.content, " done"):
+            yield word
+
+    def is_retryable(self, error):
+        return isinstance(error, ConnectionError)
+
+
+@pytest.fixture
+def fast_mock(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PROVIDER", "mock")
+    monkeypatch.setattr(settings, "LLM_MOCK_LATENCY_DISTRIBUTION", "fixed")
+    monkeypatch.setattr(settings, "LLM_MOCK_LATENCY_MEAN_MS", 0.0)
+    monkeypatch.setattr(settings, "LLM_MOCK_TOKEN_INTERVAL_MS", 0.0)
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_DELAY_SECONDS", 0.0)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_mock_replies_are_deterministic_and_parseable(fast_mock):
+    """Same prompt, same reply; evaluation prompts get the JSON their services read"""
+    gateway = LLMGateway()
+    grammar = [{"role": "user", "content": "Analyze the following text for grammar, spelling...\nText: I am fine"}]
+
+    first = await gateway.chat(grammar)
+    assert first.provider == "mock"
+    assert first.content == (await gateway.chat(grammar)).content
+    assert "has_errors" in json.loads(first.content)
+
+    writing = await gateway.chat([{"role": "user", "content": "Evaluate the following essay...\nText:\nHello"}])
+    assert {"overall_score", "grammar_score", "feedback"} <= set(json.loads(writing.content))
+
+    chat = [{"role": "user", "content": "Hi there"}]
+    streamed = "".join([chunk async for chunk in gateway.chat_stream(chat)])
+    assert streamed == (await gateway.chat(chat)).content
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_mock_latency_and_injected_errors(fast_mock, monkeypatch):
+    """Latency follows the configured distribution; injected errors are retried"""
+    monkeypatch.setattr(settings, "LLM_MOCK_LATENCY_DISTRIBUTION", "lognormal")
+    monkeypatch.setattr(settings, "LLM_MOCK_LATENCY_MEAN_MS", 500.0)
+    monkeypatch.setattr(settings, "LLM_MOCK_LATENCY_STDDEV_MS", 200.0)
+    provider = get_provider("mock")
+    samples = [provider._latency() for _ in range(5000)]
+    other = get_provider("mock")
+    assert samples[:3] == [other._latency() for _ in range(3)]
+    assert 0.47 < sum(samples) / len(samples) < 0.53
+    assert min(samples) > 0
+
+    monkeypatch.setattr(settings, "LLM_MOCK_LATENCY_MEAN_MS", 0.0)
+    monkeypatch.setattr(settings, "LLM_MOCK_ERROR_RATE", 1.0)
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 2)
+    with pytest.raises(MockProviderError):
+        await LLMGateway().chat([{"role": "user", "content": "Hi"}])
+
+
+@pytest.fixture
+def router_settings(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_ROUTER_EXPLORE_RATE", 0.0)
+    monkeypatch.setattr(settings, "LLM_ROUTER_MIN_SAMPLES", 3)
+    monkeypatch.setattr(settings, "LLM_ROUTER_ATTEMPT_TIMEOUT_SECONDS", 5.0)
+    monkeypatch.setattr(settings, "LLM_ROUTER_HEDGE", False)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_router_prefers_lower_p95_and_fails_over(router_settings, monkeypatch):
+    """Traffic moves to the faster provider; timeouts and retryable errors fail over"""
+    slow, fast = StubProvider("slow", delay=0.03), StubProvider("fast", delay=0.001)
+    router = RouterProvider([slow, fast])
+    messages = [{"role": "user", "content": "Hi"}]
+
+    # Both are measured first, in the configured order
+    for _ in range(6):
+        await router.chat(messages)
+    assert [provider.name for provider in router.rank("chat", "chat")] == ["fast", "slow"]
+    assert (await router.chat(messages)).provider == "fast"
+
+    fast.error = ConnectionError("reset")
+    assert (await router.chat(messages)).provider == "slow"
+
+    fast.error, fast.delay = None, 1.0
+    monkeypatch.setattr(settings, "LLM_ROUTER_ATTEMPT_TIMEOUT_SECONDS", 0.05)
+    assert (await router.chat(messages)).provider == "slow"
+    assert router.stats()["fast:chat"]["error_rate"] > 0
+
+    # Errors that would repeat anywhere are not failed over
+    slow.error = ValueError("bad request")
+    router._stats.clear()
+    with pytest.raises(ValueError):
+        await router.chat(messages)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_router_hedges_slow_requests(router_settings, monkeypatch):
+    """A second provider is asked after the hedge delay; the first answer wins"""
+    monkeypatch.setattr(settings, "LLM_ROUTER_HEDGE", True)
+    monkeypatch.setattr(settings, "LLM_ROUTER_HEDGE_DELAY_SECONDS", 0.02)
+    stuck, backup = StubProvider("stuck", delay=0.5), StubProvider("backup", delay=0.001)
+    router = RouterProvider([stuck, backup])
+
+    result = await router.chat([{"role": "user", "content": "Hi"}])
+    assert result.provider == "backup"
+    await asyncio.sleep(0.01)
+    assert stuck.cancelled == 1
+
+    chunks = [chunk async for chunk in router.chat_stream([{"role": "user", "content": "Hi"}])]
+    assert chunks == ["backup", " done"]
+    await asyncio.sleep(0.01)
+    assert stuck.cancelled == 2
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_router_discards_attempts_that_finish_together(router_settings, monkeypatch):
+    """When hedged attempts finish in the same tick, one wins and the rest are cleaned up"""
+    monkeypatch.setattr(settings, "LLM_ROUTER_HEDGE", True)
+    monkeypatch.setattr(settings, "LLM_ROUTER_HEDGE_DELAY_SECONDS", 0.01)
+    router = RouterProvider([StubProvider("first"), StubProvider("second")])
+    discarded = []
+
+    async def discard(result):
+        discarded.append(result)
+
+    async def route(fail):
+        gate = asyncio.Event()
+
+        async def call(provider):
+            await gate.wait()
+            if provider.name in fail:
+                raise ValueError("bad request")
+            return provider.name
+
+        asyncio.get_running_loop().call_later(0.03, gate.set)
+        return await router._route("chat", "chat", call, discard=discard)
+
+    winner = await route(fail=())
+    assert discarded == [{"first", "second"}.difference([winner]).pop()]
+
+    # A success is not lost to an error that finished alongside it
+    discarded.clear()
+    assert await route(fail=("first",)) == "second" and not discarded
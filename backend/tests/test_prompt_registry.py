@@ -0,0 +1,42 @@
+"""
+Tests for the versioned chat prompt registry
+"""
+
+import json
+import pytest
+from app.services.ai.prompt_registry import PromptRegistry, prompt_registry
+
+
+@pytest.mark.unit
+def test_references_resolve_to_composed_prompts():
+    """New conversations store a short reference; the text is composed once and shared"""
+    reference = prompt_registry.chat_reference("scenario", "restaurant", "strict_teacher")
+    assert reference == f"chat/strict_teacher/restaurant@{prompt_registry.current_version}"
+
+    prompt = prompt_registry.get(reference)
+    assert prompt.startswith("You are a strict but fair language teacher.")
+    assert "restaurant scenario" in prompt
+    assert prompt.endswith("Keep responses natural and conversational.")
+    assert prompt is prompt_registry.get(reference)
+
+    # The scenario only applies to scenario conversations; unknown values fall back
+    assert prompt_registry.chat_reference("free", "restaurant", None) == prompt_registry.chat_reference("free")
+    assert prompt_registry.chat_reference("scenario", "moon_base", "pirate").startswith("chat/friendly_tutor/free@")
+    assert prompt_registry.get("chat/pirate/moon_base@99") == prompt_registry.get(
+        prompt_registry.chat_reference("free")
+    )
+
+
+@pytest.mark.unit
+def test_old_versions_keep_resolving(tmp_path):
+    """Conversations keep the prompt version they started with"""
+    def version(text):
+        return {"characters": {"friendly_tutor": text}, "scenarios": {}, "closing": "Bye."}
+
+    path = tmp_path / "chat_system.json"
+    path.write_text(json.dumps({"current_version": 2, "versions": {"1": version("Old."), "2": version("New.")}}))
+    registry = PromptRegistry(path)
+
+    assert registry.chat_reference("free") == "chat/friendly_tutor/free@2"
+    assert registry.get("chat/friendly_tutor/free@1") == "Old.\n\nBye."
+    assert registry.get("chat/friendly_tutor/free@2") == "New.\n\nBye."
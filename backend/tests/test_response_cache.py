@@ -0,0 +1,39 @@
+"""
+Tests for AI response cache keys and the in-process LRU
+"""
+
+import pytest
+from app.core.config import settings
+from app.services.ai import response_cache
+from app.services.ai.response_cache import cache_key
+
+
+@pytest.mark.unit
+def test_cache_key_ignores_whitespace_only():
+    """Prompts differing in whitespace share a key; content, case and parameters do not"""
+    params = {"model": "gpt-4", "temperature": 0.3}
+    key = cache_key("grammar", [{"role": "user", "content": "Text: I am fine,  thank you\n"}], params)
+
+    assert key == cache_key("grammar", [{"role": "user", "content": "Text:\tI am fine, thank you"}], dict(params))
+    assert key != cache_key("grammar", [{"role": "user", "content": "Text: i am fine, thank you"}], params)
+    assert key != cache_key("grammar", [{"role": "user", "content": "Text: I am fine, thank you"}],
+                            {**params, "temperature": 0.7})
+    assert key != cache_key("writing", [{"role": "user", "content": "Text: I am fine, thank you"}], params)
+
+
+@pytest.mark.unit
+def test_l1_evicts_least_recently_used(monkeypatch):
+    """The in-process cache keeps the most recently used entries"""
+    monkeypatch.setattr(settings, "AI_CACHE_L1_MAX_ENTRIES", 2)
+    response_cache.clear_local_cache()
+
+    response_cache._l1_set("a", 1, ttl=60)
+    response_cache._l1_set("b", 2, ttl=60)
+    assert response_cache._l1_get("a") == (True, 1)
+    response_cache._l1_set("c", 3, ttl=60)
+
+    assert response_cache._l1_get("b") == (False, None)
+    assert response_cache._l1_get("a") == (True, 1)
+    response_cache._l1_set("d", 4, ttl=-1)
+    assert response_cache._l1_get("d") == (False, None)
+    response_cache.clear_local_cache()
@@ -0,0 +1,81 @@
+"""
+Tests for compaction of flashcard review history into per-card summaries
+"""
+
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy.dialects import postgresql
+
+import app.db.base  # noqa: F401 - registers every model on Base
+from app.core.config import settings
+from app.services.flashcard.review_archive import _merge_history, compact_flashcard_reviews
+
+
+class RecordingSession:
+    """Keeps the compaction statement; reports that nothing was left to compact"""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement):
+        self.statements.append(statement.compile(dialect=postgresql.dialect()))
+        return type("Result", (), {"rowcount": 0})()
+
+    def commit(self):
+        pass
+
+
+def _cutoff(compiled):
+    (cutoff,) = {value for value in compiled.params.values() if isinstance(value, datetime)}
+    return cutoff
+
+
+@pytest.mark.unit
+def test_compaction_cutoff_honours_zero_retention():
+    """retention_days=0 compacts everything up to now; None falls back to the setting"""
+    db = RecordingSession()
+    compact_flashcard_reviews(db, retention_days=0)
+    compact_flashcard_reviews(db)
+
+    now = datetime.utcnow()
+    assert abs(_cutoff(db.statements[0]) - now) < timedelta(minutes=1)
+    expected = now - timedelta(days=settings.FLASHCARD_REVIEW_RETENTION_DAYS)
+    assert abs(_cutoff(db.statements[1]) - expected) < timedelta(minutes=1)
+
+
+@pytest.mark.unit
+def test_compaction_upsert_keeps_the_newest_review():
+    """Summaries widen their time range and keep last_quality from the newer side"""
+    db = RecordingSession()
+    compact_flashcard_reviews(db, retention_days=0)
+    upsert = str(db.statements[0]).split("DO UPDATE SET", 1)[1]
+
+    assert "first_reviewed_at = least(flashcard_review_summaries.first_reviewed_at, excluded.first_reviewed_at)" in upsert
+    assert "last_reviewed_at = greatest(flashcard_review_summaries.last_reviewed_at, excluded.last_reviewed_at)" in upsert
+    assert (
+        "last_quality = CASE WHEN (flashcard_review_summaries.last_reviewed_at IS NULL "
+        "OR excluded.last_reviewed_at > flashcard_review_summaries.last_reviewed_at) "
+        "THEN excluded.last_quality ELSE flashcard_review_summaries.last_quality END"
+    ) in upsert
+
+
+@pytest.mark.unit
+def test_history_merge_prefers_the_newer_side():
+    """Raw reviews usually win, but an archive newer than them (late offline import) keeps its last review"""
+    now = datetime.utcnow()
+    archived = {
+        "review_count": 3, "correct_count": 2, "mean_quality": 3.0,
+        "last_quality": 5, "last_reviewed_at": now - timedelta(days=1)
+    }
+    recent = {
+        "review_count": 1, "correct_count": 0, "mean_quality": 1.0,
+        "last_quality": 1, "last_reviewed_at": now - timedelta(days=40)
+    }
+
+    merged = _merge_history(archived, recent)
+    assert (merged["review_count"], merged["correct_count"], merged["mean_quality"]) == (4, 2, 2.5)
+    assert (merged["last_quality"], merged["last_reviewed_at"]) == (5, archived["last_reviewed_at"])
+
+    recent["last_reviewed_at"] = now
+    assert _merge_history(archived, recent)["last_quality"] == 1
+    assert _merge_history(None, recent) == recent
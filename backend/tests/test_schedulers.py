@@ -0,0 +1,104 @@
+"""
+Tests for the flashcard scheduler registry and the memory model scheduler
+"""
+
+import numpy as np
+import pytest
+from app.services.flashcard.schedulers import (
+    FSRS_DEFAULT_PARAMETERS,
+    fsrs_step,
+    get_scheduler,
+    retrievability,
+)
+from app.services.flashcard.fsrs_optimizer import build_review_matrix, fit_parameters, log_loss
+
+
+def _new_cards(size: int) -> dict:
+    return {
+        "ease_factor": np.full(size, 2.5),
+        "interval": np.zeros(size, dtype=np.int64),
+        "repetitions": np.zeros(size, dtype=np.int64),
+        "stability": np.full(size, np.nan),
+        "difficulty": np.full(size, np.nan),
+    }
+
+
+@pytest.mark.unit
+def test_registry_lookup():
+    """Schedulers are looked up by name and unknown names are rejected"""
+    assert get_scheduler("sm2").name == "sm2"
+    assert get_scheduler("fsrs").name == "fsrs"
+    with pytest.raises(ValueError):
+        get_scheduler("leitner")
+
+
+@pytest.mark.unit
+def test_fsrs_better_grades_give_longer_intervals():
+    """Hard < good < easy for a new card, and a lapse resets to one day"""
+    result = get_scheduler("fsrs").schedule(np.array([0, 3, 4, 5]), _new_cards(4), np.zeros(4))
+
+    assert result["interval"][0] == 1
+    assert list(result["repetitions"]) == [0, 1, 1, 1]
+    assert result["interval"][1] < result["interval"][2] < result["interval"][3]
+    assert not np.isnan(result["stability"]).any()
+
+
+@pytest.mark.unit
+def test_fsrs_negative_elapsed_time_counts_as_zero():
+    """Stale offline reviews neither overflow the interval nor collapse stability"""
+    state = {**_new_cards(2), "stability": np.array([5.0, 5.0]), "difficulty": np.array([5.0, 5.0])}
+    scheduler = get_scheduler("fsrs")
+
+    stale = scheduler.schedule(np.array([4, 4]), state, np.array([-30.0, -2.0]))
+    same_day = scheduler.schedule(np.array([4, 4]), state, np.zeros(2))
+
+    np.testing.assert_allclose(stale["stability"], same_day["stability"])
+    np.testing.assert_array_equal(stale["interval"], same_day["interval"])
+    assert (stale["interval"] >= 1).all() and (stale["stability"] > 0.1).all()
+    assert retrievability(np.array([-1.0, np.nan]), np.array([5.0, 5.0])).tolist() == [1.0, 1.0]
+
+
+@pytest.mark.unit
+def test_fsrs_step_broadcasts_parameter_stacks():
+    """A (P, 17) parameter stack gives the same result as P separate calls"""
+    stack = np.vstack([FSRS_DEFAULT_PARAMETERS, FSRS_DEFAULT_PARAMETERS * 1.1])
+    stability = np.array([2.0, 10.0, np.nan])
+    difficulty = np.array([5.0, 3.0, np.nan])
+    elapsed = np.array([3.0, 8.0, 0.0])
+    grade = np.array([3, 1, 4])
+
+    stacked = fsrs_step(stack, stability, difficulty, elapsed, grade)
+    for p in range(2):
+        single = fsrs_step(stack[p], stability, difficulty, elapsed, grade)
+        for a, b in zip(stacked, single):
+            np.testing.assert_allclose(np.broadcast_to(a, (2, 3))[p], b)
+
+
+@pytest.mark.unit
+def test_optimizer_reduces_log_loss():
+    """Fitting on simulated history beats the default parameters"""
+    rng = np.random.default_rng(0)
+    true_w = FSRS_DEFAULT_PARAMETERS.copy()
+    true_w[:4] *= 2.5
+
+    card_ids, reviewed_at, quality = [], [], []
+    for card in range(150):
+        t = np.datetime64("2024-01-01T00:00:00")
+        s, d, elapsed = np.array([np.nan]), np.array([np.nan]), 0.0
+        for k in range(6):
+            recalled = k == 0 or rng.random() < retrievability(elapsed, s)[0]
+            grade = 3 if recalled else 1
+            card_ids.append(card)
+            reviewed_at.append(t)
+            quality.append(4 if recalled else 1)
+            s, d, _ = fsrs_step(true_w, s, d, np.array([elapsed]), np.array([grade]))
+            elapsed = max(1.0, float(s[0]) * rng.uniform(0.5, 2.0))
+            t = t + np.timedelta64(int(elapsed * 86400), "s")
+
+    reviews = build_review_matrix(
+        np.array(card_ids), np.array(reviewed_at, dtype="datetime64[s]"), np.array(quality)
+    )
+    assert reviews["mask"].sum() == len(card_ids)
+
+    _, fitted_loss = fit_parameters(reviews, iterations=40)
+    assert fitted_loss < log_loss(FSRS_DEFAULT_PARAMETERS, reviews)
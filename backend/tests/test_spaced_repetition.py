@@ -0,0 +1,53 @@
+"""
+Tests for the SM-2 spaced repetition scheduler
+"""
+
+import numpy as np
+import pytest
+from app.services.flashcard.spaced_repetition import (
+    calculate_next_interval,
+    calculate_next_intervals_batch,
+)
+
+
+def _scalar_status(repetitions: int, interval: int) -> str:
+    if repetitions >= 5 and interval >= 21:
+        return "mastered"
+    if repetitions > 0:
+        return "review"
+    return "learning"
+
+
+@pytest.mark.unit
+def test_batch_kernel_matches_scalar_sm2():
+    """Vectorized kernel returns the same schedule as the per-card function"""
+    rng = np.random.default_rng(42)
+    size = 2000
+    quality = rng.integers(0, 6, size)
+    ease_factor = rng.uniform(1.3, 3.0, size)
+    interval = rng.integers(0, 200, size)
+    repetitions = rng.integers(0, 10, size)
+
+    new_ef, new_iv, new_reps, new_status = calculate_next_intervals_batch(
+        quality, ease_factor, interval, repetitions
+    )
+
+    for i in range(size):
+        ef, iv, reps = calculate_next_interval(
+            int(quality[i]), float(ease_factor[i]), int(interval[i]), int(repetitions[i])
+        )
+        assert new_ef[i] == pytest.approx(ef)
+        assert new_iv[i] == iv
+        assert new_reps[i] == reps
+        assert new_status[i] == _scalar_status(reps, iv)
+
+
+@pytest.mark.unit
+def test_batch_kernel_failed_recall_resets():
+    """Failed recalls reset repetitions and interval"""
+    _, new_iv, new_reps, new_status = calculate_next_intervals_batch(
+        np.array([0, 2]), np.array([2.5, 2.5]), np.array([30, 30]), np.array([6, 6])
+    )
+    assert list(new_iv) == [1, 1]
+    assert list(new_reps) == [0, 0]
+    assert list(new_status) == ["learning", "learning"]
@@ -0,0 +1,62 @@
+"""
+Tests for parsing, repairing and re-asking for AI JSON replies
+"""
+
+import json
+import pytest
+from app.core.config import settings
+from app.schemas.ai import GrammarAnalysis, WritingEvaluationOutput
+from app.services.ai import structured_output
+from app.services.ai.providers import ChatResult
+from app.services.ai.structured_output import StructuredOutputError, parse_structured, repair_json
+
+
+@pytest.mark.unit
+def test_local_repair_of_common_breakage():
+    """Fences, prose, trailing commas and Python literals are fixed without a new call"""
+    broken = 'Sure! Here it is:\n```json\n{"has_errors": True, "corrections": [\n' \
+             '  {"original": "I goed", "corrected": "I went",},\n]}\n```'
+    assert json.loads(repair_json(broken)) == {
+        "has_errors": True, "corrections": [{"original": "I goed", "corrected": "I went"}]
+    }
+
+    result = parse_structured(broken, GrammarAnalysis, "test-repair")
+    assert result.corrections[0].corrected == "I went"
+    stats = structured_output.get_structured_output_stats()["test-repair"]
+    assert stats["parse_failures"] == 1 and stats["repaired"] == 1
+
+    with pytest.raises(StructuredOutputError):
+        parse_structured('{"has_errors": "maybe"}', GrammarAnalysis)
+
+
+@pytest.mark.unit
+def test_scores_are_clamped():
+    """Out-of-range scores are clamped instead of failing validation"""
+    result = parse_structured(
+        '{"overall_score": 104, "grammar_score": "80", "vocabulary_score": -2, "coherence_score": 70,'
+        ' "style_score": 60, "feedback": "Good", "corrected_version": "Text"}',
+        WritingEvaluationOutput
+    )
+    assert (result.overall_score, result.grammar_score, result.vocabulary_score) == (100.0, 80.0, 0.0)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_unusable_reply_is_asked_again(monkeypatch):
+    """The model sees its invalid reply and the error, and the retry is counted"""
+    monkeypatch.setattr(settings, "LLM_STRUCTURED_OUTPUT_RETRIES", 1)
+    replies = iter(['{"corrections": []}', '{"has_errors": false, "corrections": []}'])
+    requests = []
+
+    async def chat(messages, **params):
+        requests.append(messages)
+        return ChatResult(content=next(replies), model="stub", provider="stub")
+
+    monkeypatch.setattr(structured_output.llm_gateway, "chat", chat)
+
+    result = await structured_output.structured_chat(
+        GrammarAnalysis, "test-retry", [{"role": "user", "content": "Check: hi"}], cache=False
+    )
+    assert result.has_errors is False
+    assert len(requests) == 2 and requests[1][-2] == {"role": "assistant", "content": '{"corrections": []}'}
+    assert structured_output.get_structured_output_stats()["test-retry"]["retries"] == 1
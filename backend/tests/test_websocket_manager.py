@@ -0,0 +1,158 @@
+"""
+Tests for WebSocket fan-out and slow-consumer handling
+"""
+
+import asyncio
+import json
+import pytest
+from app.core.config import settings
+from app.services.websocket_manager import ConnectionManager
+
+
+class FakeSocket:
+    """Records frames; a stalled socket never finishes sending"""
+
+    def __init__(self, stalled=False):
+        self.stalled = stalled
+        self.frames = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.stalled:
+            await asyncio.Event().wait()
+        self.frames.append(json.loads(text))
+
+    async def close(self, code=1000, reason=None):
+        self.closed_with = code
+
+
+@pytest.fixture
+def local_manager(monkeypatch):
+    monkeypatch.setattr(settings, "WS_BACKPLANE", "local")
+    monkeypatch.setattr(settings, "WS_SEND_QUEUE_SIZE", 4)
+    return ConnectionManager()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_slow_client_does_not_hold_up_others(local_manager):
+    """Broadcasts reach fast sockets while a stalled one is disconnected when its queue fills"""
+    fast, slow = FakeSocket(), FakeSocket(stalled=True)
+    await local_manager.connect(fast, 1, 10)
+    await local_manager.connect(slow, 2, 10)
+
+    # Streamed like reply tokens: the fast socket's writer keeps up
+    for number in range(10):
+        await local_manager.broadcast_to_conversation({"type": "assistant_token", "n": number}, 10)
+        await asyncio.sleep(0)
+    await asyncio.sleep(0.01)
+
+    assert [frame["n"] for frame in fast.frames] == list(range(10))
+    assert slow.closed_with == 1013
+
+    await local_manager.disconnect(slow)
+    assert await local_manager.get_active_users_in_conversation(10) == [1]
+    await local_manager.disconnect(fast)
+    assert not local_manager.connections and not local_manager.conversation_connections
+    await asyncio.sleep(0)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_drop_oldest_policy_keeps_latest_frames(local_manager, monkeypatch):
+    """With drop_oldest, a slow socket stays connected and gets the newest frames"""
+    monkeypatch.setattr(settings, "WS_SLOW_CONSUMER_POLICY", "drop_oldest")
+    socket = FakeSocket(stalled=True)
+    await local_manager.connect(socket, 1, 10)
+
+    await local_manager.send_personal_message({"n": 0}, 1)
+    await asyncio.sleep(0)
+    for number in range(1, 10):
+        await local_manager.send_personal_message({"n": number}, 1)
+
+    connection = local_manager.connections[local_manager.connection_ids[socket]]
+    assert socket.closed_with is None and connection.dropped == 5
+
+    # The writer is still stuck on the first frame; the queue holds the newest
+    assert [json.loads(text)["n"] for text in list(connection._queue._queue)] == [6, 7, 8, 9]
+    await local_manager.disconnect(socket)
+    await asyncio.sleep(0)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_registry_tracks_each_socket(local_manager):
+    """A user stays a participant until their last socket closes; rooms do not leak into each other"""
+    first, second, elsewhere = FakeSocket(), FakeSocket(), FakeSocket()
+    await local_manager.connect(first, 1, 10)
+    await local_manager.connect(second, 1, 10)
+    await local_manager.connect(elsewhere, 1, 20)
+
+    await local_manager.broadcast_to_conversation({"type": "read"}, 10)
+    await asyncio.sleep(0)
+    assert len(first.frames) == len(second.frames) == 1 and not elsewhere.frames
+
+    await local_manager.disconnect(first)
+    assert await local_manager.get_active_users_in_conversation(10) == [1]
+    await local_manager.disconnect(second)
+    assert await local_manager.get_active_users_in_conversation(10) == []
+    assert await local_manager.is_user_online(1)
+
+    await local_manager.disconnect(elsewhere)
+    await local_manager.disconnect(elsewhere)
+    assert not await local_manager.is_user_online(1)
+    await asyncio.sleep(0)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_typing_is_debounced_and_expires(local_manager, monkeypatch):
+    """Keystroke-level typing frames become one change per interval; "typing" times out"""
+    monkeypatch.setattr(settings, "WS_TYPING_MIN_INTERVAL_SECONDS", 0.05)
+    monkeypatch.setattr(settings, "WS_TYPING_TIMEOUT_SECONDS", 0.1)
+    typer, peer = FakeSocket(), FakeSocket()
+    await local_manager.connect(typer, 1, 10)
+    await local_manager.connect(peer, 2, 10)
+
+    for is_typing in (True, False, True, True, False, True):
+        await local_manager.send_typing_indicator(10, 1, is_typing)
+        await asyncio.sleep(0)
+    await asyncio.sleep(0.02)
+    assert [frame["is_typing"] for frame in peer.frames] == [True]
+    assert not typer.frames
+
+    # No repeat: cleared after the timeout
+    await asyncio.sleep(0.15)
+    assert [frame["is_typing"] for frame in peer.frames] == [True, False]
+
+    # Leaving while typing clears it too
+    await local_manager.send_typing_indicator(10, 1, True)
+    await local_manager.disconnect(typer)
+    await asyncio.sleep(0)
+    assert [frame["is_typing"] for frame in peer.frames] == [True, False, True, False]
+    await local_manager.disconnect(peer)
+    await asyncio.sleep(0)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_inbound_frames_are_rate_limited(local_manager, monkeypatch):
+    """Frames over the limit are refused, with one error frame per run of refusals"""
+    monkeypatch.setattr(settings, "WS_RATE_LIMIT_MESSAGE_BURST", 2)
+    monkeypatch.setattr(settings, "WS_RATE_LIMIT_FRAME_BURST", 3)
+    socket = FakeSocket()
+    await local_manager.connect(socket, 1, 10)
+
+    assert [local_manager.allow_frame(socket, "message") for _ in range(4)] == [True, True, False, False]
+    # Other frame types have their own budget
+    assert [local_manager.allow_frame(socket, "typing") for _ in range(4)] == [True, True, True, False]
+    await asyncio.sleep(0)
+
+    assert [(frame["code"], frame["frame_type"]) for frame in socket.frames] == [
+        ("rate_limited", "message"), ("rate_limited", "typing")
+    ]
+    await local_manager.disconnect(socket)
+    await asyncio.sleep(0)
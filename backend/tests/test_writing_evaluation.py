@@ -0,0 +1,145 @@
+"""
+Tests for background evaluation of writing submissions
+"""
+
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from kombu.exceptions import OperationalError
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.db.base  # noqa: F401 - registers every model on Base
+from app.api.v1.endpoints import writing
+from app.celery_worker import celery_app
+from app.core.config import settings
+from app.core.dependencies import get_db, get_current_user
+from app.db.session import Base
+from app.services.ai import structured_output, writing_evaluation
+from app.services.ai.providers import ChatResult
+from app.tasks.writing import evaluate_writing_submission
+
+EVALUATION = {
+    "overall_score": 72, "grammar_score": 60, "vocabulary_score": 80, "coherence_score": 75,
+    "style_score": 70, "grammar_errors": [{"error": "goed", "correction": "went", "explanation": "Irregular"}],
+    "vocabulary_suggestions": [], "feedback": "Watch irregular verbs.", "corrected_version": "I went home."
+}
+
+SUBMISSION = {
+    "language_id": 1, "prompt": None, "topic": "Weekend", "title": None,
+    "content": "I goed home.", "time_spent_seconds": 30
+}
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    """Stub LLM gateway; set gateway["error"] to make every call fail"""
+    monkeypatch.setattr(settings, "AI_CACHE_ENABLED", False)
+    state = {"calls": 0, "error": None}
+
+    async def chat(messages, **params):
+        state["calls"] += 1
+        if state["error"]:
+            raise state["error"]
+        return ChatResult(content=json.dumps(EVALUATION), model="stub", provider="stub")
+
+    monkeypatch.setattr(structured_output.llm_gateway, "chat", chat)
+    return state
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """The writing API on an in-memory database, with Celery in eager mode"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)
+    monkeypatch.setattr(writing_evaluation, "SessionLocal", session)
+    monkeypatch.setattr(celery_app.conf, "task_always_eager", True)
+
+    def get_test_db():
+        db = session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    api = FastAPI()
+    api.include_router(writing.router)
+    api.dependency_overrides[get_db] = get_test_db
+    api.dependency_overrides[get_current_user] = lambda: type("User", (), {"id": 1})()
+
+    with TestClient(api) as test_client:
+        yield test_client
+    engine.dispose()
+
+
+@pytest.mark.unit
+def test_eager_submission_is_evaluated(client, gateway):
+    """In eager mode the submission comes back completed and the status endpoint has the result"""
+    submitted = client.post("/submit", json=SUBMISSION)
+    assert submitted.status_code == 201
+    assert submitted.json()["evaluation_status"] == "completed"
+
+    status = client.get(f"/submissions/{submitted.json()['id']}/status")
+    assert status.json()["evaluation_status"] == "completed"
+    assert status.json()["evaluation"]["overall_score"] == 72
+    assert "retry-after" not in status.headers
+
+
+@pytest.mark.unit
+def test_queued_submission_is_pending_until_the_task_runs(client, gateway, monkeypatch):
+    """With a worker the request returns at once; the task later completes the submission"""
+    monkeypatch.setattr(celery_app.conf, "task_always_eager", False)
+    queued = []
+    monkeypatch.setattr(evaluate_writing_submission, "delay", queued.append)
+
+    submitted = client.post("/submit", json=SUBMISSION)
+    assert submitted.json()["evaluation_status"] == "pending" and gateway["calls"] == 0
+
+    status = client.get(f"/submissions/{queued[0]}/status")
+    assert status.json() == {"submission_id": queued[0], "evaluation_status": "pending", "evaluation": None}
+    assert status.headers["retry-after"] == str(writing.EVALUATION_POLL_SECONDS)
+
+    assert evaluate_writing_submission.apply(args=[queued[0]]).get() == "completed"
+    assert client.get(f"/submissions/{queued[0]}/status").json()["evaluation_status"] == "completed"
+
+
+@pytest.mark.unit
+def test_task_retries_then_marks_failed(client, gateway, monkeypatch):
+    """A failing AI call is retried max_retries times, then the submission is marked failed"""
+    monkeypatch.setattr(celery_app.conf, "task_always_eager", False)
+    monkeypatch.setattr(evaluate_writing_submission, "delay", lambda submission_id: None)
+    # Propagating eager errors would raise the first Retry instead of replaying it
+    monkeypatch.setattr(celery_app.conf, "task_eager_propagates", False)
+    submission_id = client.post("/submit", json=SUBMISSION).json()["id"]
+    gateway["error"] = RuntimeError("upstream down")
+
+    assert evaluate_writing_submission.apply(args=[submission_id]).get() == "failed"
+    assert gateway["calls"] == evaluate_writing_submission.max_retries + 1
+
+    status = client.get(f"/submissions/{submission_id}/status")
+    assert status.json()["evaluation_status"] == "failed"
+    assert "retry-after" not in status.headers
+
+
+@pytest.mark.unit
+def test_broker_outage_falls_back_to_in_process(client, gateway, monkeypatch):
+    """When the task cannot be queued the submission is evaluated in the request"""
+    monkeypatch.setattr(celery_app.conf, "task_always_eager", False)
+
+    def unreachable(submission_id):
+        raise OperationalError("Connection refused")
+
+    monkeypatch.setattr(evaluate_writing_submission, "delay", unreachable)
+
+    submitted = client.post("/submit", json=SUBMISSION)
+    assert submitted.status_code == 201
+    assert submitted.json()["evaluation_status"] == "completed"
+
+    # Failing AI as well: failed, not pending forever
+    gateway["error"] = RuntimeError("upstream down")
+    assert client.post("/submit", json=SUBMISSION).json()["evaluation_status"] == "failed"